@@ -8,6 +8,8 @@ from .models import (
     EmailTemplate,
     HomePageContent,
     Location,
+    Notification,
+    OutboxEvent,
     PrayerInspiration,
     PrayerPraiseRequest,
     PrayerResource,
@@ -80,19 +82,20 @@ class PrayerPraiseRequestAdmin(ImportMixin, admin.ModelAdmin):
         "is_archived",
     )
     list_filter = ("type", "location", "created_at", "flagged_at", "archived_at")
+    # Bulk imports skip signals, so they're left to import_prayer_requests
     resource_classes = [PrayerRequestResource]
     actions = ["archive_prayer", "unflag_prayer"]
 
     @admin.action(description="Clear the flags on the selected prayers")
     def unflag_prayer(self, request, queryset):
-        updated = queryset.update(flagged_at=None, archived_at=None)
+        updated = len(queryset.update_with_events(flagged_at=None, archived_at=None))
         self.message_user(
             request, f"{updated} prayers were unflagged.", messages.SUCCESS
         )
 
     @admin.action(description="Mark selected prayers as archived")
     def archive_prayer(self, request, queryset):
-        updated = queryset.update(archived_at=now())
+        updated = len(queryset.update_with_events(archived_at=now()))
         self.message_user(
             request, f"{updated} prayers were archived.", messages.SUCCESS
         )
@@ -161,6 +164,7 @@ class EmailLogAdmin(admin.ModelAdmin):
         "error_message",
         "sent_at",
         "created_at",
+        "idempotency_key",
     )
     date_hierarchy = "created_at"
 
@@ -169,3 +173,63 @@ class EmailLogAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = (
+        "prayer_request",
+        "event_type",
+        "status",
+        "attempts",
+        "processed_at",
+        "created_at",
+    )
+    list_filter = ("status", "event_type", "created_at")
+    readonly_fields = (
+        "prayer_request",
+        "event_type",
+        "status",
+        "attempts",
+        "result",
+        "processed_at",
+        "created_at",
+    )
+    date_hierarchy = "created_at"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ("topic", "status", "attempts", "next_attempt_at", "created_at")
+    list_filter = ("status", "topic")
+    readonly_fields = (
+        "topic",
+        "payload",
+        "status",
+        "attempts",
+        "last_error",
+        "next_attempt_at",
+        "created_at",
+    )
+    actions = ["retry_events"]
+
+    @admin.action(description="Retry the selected events")
+    def retry_events(self, request, queryset):
+        updated = queryset.update(
+            status=OutboxEvent.Status.PENDING, attempts=0, next_attempt_at=now()
+        )
+        self.message_user(
+            request, f"{updated} events will be retried.", messages.SUCCESS
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,16 +1,22 @@
 from django.apps import AppConfig
 
-from .money_patch import model_dict
-
 
 class PrayerConfig(AppConfig):
     name = "prayer_room_api"
     verbose_name = "Prayer Room"
 
     def ready(self):
-        import django_webhook.signals
+        from django.db.backends.signals import connection_created
+
+        from . import instrumentation, webhooks
+
+        # Record every query against the request that ran it
+        connection_created.connect(instrumentation.install)
+        instrumentation.install_all()
 
-        django_webhook.signals.model_dict = model_dict
+        # Replace django_webhook's per-save listeners with batched delivery
+        webhooks.connect_signals()
 
-        # Register signal handlers
+        # Register signal handlers and system checks
+        import prayer_room_api.checks  # noqa: F401
         import prayer_room_api.signals  # noqa: F401
@@ -0,0 +1,240 @@
+"""
+Async versions of the busiest API endpoints.
+
+With ``ASYNC_API`` enabled these views take over the prayer request feed
+(list and create), ``increment_prayer_count`` and the cached read-only
+content endpoints. Served by an ASGI server (the ``web-asgi`` process), a
+slow query or webhook then holds up one request instead of a whole worker.
+Responses match the DRF viewsets they replace; the routes they don't cover
+are still served by the router.
+
+Reads use the async ORM. Writes go through the same serializer and manager
+code as the sync API, run with ``sync_to_async`` so that signals and
+transactions behave exactly as they do there.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.urls import path
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+
+from . import caching, counters
+from .renderers import ORJSONRenderer
+from .serializers import prayer_feed_data, prayer_feed_values
+from .views import (
+    HomePageContentModelViewSet,
+    LocationModelViewSet,
+    PrayerInspirationModelViewSet,
+    PrayerPraiseRequestViewSet,
+    SettingModelViewSet,
+)
+
+
+class AsyncAPIView(View):
+    """
+    The parts of DRF's ``APIView`` these endpoints need: parsing, token and
+    session authentication, and JSON error responses in DRF's format.
+    """
+
+    authentication_required = False
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # CSRF is enforced in authenticate(), and only for session users.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        if method == "options":
+            return await self.options(request, *args, **kwargs)
+        self.request = Request(
+            request, parsers=[parser() for parser in self.parser_classes]
+        )
+        try:
+            if self.authentication_required:
+                self.request.user = await self.authenticate(request)
+            handler = getattr(self, method, None)
+            if method not in self.http_method_names or handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            return await handler(self.request, *args, **kwargs)
+        except Http404 as exc:
+            return self.handle_exception(exceptions.NotFound(*exc.args))
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    async def authenticate(self, request):
+        """Authenticate as ``[TokenAuthentication, SessionAuthentication]``."""
+        auth = request.headers.get("Authorization", "").split()
+        if auth and auth[0].lower() == "token":
+            if len(auth) != 2:
+                raise exceptions.AuthenticationFailed("Invalid token header.")
+            token = (
+                await Token.objects.select_related("user")
+                .filter(key=auth[1])
+                .afirst()
+            )
+            if token is None:
+                raise exceptions.AuthenticationFailed("Invalid token.")
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed("User inactive or deleted.")
+            return token.user
+
+        user = await request.auser()
+        if not user.is_authenticated or not user.is_active:
+            raise exceptions.NotAuthenticated()
+        if request.method not in SAFE_METHODS:
+            SessionAuthentication().enforce_csrf(request)
+        return user
+
+    def handle_exception(self, exc):
+        headers = {}
+        if isinstance(
+            exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+        ):
+            headers["WWW-Authenticate"] = "Token"
+            exc.status_code = status.HTTP_401_UNAUTHORIZED
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        return self.render(data, status=exc.status_code, headers=headers)
+
+    def render(self, data, status=status.HTTP_200_OK, headers=None):
+        return HttpResponse(
+            ORJSONRenderer().render(data),
+            status=status,
+            content_type="application/json",
+            headers=headers,
+        )
+
+
+class PrayerRequestListView(AsyncAPIView):
+    """``GET`` and ``POST`` on ``api/prayer-requests/``."""
+
+    authentication_required = True
+    serializer_class = PrayerPraiseRequestViewSet.serializer_class
+    pagination_class = PrayerPraiseRequestViewSet.pagination_class
+
+    def get_queryset(self):
+        queryset = PrayerPraiseRequestViewSet.queryset.all()
+        location = self.request.query_params.get("location")
+        if location:
+            queryset = queryset.filter(location__slug=location)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        context = {"request": self.request, "format": None, "view": self}
+        return self.serializer_class(*args, context=context, **kwargs)
+
+    async def get(self, request):
+        queryset = prayer_feed_values(self.get_queryset())
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, view=self)
+        if page is not None:
+            data = prayer_feed_data(page)
+            return self.render(paginator.get_paginated_response(data).data)
+        return self.render(prayer_feed_data([row async for row in queryset]))
+
+    async def post(self, request):
+        data = await sync_to_async(self.perform_create)(request)
+        return self.render(data, status=status.HTTP_201_CREATED)
+
+    def perform_create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return serializer.data
+
+
+class IncrementPrayerCountView(AsyncAPIView):
+    """``POST`` on ``api/prayer-requests/<pk>/increment_prayer_count/``."""
+
+    authentication_required = True
+
+    async def post(self, request, pk):
+        prayer_count = await sync_to_async(counters.record_prayer)(pk)
+        if prayer_count is None:
+            raise Http404
+        return self.render({"prayer_count": prayer_count})
+
+
+class CachedReadOnlyView(AsyncAPIView):
+    """
+    ``list`` and ``retrieve`` for a ``CachedResponseMixin`` viewset, sharing
+    its cache entries and ETags.
+    """
+
+    queryset = None
+    serializer_class = None
+
+    async def get(self, request, pk=None):
+        model = self.queryset.model
+        key = caching.response_cache_key(
+            model, await caching.amodel_version(model), request.get_full_path()
+        )
+        cached = await cache.aget(key)
+        if cached is None:
+            data = await self.get_data(pk)
+            cached = (caching.make_etag(data), data)
+            await cache.aset(
+                key, cached, timeout=caching.timeout(settings.API_CACHE_TIMEOUT)
+            )
+
+        etag, data = cached
+        if caching.etag_matches(request, etag):
+            return HttpResponse(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+        return self.render(data, headers={"ETag": etag})
+
+    async def get_data(self, pk):
+        queryset = self.queryset.all()
+        if pk is None:
+            rows = [row async for row in queryset]
+            return self.serializer_class(rows, many=True).data
+        instance = await queryset.filter(pk=pk).afirst()
+        if instance is None:
+            raise Http404(
+                f"No {queryset.model._meta.object_name} matches the given query."
+            )
+        return self.serializer_class(instance).data
+
+
+def _read_only_urls(prefix, viewset):
+    view = CachedReadOnlyView.as_view(
+        queryset=viewset.queryset, serializer_class=viewset.serializer_class
+    )
+    basename = viewset.queryset.model._meta.object_name.lower()
+    return [
+        path(f"{prefix}/", view, name=f"{basename}-list"),
+        path(f"{prefix}/<int:pk>/", view, name=f"{basename}-detail"),
+    ]
+
+
+# Mounted under api/ ahead of the router, with the router's URL names.
+urlpatterns = [
+    path(
+        "prayer-requests/",
+        PrayerRequestListView.as_view(),
+        name="prayerpraiserequest-list",
+    ),
+    path(
+        "prayer-requests/<int:pk>/increment_prayer_count/",
+        IncrementPrayerCountView.as_view(),
+        name="prayerpraiserequest-increment-prayer-count",
+    ),
+    *_read_only_urls("prayer-inspiration", PrayerInspirationModelViewSet),
+    *_read_only_urls("content", HomePageContentModelViewSet),
+    *_read_only_urls("locations", LocationModelViewSet),
+    *_read_only_urls("settings", SettingModelViewSet),
+]
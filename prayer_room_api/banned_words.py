@@ -0,0 +1,85 @@
+"""
+Process-wide matcher for banned words.
+
+All active words are compiled into one alternation regex per auto action and
+kept in memory, so classifying a submission is a regex pass per action with no
+database queries. The compiled matcher is tagged with a version stamp held in
+the Django cache; saving or deleting a ``BannedWord`` bumps the stamp, and
+every process rebuilds its matcher the next time it sees a new stamp.
+
+Without a shared cache other processes never see the bump, so a matcher is
+also rebuilt once it is ``LOCAL_CACHE_TIMEOUT`` seconds old.
+"""
+
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from . import caching
+from .models import BannedWord
+
+VERSION_NAME = "banned_words"
+
+_lock = threading.Lock()
+_matcher = None
+
+
+class BannedWordMatcher:
+    def __init__(self, words_by_action, version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.patterns = {}
+        for action, words in words_by_action.items():
+            words = sorted({word.lower() for word in words if word}, key=len)
+            if words:
+                self.patterns[action] = re.compile(
+                    "|".join(re.escape(word) for word in reversed(words))
+                )
+
+    @classmethod
+    def from_db(cls, version=None):
+        words_by_action = {}
+        active_words = BannedWord.objects.filter(is_active=True).values_list(
+            "auto_action", "word"
+        )
+        for action, word in active_words:
+            words_by_action.setdefault(action, []).append(word)
+        return cls(words_by_action, version=version)
+
+    def match(self, text):
+        """Return the set of auto actions triggered by ``text``."""
+        text = text.lower()
+        return {
+            action for action, pattern in self.patterns.items() if pattern.search(text)
+        }
+
+
+def current_version():
+    return caching.get_version(VERSION_NAME)
+
+
+def _is_current(matcher, version):
+    if matcher is None or matcher.version != version:
+        return False
+    if caching.is_shared():
+        return True
+    return time.monotonic() - matcher.built_at < settings.LOCAL_CACHE_TIMEOUT
+
+
+def get_matcher():
+    global _matcher
+    version = current_version()
+    matcher = _matcher
+    if not _is_current(matcher, version):
+        with _lock:
+            if not _is_current(_matcher, version):
+                _matcher = BannedWordMatcher.from_db(version=version)
+            matcher = _matcher
+    return matcher
+
+
+def invalidate():
+    """Bump the version so every process rebuilds its matcher."""
+    caching.bump_version(VERSION_NAME)
@@ -0,0 +1,71 @@
+"""
+Helpers shared by the ``benchmark_*`` management commands.
+"""
+
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection, transaction
+
+
+def time_call(func, repeat=20, warmup=2):
+    """
+    Call ``func`` ``warmup + repeat`` times and return timing stats in
+    milliseconds for the last ``repeat`` calls.
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[max(0, int(len(timings) * 0.95) - 1)], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def format_timings(timings):
+    return " ".join(f"{key}={value}" for key, value in timings.items())
+
+
+def count_queries(func):
+    """Call ``func`` and return ``(number of queries it ran, its result)``."""
+    count = 0
+
+    def counter(execute, sql, params, many, context):
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(counter):
+        result = func()
+    return count, result
+
+
+def peak_allocation_kb(func):
+    """Call ``func`` and return the peak memory it allocated, in KiB."""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def rolled_back(func):
+    """``func`` wrapped to run in a savepoint that is always rolled back."""
+
+    def wrapper():
+        with transaction.atomic():
+            result = func()
+            transaction.set_rollback(True)
+        return result
+
+    return wrapper
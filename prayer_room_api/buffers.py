@@ -0,0 +1,89 @@
+"""
+Cache-backed work buffers.
+
+A ``CacheBuffer`` tracks which members (prayer ids, object keys, ...) have
+pending work in the shared Django cache, and hands them to a Celery task in
+batches. Members are registered through an atomically incremented sequence,
+so marking is lock-free; draining is serialised with a short cache lock.
+
+The cache must be shared between the web and worker processes (see
+``CACHE_URL``) for buffered work to reach the worker.
+"""
+
+from django.core.cache import cache
+
+LOCK_TIMEOUT = 60
+
+
+class CacheBuffer:
+    def __init__(self, name, timeout=24 * 60 * 60):
+        self.name = name
+        self.timeout = timeout
+        self.prefix = f"prayer_room_api:buffer:{name}"
+        self.seq_key = f"{self.prefix}:seq"
+        self.drained_key = f"{self.prefix}:drained"
+        self.lock_key = f"{self.prefix}:lock"
+        self.scheduled_key = f"{self.prefix}:scheduled"
+
+    def _slot_key(self, slot):
+        return f"{self.prefix}:slot:{slot}"
+
+    def incr(self, key, delta=1):
+        """Atomically add ``delta`` to an integer held at ``key``."""
+        cache.add(key, 0, timeout=self.timeout)
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            # Evicted between add() and incr().
+            cache.add(key, 0, timeout=self.timeout)
+            return cache.incr(key, delta)
+
+    def mark(self, member):
+        """Record that ``member`` has pending work."""
+        slot = self.incr(self.seq_key)
+        cache.set(self._slot_key(slot), member, timeout=self.timeout)
+
+    def drain(self):
+        """
+        Return the members marked since the last drain, or ``None`` when
+        another drain is already running.
+        """
+        members = self.drain_items()
+        if members is None:
+            return None
+        return set(members)
+
+    def drain_items(self):
+        """
+        Like ``drain()``, but return every marked value in the order it was
+        marked, including repeats.
+        """
+        if not cache.add(self.lock_key, 1, timeout=LOCK_TIMEOUT):
+            return None
+        try:
+            end = cache.get(self.seq_key, 0)
+            start = cache.get(self.drained_key, 0)
+            if end < start:
+                # The sequence was evicted and restarted.
+                start = 0
+            if end <= start:
+                return []
+            slot_keys = [self._slot_key(slot) for slot in range(start + 1, end + 1)]
+            stored = cache.get_many(slot_keys)
+            members = [stored[key] for key in slot_keys if key in stored]
+            cache.set(self.drained_key, end, timeout=self.timeout)
+            cache.delete_many(slot_keys)
+            return members
+        finally:
+            cache.delete(self.lock_key)
+
+    def schedule(self, task, countdown):
+        """
+        Queue ``task`` to run in ``countdown`` seconds unless a run is
+        already queued. The task should call ``unschedule()`` when it starts.
+        """
+        if cache.add(self.scheduled_key, 1, timeout=countdown + LOCK_TIMEOUT):
+            task.apply_async(countdown=countdown)
+
+    def unschedule(self):
+        cache.delete(self.scheduled_key)
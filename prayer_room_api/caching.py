@@ -0,0 +1,135 @@
+"""
+Version-keyed caching helpers.
+
+Cached values are keyed on a version stamp that lives in the Django cache.
+Bumping the stamp (from save/delete signals) orphans every entry built from
+the old data, so nothing has to be deleted key by key.
+
+A bump only reaches other processes through a shared cache (``CACHE_URL``).
+With the default per-process cache, entries are kept for at most
+``LOCAL_CACHE_TIMEOUT`` seconds instead, see ``timeout()``.
+"""
+
+import hashlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+VERSION_KEY_PREFIX = "prayer_room_api:version"
+
+
+def is_shared():
+    """Whether the default cache is seen by every process."""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def timeout(seconds):
+    """
+    ``seconds``, capped at ``LOCAL_CACHE_TIMEOUT`` when the cache is per
+    process and other workers never see a version bump.
+    """
+    if is_shared():
+        return seconds
+    return min(seconds, settings.LOCAL_CACHE_TIMEOUT)
+
+
+def _version_key(name):
+    return f"{VERSION_KEY_PREFIX}:{name}"
+
+
+def get_version(name):
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    cache.set(_version_key(name), uuid4().hex, timeout=None)
+
+
+async def aget_version(name):
+    key = _version_key(name)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid4().hex, timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def model_version(model):
+    return get_version(model._meta.label_lower)
+
+
+async def amodel_version(model):
+    return await aget_version(model._meta.label_lower)
+
+
+def bump_model_version(model):
+    bump_version(model._meta.label_lower)
+
+
+def response_cache_key(model, version, path):
+    return f"prayer_room_api:response:{model._meta.label_lower}:{version}:{path}"
+
+
+def make_etag(data):
+    content = JSONRenderer().render(data)
+    return f'"{hashlib.sha256(content).hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    return etag in if_none_match or "*" in if_none_match
+
+
+class CachedResponseMixin:
+    """
+    Serve ``list``/``retrieve`` from the cache with a strong ETag.
+
+    Entries are keyed on the model's version, so a save or delete of any row
+    invalidates them, in every process when the cache is shared. A matching
+    ``If-None-Match`` gets a 304 from a single cache lookup. Only JSON
+    responses are cached; the browsable API renders normally.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request):
+        model = self.get_queryset().model
+        return response_cache_key(
+            model, model_version(model), request.get_full_path()
+        )
+
+    def cached_response(self, view, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return view(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = (make_etag(response.data), response.data)
+            cache.set(key, cached, timeout=timeout(settings.API_CACHE_TIMEOUT))
+
+        etag, data = cached
+        if etag_matches(request, etag):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+        return Response(data, headers={"ETag": etag})
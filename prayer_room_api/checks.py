@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core import checks
+
+from . import caching
+
+
+@checks.register(checks.Tags.caches)
+def check_prayer_count_buffer(app_configs, **kwargs):
+    """Buffered taps in a per-process cache never reach the flush task."""
+    if settings.PRAYER_COUNT_BUFFERED and not caching.is_shared():
+        return [
+            checks.Error(
+                "PRAYER_COUNT_BUFFERED needs a cache shared between processes.",
+                hint="Set CACHE_URL, e.g. to redis://, or turn buffering off.",
+                id="prayer_room_api.E001",
+            )
+        ]
+    return []
@@ -0,0 +1,97 @@
+"""
+"I prayed" taps.
+
+By default each tap is a single ``UPDATE ... RETURNING`` on the request row.
+With ``PRAYER_COUNT_BUFFERED`` enabled, taps are instead counted in the shared
+cache and written to the database in batches by ``flush_prayer_counts``, so a
+burst of taps during a live service costs one read per tap and one write per
+flush. Buffering needs a cache shared with the worker, which the
+``prayer_room_api.E001`` system check enforces.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils.timezone import now
+
+from .buffers import CacheBuffer
+from .models import PrayerPraiseRequest
+
+buffer = CacheBuffer("prayer_count")
+
+
+def _pending_key(pk):
+    return f"{buffer.prefix}:pending:{pk}"
+
+
+def record_prayer(pk):
+    """
+    Count a prayer for a published request and return its new prayer count,
+    or ``None`` if there is no such published request.
+    """
+    if not settings.PRAYER_COUNT_BUFFERED:
+        return PrayerPraiseRequest.objects.increment_prayer_count(pk)
+
+    stored_count = (
+        PrayerPraiseRequest.objects.published()
+        .filter(pk=pk)
+        .values_list("prayer_count", flat=True)
+        .first()
+    )
+    if stored_count is None:
+        return None
+
+    pending = buffer.incr(_pending_key(pk))
+    if pending == 1:
+        _mark(pk)
+    return stored_count + pending
+
+
+def _mark(pk):
+    from .tasks import flush_prayer_counts
+
+    buffer.mark(pk)
+    buffer.schedule(flush_prayer_counts, settings.PRAYER_COUNT_FLUSH_SECONDS)
+
+
+def flush():
+    """Write buffered taps to the database. Returns the number of rows updated."""
+    buffer.unschedule()
+    pks = buffer.drain()
+    if not pks:
+        return 0
+
+    stored = cache.get_many([_pending_key(pk) for pk in pks])
+    pending = {
+        pk: stored[_pending_key(pk)]
+        for pk in pks
+        if stored.get(_pending_key(pk), 0) > 0
+    }
+    if not pending:
+        return 0
+
+    try:
+        ids = PrayerPraiseRequest.objects.filter(pk__in=pending).update_with_events(
+            prayer_count=F("prayer_count")
+            + Case(
+                *(When(pk=pk, then=Value(delta)) for pk, delta in pending.items()),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            updated_at=now(),
+        )
+    except Exception:
+        # The taps are still counted in the cache; mark them for the next run.
+        for pk in pending:
+            _mark(pk)
+        raise
+
+    for pk, delta in pending.items():
+        # Taps that landed while flushing stay pending for the next run.
+        try:
+            remaining = cache.decr(_pending_key(pk), delta)
+        except ValueError:
+            continue
+        if remaining > 0:
+            _mark(pk)
+    return len(ids)
@@ -0,0 +1,67 @@
+"""
+Compiled email template engine.
+
+Stored ``EmailTemplate`` subjects and bodies are compiled to Django
+``Template`` objects once per ``(pk, updated_at)`` and reused for every
+recipient until the template is edited. Markdown is converted with a reusable
+per-thread ``markdown.Markdown`` instance. The HTML isn't cached: the body is
+rendered with each recipient's context first, so it differs per recipient.
+"""
+
+import threading
+
+import markdown
+from django.template import Context, Template
+
+_lock = threading.Lock()
+_compiled = {}
+_local = threading.local()
+
+
+def _markdown():
+    md = getattr(_local, "markdown", None)
+    if md is None:
+        md = _local.markdown = markdown.Markdown()
+    return md
+
+
+def markdown_to_html(text):
+    return _markdown().reset().convert(text)
+
+
+class CompiledTemplate:
+    def __init__(self, subject, body_markdown):
+        self.subject = Template(subject)
+        self.body = Template(body_markdown)
+
+    def render(self, context_data):
+        """
+        Return ``(subject, body_markdown, body_html)`` for ``context_data``.
+        The markdown source doubles as the plain text body.
+        """
+        context = Context(context_data)
+        subject = self.subject.render(context)
+        body_markdown = self.body.render(context)
+        return subject, body_markdown, markdown_to_html(body_markdown)
+
+
+def get_compiled(template):
+    """The compiled form of a saved ``EmailTemplate``, cached until it changes."""
+    if template.pk is None:
+        return CompiledTemplate(template.subject, template.body_markdown)
+
+    key = (template.pk, template.updated_at)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = CompiledTemplate(template.subject, template.body_markdown)
+        with _lock:
+            # Drop compiled copies of earlier versions of this template.
+            for stale in [k for k in _compiled if k[0] == template.pk]:
+                del _compiled[stale]
+            _compiled[key] = compiled
+    return compiled
+
+
+def render(template, context_data):
+    """Render a stored ``EmailTemplate``; see ``CompiledTemplate.render``."""
+    return get_compiled(template).render(context_data)
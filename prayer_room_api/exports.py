@@ -0,0 +1,152 @@
+"""
+Streaming exports of prayer requests as CSV or JSON lines.
+
+Rows are read as ``values_list()`` tuples through ``iterator(chunk_size=)``,
+which uses a server-side cursor on PostgreSQL, and written out a chunk at a
+time, so memory use stays flat however many years of requests are exported.
+Under ASGI ``aexport()`` does the same a chunk at a time from the sync
+thread, as Django would otherwise read a sync iterator into a list before
+sending any of it.
+
+CSV cells that a spreadsheet would run as a formula are prefixed with ``'``.
+"""
+
+import csv
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.timezone import make_aware
+
+from .models import (
+    AWAITING_RESPONSE,
+    FLAGGED_QUEUE,
+    PENDING_MODERATION,
+    PrayerPraiseRequest,
+)
+
+CHUNK_SIZE = 2000
+
+# A cell starting with one of these is read as a formula by spreadsheets.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Column -> field to read it from.
+COLUMNS = {
+    "id": "id",
+    "type": "type",
+    "name": "name",
+    "content": "content",
+    "response_comment": "response_comment",
+    "prayer_count": "prayer_count",
+    "location": "location__slug",
+    "created_by": "created_by__username",
+    "created_at": "created_at",
+    "approved_at": "approved_at",
+    "flagged_at": "flagged_at",
+    "archived_at": "archived_at",
+    "response_skipped_at": "response_skipped_at",
+}
+
+STATUSES = {
+    "published": Q(approved_at__isnull=False, archived_at__isnull=True),
+    "pending": PENDING_MODERATION,
+    "flagged": FLAGGED_QUEUE,
+    "archived": Q(archived_at__isnull=False),
+    "awaiting_response": AWAITING_RESPONSE,
+}
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def export_queryset(since=None, until=None, location=None, status=None):
+    """
+    Rows created between the ``since`` and ``until`` dates, inclusive, at
+    ``location`` and in ``status``, oldest first, as ``COLUMNS`` tuples.
+    """
+    queryset = PrayerPraiseRequest.objects.all()
+    if since:
+        queryset = queryset.filter(
+            created_at__gte=make_aware(datetime.combine(since, time.min))
+        )
+    if until:
+        queryset = queryset.filter(
+            created_at__lt=make_aware(
+                datetime.combine(until + timedelta(days=1), time.min)
+            )
+        )
+    if location:
+        queryset = queryset.filter(location=location)
+    if status:
+        queryset = queryset.filter(STATUSES[status])
+    return queryset.order_by("created_at", "id").values_list(*COLUMNS.values())
+
+
+class _Echo:
+    """A file for ``csv.writer`` that hands back what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(lines, chunk_size):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def escape_formula(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def csv_header():
+    return csv.writer(_Echo()).writerow(COLUMNS)
+
+
+def csv_rows(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow([escape_formula(value) for value in row])
+
+
+def csv_lines(rows):
+    yield csv_header()
+    yield from csv_rows(rows)
+
+
+def jsonl_lines(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(COLUMNS, row))) + "\n"
+
+
+def export(queryset, format="csv", chunk_size=CHUNK_SIZE):
+    """Yield ``queryset`` rendered as ``format``, ``chunk_size`` rows at a time."""
+    lines = csv_lines if format == "csv" else jsonl_lines
+    return _chunked(lines(queryset.iterator(chunk_size=chunk_size)), chunk_size)
+
+
+async def aexport(queryset, format="csv", chunk_size=CHUNK_SIZE):
+    """
+    ``export()`` as an async iterator, for streaming under ASGI. Each chunk
+    of rows is read from the same cursor in the sync thread; ``aiterator()``
+    would open the cursor in the event loop for ``values_list()`` querysets.
+    """
+    if format == "csv":
+        yield csv_header()
+    lines = csv_rows if format == "csv" else jsonl_lines
+    rows = queryset.iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while chunk := await next_chunk():
+        yield "".join(lines(chunk))
@@ -1,6 +1,6 @@
 from django import forms
 
-from .models import EmailTemplate, PrayerPraiseRequest, PrayerResource
+from .models import EmailTemplate, Location, PrayerPraiseRequest, PrayerResource
 
 
 class EmailTemplateForm(forms.ModelForm):
@@ -155,3 +155,31 @@ class PrayerResourceForm(forms.ModelForm):
         if resource_type == PrayerResource.ResourceType.SECTION and section:
             raise forms.ValidationError("Sections cannot belong to another section.")
         return cleaned_data
+
+
+class PrayerExportForm(forms.Form):
+    STATUS_CHOICES = [
+        ("", "Any"),
+        ("published", "Published"),
+        ("pending", "Pending moderation"),
+        ("flagged", "Flagged"),
+        ("archived", "Archived"),
+        ("awaiting_response", "Awaiting response"),
+    ]
+    FORMAT_CHOICES = [("csv", "CSV"), ("jsonl", "JSON lines")]
+
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+    since = forms.DateField(required=False)
+    until = forms.DateField(required=False)
+    location = forms.ModelChoiceField(queryset=Location.objects.all(), required=False)
+    status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
+
+    def clean_format(self):
+        return self.cleaned_data["format"] or "csv"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        since, until = cleaned_data.get("since"), cleaned_data.get("until")
+        if since and until and since > until:
+            raise forms.ValidationError("The start date must be before the end date.")
+        return cleaned_data
@@ -0,0 +1,171 @@
+"""
+Per-request SQL instrumentation.
+
+Every database connection gets an execute wrapper, installed as it connects,
+that records each query against the ``QueryStats`` of the request being
+served. The stats live in a context variable, so queries are attributed
+correctly from async views and from the threads ``sync_to_async`` runs them
+in; outside a request the wrapper is a single context variable lookup.
+
+``QueryInstrumentationMiddleware`` reports each request's query count, time
+spent in the database and repeated statements as a ``key=value`` log line,
+and as a ``Server-Timing`` header with ``DEBUG`` or for staff.
+``assert_max_queries`` holds tests to a query budget.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("query_stats", default=None)
+
+# Statements that don't count towards duplicates: transaction bookkeeping.
+_IGNORED = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def fingerprint(sql):
+    """``sql`` with literal numbers and ``IN`` list lengths normalised."""
+    return _NUMBER.sub("?", _IN_LIST.sub("(...)", sql))
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        if not sql.startswith(_IGNORED):
+            self.statements[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeat a statement already run, e.g. an N+1 loop."""
+        return sum(count - 1 for count in self.statements.values())
+
+    def most_repeated(self):
+        """``(fingerprint, count)`` of the statement run most often."""
+        return max(self.statements.items(), key=lambda item: item[1])
+
+
+def _record(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record(sql, time.perf_counter() - start)
+
+
+def install(connection, **kwargs):
+    """``connection_created`` receiver adding the recording wrapper."""
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+def install_all():
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+
+
+@contextmanager
+def collect():
+    """Record the queries run in the block into the ``QueryStats`` yielded."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.QUERY_INSTRUMENTATION:
+            return self.get_response(request)
+        start = time.perf_counter()
+        with collect() as stats:
+            response = self.get_response(request)
+        user = getattr(request, "user", None)
+        timing = settings.DEBUG or bool(user and user.is_staff)
+        return self.report(request, response, stats, start, timing)
+
+    async def __acall__(self, request):
+        if not settings.QUERY_INSTRUMENTATION:
+            return await self.get_response(request)
+        start = time.perf_counter()
+        with collect() as stats:
+            response = await self.get_response(request)
+        timing = settings.DEBUG or (
+            hasattr(request, "auser") and (await request.auser()).is_staff
+        )
+        return self.report(request, response, stats, start, timing)
+
+    def report(self, request, response, stats, start, timing=False):
+        """Log the request's queries, and add the header if ``timing``."""
+        elapsed = (time.perf_counter() - start) * 1000
+        db = stats.duration * 1000
+        if timing:
+            response["Server-Timing"] = ", ".join(
+                [
+                    f'db;dur={db:.1f};desc="{stats.count} queries"',
+                    f'dbdup;desc="{stats.duplicates} duplicate queries"',
+                    f"app;dur={elapsed:.1f}",
+                ]
+            )
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": stats.count,
+            "db_ms": round(db, 1),
+            "duplicates": stats.duplicates,
+            "duration_ms": round(elapsed, 1),
+        }
+        logger.info(
+            "request_queries %s",
+            " ".join(f"{key}={value}" for key, value in fields.items()),
+            extra=fields,
+        )
+        return response
+
+
+@contextmanager
+def assert_max_queries(budget):
+    """
+    Fail if the block runs more than ``budget`` queries, naming the most
+    repeated statement, which is usually the N+1 that blew the budget.
+    """
+    with collect() as stats:
+        yield stats
+    if stats.count > budget:
+        message = f"{stats.count} queries run, budget is {budget}"
+        if stats.duplicates:
+            sql, count = stats.most_repeated()
+            message += f"; repeated {count} times: {sql}"
+        raise AssertionError(message)
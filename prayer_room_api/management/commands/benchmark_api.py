@@ -0,0 +1,301 @@
+import json
+import platform
+import re
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+
+from prayer_room_api import tasks
+from prayer_room_api.benchmarks import (
+    count_queries,
+    peak_allocation_kb,
+    rolled_back,
+    time_call,
+)
+from prayer_room_api.celery import app as celery_app
+from prayer_room_api.models import (
+    HomePageContent,
+    Location,
+    PrayerInspiration,
+    PrayerPraiseRequest,
+    PrayerResource,
+    Setting,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Record query counts, latency (median/p95) and peak allocations for "
+        "every API endpoint, staff view and Celery task, as JSON. Generate "
+        "data first with generate_data; every call runs in a rolled back "
+        "transaction, tasks run inline and email goes to the in-memory backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument(
+            "--task-repeat",
+            type=int,
+            default=3,
+            help="Repeats for Celery tasks, which are slower than requests.",
+        )
+        parser.add_argument(
+            "--only", help="Only run cases whose name matches this regex."
+        )
+        parser.add_argument("--output", help="Write the JSON results here.")
+        parser.add_argument(
+            "--compare",
+            help="A previous --output file to report query and latency changes "
+            "against.",
+        )
+
+    def handle(self, *args, **options):
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        try:
+            with (
+                override_settings(
+                    ALLOWED_HOSTS=["testserver"],
+                    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+                    EMAIL_SEND_RATE_PER_SECOND=10**6,
+                ),
+                transaction.atomic(),
+            ):
+                report = self.run(options)
+                transaction.set_rollback(True)
+        finally:
+            celery_app.conf.task_always_eager = eager
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+            self.stdout.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                self.compare(json.load(f), report)
+
+    def run(self, options):
+        only = re.compile(options["only"]) if options["only"] else None
+        results = {}
+        for kind, name, func in self.cases():
+            if only and not only.search(name):
+                continue
+            repeat = options["task_repeat" if kind == "task" else "repeat"]
+            func = rolled_back(func)
+            # Counted once caches are warm, as in steady state.
+            func()
+            queries, response = func()
+            timings = time_call(func, repeat, warmup=1)
+            results[name] = {
+                "status": getattr(response, "status_code", None),
+                "queries": queries,
+                **timings,
+                "peak_alloc_kb": peak_allocation_kb(func),
+            }
+            self.stderr.write(
+                f"{name}: {queries} queries, median {timings['median_ms']}ms"
+            )
+
+        return {
+            "meta": {
+                "database": connection.vendor,
+                "debug": settings.DEBUG,
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "prayer_requests": PrayerPraiseRequest.objects.count(),
+                "locations": Location.objects.count(),
+                "users": User.objects.count(),
+                "repeat": options["repeat"],
+                "task_repeat": options["task_repeat"],
+                "started_at": datetime.now(timezone.utc).isoformat(),
+            },
+            "results": results,
+        }
+
+    def fixtures(self):
+        """Sample rows for the detail routes, created if the data has none."""
+        location = Location.objects.filter(is_active=True).first()
+        if location is None:
+            location = Location.objects.create(name="Benchmark", slug="benchmark")
+        prayer = PrayerPraiseRequest.objects.published().first()
+        if prayer is None:
+            prayer = PrayerPraiseRequest.objects.create(
+                location=location,
+                content="Benchmark request",
+                created_at=now(),
+                approved_at=now(),
+            )
+        responded = (
+            PrayerPraiseRequest.objects.published()
+            .exclude(response_comment="")
+            .filter(created_by__isnull=False)
+            .first()
+        ) or prayer
+        return {
+            "location": location,
+            "prayer": prayer,
+            "responded": responded,
+            "inspiration": PrayerInspiration.objects.first()
+            or PrayerInspiration.objects.create(verse="Psalm 23", content="..."),
+            "content": HomePageContent.objects.first()
+            or HomePageContent.objects.create(key="title", value="Prayer Room"),
+            "setting": Setting.objects.first()
+            or Setting.objects.create(name="prayer", button_text="Pray"),
+            "resource": PrayerResource.objects.filter(is_active=True).first()
+            or PrayerResource.objects.create(
+                title="Benchmark", resource_type="text", content="..."
+            ),
+        }
+
+    def cases(self):
+        """``(kind, name, func)`` for each case; ``func`` returns its queries."""
+        f = self.fixtures()
+        api_user = User.objects.create_user(username="benchmark-api")
+        token = Token.objects.create(user=api_user)
+        api = Client(
+            raise_request_exception=False,
+            headers={"Authorization": f"Token {token.key}"},
+        )
+        anonymous = Client(raise_request_exception=False)
+        staff = Client(raise_request_exception=False)
+        staff.force_login(
+            User.objects.create_user(username="benchmark-staff", is_staff=True)
+        )
+
+        def case(kind, name, call):
+            return kind, name, lambda: count_queries(call)
+
+        def get(client, url, **params):
+            return lambda: client.get(url, params)
+
+        def post(client, url, data=None):
+            return lambda: client.post(
+                url, data or {}, content_type="application/json"
+            )
+
+        prayer = f["prayer"].pk
+        for basename, key in (
+            ("prayerinspiration", "inspiration"),
+            ("homepagecontent", "content"),
+            ("location", "location"),
+            ("setting", "setting"),
+            ("prayerresource", "resource"),
+        ):
+            list_url = reverse(f"{basename}-list")
+            detail_url = reverse(f"{basename}-detail", args=[f[key].pk])
+            yield case("api", f"api {basename}-list", get(anonymous, list_url))
+            yield case("api", f"api {basename}-detail", get(anonymous, detail_url))
+
+        feed = reverse("prayerpraiserequest-list")
+        yield case("api", "api prayerpraiserequest-list", get(api, feed))
+        yield case(
+            "api", "api prayerpraiserequest-list page", get(api, feed, page_size=50)
+        )
+        yield case(
+            "api",
+            "api prayerpraiserequest-list location page",
+            get(api, feed, page_size=50, location=f["prayer"].location.slug),
+        )
+        yield case(
+            "api",
+            "api prayerpraiserequest-create",
+            post(
+                api,
+                feed,
+                {
+                    "location": f["prayer"].location_id,
+                    "content": "Please pray for the benchmark",
+                    "user": {"username": "benchmark-submitter"},
+                },
+            ),
+        )
+        detail = reverse("prayerpraiserequest-detail", args=[prayer])
+        yield case("api", "api prayerpraiserequest-detail", get(api, detail))
+        yield case(
+            "api",
+            "api prayerpraiserequest-partial-update",
+            lambda: api.patch(
+                detail, {"name": "Benchmark"}, content_type="application/json"
+            ),
+        )
+        yield case(
+            "api", "api prayerpraiserequest-destroy", lambda: api.delete(detail)
+        )
+        for action in ("increment-prayer-count", "mark-flagged", "attach-to-user"):
+            url = reverse(f"prayerpraiserequest-{action}", args=[prayer])
+            yield case(
+                "api",
+                f"api prayerpraiserequest-{action}",
+                post(api, url, {"username": "benchmark-api"}),
+            )
+        yield case(
+            "api",
+            "api user-profile-user-profile",
+            post(
+                api,
+                reverse("user-profile-user-profile", args=[api_user.pk]),
+                {"username": "benchmark-api"},
+            ),
+        )
+        yield case(
+            "api",
+            "api update-preferences",
+            post(
+                api,
+                reverse("update-preferences"),
+                {"username": "benchmark-api", "enable_digest_notifications": True},
+            ),
+        )
+
+        for name in ("staff-dashboard", "moderation", "flagged", "prayer-response"):
+            yield case("staff", f"staff {name}", get(staff, reverse(name)))
+
+        yield case("task", "task send_moderator_digest", tasks.send_moderator_digest)
+        for frequency in ("daily", "weekly"):
+            yield case(
+                "task",
+                f"task send_user_digest {frequency}",
+                lambda frequency=frequency: tasks.send_user_digest(frequency),
+            )
+        yield case(
+            "task",
+            "task send_response_notification",
+            lambda: tasks.send_response_notification(f["responded"].pk),
+        )
+        yield case(
+            "task", "task send_pending_notifications", tasks.send_pending_notifications
+        )
+        yield case("task", "task flush_prayer_counts", tasks.flush_prayer_counts)
+        yield case("task", "task relay_outbox", tasks.relay_outbox)
+
+    def compare(self, baseline, report):
+        """Print the cases whose query count or median latency changed."""
+        before = baseline.get("results", {})
+        for name, result in report["results"].items():
+            old = before.get(name)
+            if old is None:
+                self.stdout.write(f"{name}: new")
+                continue
+            changes = []
+            if old["queries"] != result["queries"]:
+                changes.append(f"queries {old['queries']} -> {result['queries']}")
+            ratio = result["median_ms"] / max(old["median_ms"], 0.001)
+            if not 0.8 <= ratio <= 1.25:
+                changes.append(
+                    f"median {old['median_ms']}ms -> {result['median_ms']}ms"
+                )
+            if changes:
+                self.stdout.write(
+                    self.style.WARNING(f"{name}: {', '.join(changes)}")
+                )
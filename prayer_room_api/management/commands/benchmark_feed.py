@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from prayer_room_api.benchmarks import format_timings, time_call
+from prayer_room_api.models import PrayerPraiseRequest
+from prayer_room_api.renderers import ORJSONRenderer
+from prayer_room_api.serializers import (
+    PrayerPraiseRequestSerializer,
+    prayer_feed_data,
+    prayer_feed_values,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the prayer feed's serializer path against its .values() fast "
+        "path, from query to rendered JSON. Generate data first with "
+        "generate_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, nargs="+", default=[1000, 10000], metavar="N"
+        )
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        queryset = PrayerPraiseRequest.objects.published().select_related(
+            "location"
+        )
+        available = queryset.count()
+        self.stdout.write(f"{connection.vendor}: {available} published requests\n")
+
+        for rows in options["rows"]:
+            if rows > available:
+                self.stdout.write(
+                    self.style.WARNING(f"{rows} rows: only {available} available")
+                )
+                continue
+            page = queryset.order_by("-created_at", "-id")[:rows]
+
+            def serializer():
+                data = PrayerPraiseRequestSerializer(page.all(), many=True).data
+                return JSONRenderer().render(data)
+
+            def fast_path():
+                return ORJSONRenderer().render(
+                    prayer_feed_data(prayer_feed_values(page.all()))
+                )
+
+            if serializer() != fast_path():
+                raise CommandError(f"{rows} rows: the two paths render differently")
+
+            slow = time_call(serializer, options["repeat"], warmup=1)
+            fast = time_call(fast_path, options["repeat"], warmup=1)
+            speedup = slow["median_ms"] / max(fast["median_ms"], 0.001)
+            self.stdout.write(self.style.SUCCESS(f"{rows} rows: {speedup:.1f}x"))
+            self.stdout.write(f"  serializer: {format_timings(slow)}")
+            self.stdout.write(f"  fast path:  {format_timings(fast)}")
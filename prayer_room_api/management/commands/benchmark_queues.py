@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from prayer_room_api.benchmarks import format_timings, time_call
+from prayer_room_api.models import PrayerPraiseRequest
+
+# Queue name -> (queryset factory, index expected to serve it).
+QUEUES = {
+    "moderation": (
+        lambda: PrayerPraiseRequest.objects.pending_moderation(),
+        "prayer_moderation_queue_idx",
+    ),
+    "flagged": (
+        lambda: PrayerPraiseRequest.objects.flagged_queue(),
+        "prayer_flagged_queue_idx",
+    ),
+    "response": (
+        lambda: PrayerPraiseRequest.objects.awaiting_response(),
+        "prayer_response_queue_idx",
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Explain and time the staff queue queries (moderation, flagged, "
+        "response) on the current database. Generate data first with "
+        "generate_data. The partial indexes are meant for PostgreSQL; plans "
+        "and timings from another database only show how that one behaves."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=25)
+
+    def handle(self, *args, **options):
+        total = PrayerPraiseRequest.objects.count()
+        self.stdout.write(f"{connection.vendor}: {total} prayer requests\n")
+        if connection.vendor != "postgresql":
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Not PostgreSQL: these {connection.vendor} plans and "
+                    "timings say nothing about the production indexes."
+                )
+            )
+
+        page_size = options["page_size"]
+        for name, (queryset, index_name) in QUEUES.items():
+            page = queryset().select_related("location")[:page_size]
+            plan = page.explain()
+            count_plan = queryset().order_by().explain()
+            page_timings = time_call(lambda: list(page.all()), options["repeat"])
+            count_timings = time_call(
+                lambda: queryset().order_by().count(), options["repeat"]
+            )
+
+            if index_name in plan:
+                self.stdout.write(self.style.SUCCESS(f"{name}: uses {index_name}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"{name}: MISSES {index_name}"))
+            self.stdout.write(f"  page:  {format_timings(page_timings)}")
+            self.stdout.write(f"  count: {format_timings(count_timings)}")
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  plan:\n{plan}\n  count plan:\n{count_plan}")
@@ -0,0 +1,99 @@
+from io import BytesIO
+
+import sentry_sdk
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from django.urls import reverse
+from sentry_sdk.profiler.continuous_profiler import teardown_continuous_profiler
+from sentry_sdk.profiler.transaction_profiler import teardown_profiler
+from sentry_sdk.transport import Transport
+
+from prayer_room_api import sentry
+from prayer_room_api.benchmarks import format_timings, time_call
+
+
+class DiscardTransport(Transport):
+    """Counts the envelopes Sentry would send instead of sending them."""
+
+    sent = 0
+
+    def capture_envelope(self, envelope):
+        DiscardTransport.sent += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Time requests through the WSGI handler with Sentry off, tracing and "
+        "profiling every request as we used to, and with the sampling policy "
+        "in sentry.py. Nothing is sent to Sentry. Run in its own process: "
+        "the Sentry client is replaced and left disabled afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        application = get_wsgi_application()
+        urls = [reverse("location-list"), reverse("prayerinspiration-list")]
+        configs = [
+            ("off", None),
+            # Before the continuous profiler, which can't be torn down for
+            # the transaction profiler to start.
+            ("sampled", sentry.init_options()),
+            (
+                "every request",
+                {
+                    "traces_sample_rate": 1.0,
+                    "_experiments": {"continuous_profiling_auto_start": True},
+                },
+            ),
+        ]
+
+        def get(url):
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": url,
+                "SERVER_NAME": "testserver",
+                "SERVER_PORT": "80",
+                "HTTP_HOST": "testserver",
+                "wsgi.url_scheme": "http",
+                "wsgi.input": BytesIO(),
+            }
+            response = application(environ, lambda status, headers: None)
+            b"".join(response)
+            response.close()
+
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                for name, config in configs:
+                    if config is not None:
+                        sentry_sdk.init(
+                            dsn="https://key@sentry.invalid/1",
+                            transport=DiscardTransport,
+                            **config,
+                        )
+                    DiscardTransport.sent = 0
+                    results[name] = time_call(
+                        lambda: [get(url) for url in urls],
+                        options["repeat"],
+                        warmup=10,
+                    )
+                    results[name]["envelopes"] = DiscardTransport.sent
+        finally:
+            teardown_continuous_profiler()
+            teardown_profiler()
+            sentry_sdk.init()
+
+        baseline = results["off"]["median_ms"] / len(urls)
+        self.stdout.write(f"{options['repeat']} x {len(urls)} requests")
+        for name, timings in results.items():
+            per_request = timings.pop("median_ms") / len(urls)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{name}: {per_request:.3f}ms per request, "
+                    f"{per_request - baseline:+.3f}ms over off"
+                )
+            )
+            self.stdout.write(f"  {format_timings(timings)}")
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from prayer_room_api import exports
+from prayer_room_api.forms import PrayerExportForm
+
+
+class Command(BaseCommand):
+    help = (
+        "Write prayer requests as CSV or JSON lines, oldest first, streamed "
+        "in constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=exports.CONTENT_TYPES, default="csv")
+        parser.add_argument("--since", help="First day to include, YYYY-MM-DD.")
+        parser.add_argument("--until", help="Last day to include, YYYY-MM-DD.")
+        parser.add_argument("--location", help="Location id.")
+        parser.add_argument("--status", choices=exports.STATUSES)
+        parser.add_argument(
+            "--output", help="File to write to (default: standard output)."
+        )
+        parser.add_argument("--chunk-size", type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        form = PrayerExportForm(
+            {
+                key: options[key]
+                for key in ("format", "since", "until", "location", "status")
+                if options[key]
+            }
+        )
+        if not form.is_valid():
+            raise CommandError(
+                " ".join(form.errors.get("__all__", []))
+                or "; ".join(
+                    f"--{field}: {' '.join(errors)}"
+                    for field, errors in form.errors.items()
+                )
+            )
+        filters = form.cleaned_data
+        format = filters.pop("format")
+        chunks = exports.export(
+            exports.export_queryset(**filters), format, options["chunk_size"]
+        )
+
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as f:
+                f.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,207 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils.timezone import now
+
+from prayer_room_api import banned_words, caching, rollups
+from prayer_room_api.models import (
+    BannedWord,
+    Location,
+    PrayerPraiseRequest,
+    UserProfile,
+)
+
+SYNTHETIC_PREFIX = "synthetic"
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+WORDS = (
+    "please pray for my family health work exams peace healing hope guidance "
+    "strength friend mother father church school surgery travel grateful "
+    "thankful job interview recovery rest joy comfort wisdom"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a realistic synthetic dataset (locations, users with "
+        "profiles, banned words and prayer requests) for benchmarking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size", choices=SIZES, help="Dataset size (default: 10k)."
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            help="Number of prayer requests, overriding --size.",
+        )
+        parser.add_argument("--locations", type=int, default=8)
+        parser.add_argument(
+            "--users",
+            type=int,
+            help="Number of users (default: one per 20 requests).",
+        )
+        parser.add_argument("--banned-words", type=int, default=50)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete previously generated data (and exit unless --size or "
+            "--requests is given).",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            self.stdout.write(self.clear())
+            if not options["requests"] and not options["size"]:
+                return
+
+        count = options["requests"] or SIZES[options["size"] or "10k"]
+        users = options["users"] or max(1, count // 20)
+        rng = random.Random(options["seed"])
+
+        locations = self.generate_locations(options["locations"])
+        user_ids = self.generate_users(users, rng, options["batch_size"])
+        self.generate_banned_words(options["banned_words"], rng)
+        self.generate_requests(count, locations, user_ids, rng, options)
+
+        created, _ = rollups.rebuild()
+        banned_words.invalidate()
+        caching.bump_model_version(Location)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {count} requests across {len(locations)} locations, "
+                f"{users} users and {options['banned_words']} banned words "
+                f"({created} daily activity rows)."
+            )
+        )
+
+    def generate_locations(self, count):
+        locations = [
+            Location(
+                name=f"Synthetic {i}",
+                slug=f"{SYNTHETIC_PREFIX}-{i}",
+                is_active=i < max(1, count - 1),
+            )
+            for i in range(count)
+        ]
+        return Location.objects.bulk_create(locations)
+
+    def generate_users(self, count, rng, batch_size):
+        # Generated users can't log in, as users created on submission.
+        password = make_password(None)
+        start = User.objects.filter(
+            username__startswith=f"{SYNTHETIC_PREFIX}-user-"
+        ).count()
+        users = [
+            User(
+                username=f"{SYNTHETIC_PREFIX}-user-{start + i}",
+                email=f"{SYNTHETIC_PREFIX}-user-{start + i}@example.com",
+                first_name=rng.choice(WORDS).title(),
+                password=password,
+            )
+            for i in range(count)
+        ]
+        users = User.objects.bulk_create(users, batch_size=batch_size)
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user=user,
+                    enable_digest_notifications=rng.random() < 0.3,
+                    enable_response_notifications=rng.random() < 0.6,
+                )
+                for user in users
+            ],
+            batch_size=batch_size,
+        )
+        return [user.pk for user in users]
+
+    def generate_banned_words(self, count, rng):
+        actions = BannedWord.AutoActionChoices.values
+        BannedWord.objects.bulk_create(
+            [
+                BannedWord(
+                    word=f"{SYNTHETIC_PREFIX}word{i}",
+                    auto_action=rng.choice(actions),
+                    is_active=rng.random() < 0.9,
+                )
+                for i in range(count)
+            ]
+        )
+
+    def generate_requests(self, count, locations, user_ids, rng, options):
+        """
+        Insert ``count`` requests spread over three years with a realistic
+        mix of states: most approved, a few pending, flagged, archived,
+        responded or skipped, and some posted by signed in users.
+        """
+        current = now()
+        span = timedelta(days=3 * 365).total_seconds()
+        batch_size = options["batch_size"]
+        banned = options["banned_words"]
+
+        batch = []
+        for i in range(count):
+            created_at = current - timedelta(seconds=rng.random() * span)
+            words = rng.choices(WORDS, k=rng.randint(5, 40))
+            if banned and rng.random() < 0.01:
+                words.append(f"{SYNTHETIC_PREFIX}word{rng.randrange(banned)}")
+            prayer = PrayerPraiseRequest(
+                location=rng.choice(locations),
+                created_by_id=rng.choice(user_ids) if rng.random() < 0.3 else None,
+                type=rng.choice(PrayerPraiseRequest.PrayerType.values),
+                name=rng.choice(WORDS).title(),
+                content=" ".join(words).capitalize(),
+                created_at=created_at,
+                prayer_count=min(int(rng.paretovariate(1.5)) - 1, 5000),
+            )
+            state = rng.random()
+            if state < 0.02:
+                pass  # Pending moderation
+            elif state < 0.03:
+                prayer.flagged_at = created_at
+            elif state < 0.10:
+                prayer.archived_at = created_at
+            else:
+                prayer.approved_at = created_at
+                if state < 0.40:
+                    prayer.response_comment = "Praying for you"
+                elif state < 0.45:
+                    prayer.response_skipped_at = created_at
+            batch.append(prayer)
+            if len(batch) == batch_size:
+                PrayerPraiseRequest.objects.bulk_create(batch)
+                batch = []
+                self.stdout.write(f"Generated {i + 1}/{count}", ending="\r")
+        PrayerPraiseRequest.objects.bulk_create(batch)
+
+    def clear(self):
+        locations = list(
+            Location.objects.filter(
+                slug__startswith=f"{SYNTHETIC_PREFIX}-"
+            ).values_list("pk", flat=True)
+        )
+        # Generated rows were never signalled, so skip the per-row signals.
+        deleted = 0
+        if locations:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {PrayerPraiseRequest._meta.db_table} "
+                    f"WHERE location_id IN ({', '.join(['%s'] * len(locations))})",
+                    locations,
+                )
+                deleted = cursor.rowcount
+        Location.objects.filter(pk__in=locations).delete()
+        User.objects.filter(username__startswith=f"{SYNTHETIC_PREFIX}-user-").delete()
+        BannedWord.objects.filter(word__startswith=f"{SYNTHETIC_PREFIX}word").delete()
+        rollups.rebuild()
+        return f"Deleted {deleted} generated requests."
@@ -0,0 +1,103 @@
+import time
+from pathlib import Path
+
+import tablib
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+
+from prayer_room_api import rollups
+from prayer_room_api.models import PrayerPraiseRequest
+from prayer_room_api.resources import BulkPrayerRequestResource
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import prayer requests from a CSV or JSON export, such as the "
+        "historic Airtable data, with BulkPrayerRequestResource. Each chunk "
+        "is imported in its own transaction and rolled back if any of its "
+        "rows fail. Rows are bulk created, so no notifications or webhooks "
+        "are sent for them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "json"],
+            help="File format (default: from the file extension).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Rows validated and saved per transaction.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate every row and roll back, without building diffs.",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        format = options["format"] or path.suffix.lstrip(".").lower()
+        if format not in ("csv", "json"):
+            raise CommandError(f"Can't tell the format of {path}, pass --format.")
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            dataset = tablib.Dataset().load(f, format=format)
+
+        resource = BulkPrayerRequestResource()
+        chunk_size = options["chunk_size"]
+        imported = failed = 0
+        start = time.perf_counter()
+        for offset in range(0, len(dataset), chunk_size):
+            chunk = tablib.Dataset(
+                *dataset[offset : offset + chunk_size], headers=dataset.headers
+            )
+            chunk_start = time.perf_counter()
+            result = resource.import_data(
+                chunk,
+                dry_run=options["dry_run"],
+                use_transactions=True,
+                rollback_on_validation_errors=True,
+            )
+            elapsed = time.perf_counter() - chunk_start
+            if result.has_errors() or result.has_validation_errors():
+                failed += len(chunk)
+                self.report_errors(result, offset)
+            else:
+                imported += len(chunk)
+            self.stdout.write(
+                f"Rows {offset + 1}-{offset + len(chunk)}: "
+                f"{len(chunk) / max(elapsed, 1e-9):.0f} rows/s"
+            )
+
+        elapsed = time.perf_counter() - start
+        if imported and not options["dry_run"]:
+            # Explicit ids from the file don't advance the primary key sequence
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [PrayerPraiseRequest]
+                ):
+                    cursor.execute(sql)
+            rollups.rebuild()
+
+        verb = "Validated" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {imported} rows in {elapsed:.1f}s "
+                f"({imported / max(elapsed, 1e-9):.0f} rows/s)."
+            )
+        )
+        if failed:
+            raise CommandError(f"{failed} rows were rolled back, see the errors above.")
+
+    def report_errors(self, result, offset):
+        for error in result.base_errors:
+            self.stderr.write(f"Chunk from row {offset + 1}: {error.error}")
+        for line, errors in result.row_errors():
+            for error in errors:
+                self.stderr.write(f"Row {offset + line}: {error.error}")
+        for invalid in result.invalid_rows:
+            self.stderr.write(f"Row {offset + invalid.number}: {invalid.error_dict}")
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import localdate
+
+from prayer_room_api import rollups
+
+
+class Command(BaseCommand):
+    help = "Backfill and reconcile the DailyActivity rollup from prayer requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Only rebuild the last N days (default: all history).",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["days"]:
+            since = localdate() - timedelta(days=options["days"] - 1)
+
+        created, corrected = rollups.rebuild(since=since)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Daily activity rebuilt: {created} rows created, "
+                f"{corrected} rows corrected."
+            )
+        )
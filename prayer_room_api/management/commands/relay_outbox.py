@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from prayer_room_api import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Relay outbox events to Celery and webhook endpoints, continuously "
+        "(or once with --once). Runs alongside the relay_outbox beat task."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Relay what is pending and exit.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.OUTBOX_RELAY_INTERVAL,
+            help="Seconds to wait between passes when the outbox is empty.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            handled = outbox.relay()
+            if handled:
+                self.stdout.write(f"Relayed {handled} outbox events.")
+            if options["once"]:
+                return
+            if not handled:
+                time.sleep(options["interval"])
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_room_api', '0020_prayerpraiserequest_response_skipped_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prayerpraiserequest',
+            index=models.Index(condition=models.Q(('approved_at__isnull', False), ('archived_at__isnull', True)), fields=['-created_at', '-id'], name='prayer_feed_keyset_idx'),
+        ),
+    ]
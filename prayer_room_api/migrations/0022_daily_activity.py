@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:48
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+# DailyActivity column -> PrayerPraiseRequest timestamp, as of this migration.
+COUNTED_FIELDS = {
+    "submitted": "created_at",
+    "approved": "approved_at",
+    "flagged": "flagged_at",
+    "archived": "archived_at",
+}
+
+
+def backfill_daily_activity(apps, schema_editor):
+    PrayerPraiseRequest = apps.get_model("prayer_room_api", "PrayerPraiseRequest")
+    DailyActivity = apps.get_model("prayer_room_api", "DailyActivity")
+
+    counts = defaultdict(dict)
+    for column, field in COUNTED_FIELDS.items():
+        grouped = (
+            PrayerPraiseRequest.objects.filter(**{f"{field}__isnull": False})
+            .annotate(day=TruncDate(field))
+            .values("day", "location_id")
+            .annotate(n=Count("id"))
+            .values_list("day", "location_id", "n")
+            .order_by()
+        )
+        for day, location_id, n in grouped:
+            counts[(day, location_id)][column] = n
+
+    DailyActivity.objects.bulk_create(
+        DailyActivity(day=day, location_id=location_id, **columns)
+        for (day, location_id), columns in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_room_api', '0021_prayer_feed_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('submitted', models.IntegerField(default=0)),
+                ('approved', models.IntegerField(default=0)),
+                ('flagged', models.IntegerField(default=0)),
+                ('archived', models.IntegerField(default=0)),
+                ('responded', models.IntegerField(default=0)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='prayer_room_api.location')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily activity',
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'location'), name='unique_daily_activity')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_activity, migrations.RunPython.noop),
+    ]
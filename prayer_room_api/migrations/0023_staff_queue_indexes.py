@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_room_api', '0022_daily_activity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prayerpraiserequest',
+            index=models.Index(condition=models.Q(('approved_at__isnull', True), ('archived_at__isnull', True)), fields=['-created_at'], name='prayer_moderation_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prayerpraiserequest',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('flagged_at__isnull', False)), fields=['-flagged_at'], name='prayer_flagged_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prayerpraiserequest',
+            index=models.Index(condition=models.Q(('approved_at__isnull', False), ('archived_at__isnull', True), ('flagged_at__isnull', True), ('response_comment', ''), ('response_skipped_at__isnull', True)), fields=['created_at'], name='prayer_response_queue_idx'),
+        ),
+    ]
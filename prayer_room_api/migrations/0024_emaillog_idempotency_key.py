@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_room_api', '0023_staff_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emaillog',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_room_api', '0024_emaillog_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('response', 'Response added')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('result', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('prayer_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='prayer_room_api.prayerpraiserequest')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='notification_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('prayer_request', 'event_type'), name='unique_notification_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_schedule(apps, schema_editor):
+    IntervalSchedule = apps.get_model("django_celery_beat", "IntervalSchedule")
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+
+    # Outbox relay - every 5 seconds
+    every_five_seconds, _ = IntervalSchedule.objects.get_or_create(
+        every=5,
+        period="seconds",
+    )
+
+    PeriodicTask.objects.update_or_create(
+        name="relay-outbox",
+        defaults={
+            "task": "prayer_room_api.tasks.relay_outbox",
+            "interval": every_five_seconds,
+            "enabled": True,
+        },
+    )
+
+
+def reverse_schedule(apps, schema_editor):
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTask.objects.filter(name="relay-outbox").delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("prayer_room_api", "0026_outbox_event"),
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_schedule, reverse_schedule),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_room_api', '0027_relay_outbox_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bannedword',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
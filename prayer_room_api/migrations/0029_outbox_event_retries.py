@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prayer_room_api', '0028_bannedword_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='outboxevent',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='outbox_pending_idx'),
+        ),
+    ]
@@ -1,7 +1,22 @@
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
 from django.conf import settings
-from django.db import models
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, transaction
+from django.db.models import F
+from django.db.models.sql import UpdateQuery
+from django.dispatch import Signal
 from django.utils.timezone import now
 
+# Sent after a bulk update of prayer requests with ``ids`` (the updated rows),
+# ``fields`` and ``values`` (what was updated), ``previous`` (the snapshot
+# fields of each row before the update, when one of them changed),
+# ``responded_ids`` (rows whose response_comment went from empty to populated)
+# and ``prayer_counts`` (``{id: (location_id, prayer_count)}`` after the update,
+# when prayer_count was updated).
+prayer_requests_updated = Signal()
+
 
 class PrayerInspiration(models.Model):
     verse = models.CharField(max_length=255)
@@ -20,7 +35,209 @@ class Location(models.Model):
         return str(self.name)
 
 
-class PrayerPraiseRequest(models.Model):
+class FieldSnapshotMixin(models.Model):
+    """
+    Remember the database values of ``snapshot_fields`` when a row is loaded,
+    refreshed or saved, so changes can be detected without re-reading the row.
+    """
+
+    snapshot_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot = {
+            field: getattr(instance, field)
+            for field in cls.snapshot_fields
+            if field in field_names
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        snapshot = getattr(self, "_snapshot", {})
+        for field in self.snapshot_fields:
+            name = self._meta.get_field(field).name
+            if update_fields is None or name in update_fields:
+                snapshot[field] = getattr(self, field)
+        self._snapshot = snapshot
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(
+            using=using, fields=fields, from_queryset=from_queryset
+        )
+        deferred = self.get_deferred_fields()
+        snapshot = getattr(self, "_snapshot", {})
+        for field in self.snapshot_fields:
+            model_field = self._meta.get_field(field)
+            if model_field.attname in deferred:
+                continue
+            if fields is None or {field, model_field.name} & set(fields):
+                snapshot[field] = getattr(self, field)
+        self._snapshot = snapshot
+
+    def has_snapshot(self, field):
+        return field in getattr(self, "_snapshot", {})
+
+    def get_snapshot_value(self, field):
+        """The last loaded or saved value of ``field``."""
+        return self._snapshot[field]
+
+
+def supports_update_returning(connection):
+    # MariaDB can return columns from INSERT but not from UPDATE.
+    return (
+        connection.vendor in ("postgresql", "sqlite")
+        and connection.features.can_return_columns_from_insert
+    )
+
+
+# Staff queue predicates, shared by the querysets below and the partial
+# indexes that serve them.
+PENDING_MODERATION = models.Q(approved_at__isnull=True, archived_at__isnull=True)
+FLAGGED_QUEUE = models.Q(flagged_at__isnull=False, archived_at__isnull=True)
+AWAITING_RESPONSE = models.Q(
+    approved_at__isnull=False,
+    flagged_at__isnull=True,
+    archived_at__isnull=True,
+    response_skipped_at__isnull=True,
+    response_comment="",
+)
+
+# Date when prayer responses got launched
+RESPONSES_LAUNCHED_AT = datetime(2025, 12, 15, tzinfo=dt_timezone.utc)
+
+
+class PrayerPraiseRequestQuerySet(models.QuerySet):
+    def published(self):
+        """Requests visible on the public prayer wall."""
+        return self.filter(approved_at__isnull=False, archived_at__isnull=True)
+
+    def pending_moderation(self):
+        """Requests waiting to be approved or denied, newest first."""
+        return self.filter(PENDING_MODERATION).order_by("-created_at")
+
+    def flagged_queue(self):
+        """Flagged requests that haven't been archived, most recent flag first."""
+        return self.filter(FLAGGED_QUEUE).order_by("-flagged_at")
+
+    def awaiting_response(self):
+        """Approved requests with no response yet, oldest first."""
+        return self.filter(
+            AWAITING_RESPONSE, created_at__gte=RESPONSES_LAUNCHED_AT
+        ).order_by("created_at")
+
+    def update_returning(self, returning, **values):
+        """
+        Like ``update(**values)``, but issued as one ``UPDATE ... RETURNING``
+        statement. Returns the ``returning`` columns of every updated row as
+        tuples of raw database values, so keep to ids and plain numbers.
+        """
+        self._for_write = True
+        connection = connections[self.db]
+        if not supports_update_returning(connection):
+            with transaction.atomic(using=self.db):
+                ids = list(self.values_list("pk", flat=True))
+                rows = self.model._default_manager.filter(pk__in=ids)
+                rows.update(**values)
+                return list(rows.values_list(*returning))
+
+        query = self.query.chain(UpdateQuery)
+        query.add_update_values(values)
+        query.annotations = {}
+        query.clear_ordering(force=True)
+        try:
+            sql, params = query.get_compiler(self.db).as_sql()
+        except EmptyResultSet:
+            return []
+        if not sql:
+            return []
+        columns = ", ".join(
+            connection.ops.quote_name(self.model._meta.get_field(name).column)
+            for name in returning
+        )
+        with transaction.mark_for_rollback_on_error(using=self.db):
+            with connection.cursor() as cursor:
+                cursor.execute(f"{sql} RETURNING {columns}", params)
+                return cursor.fetchall()
+
+    def update_with_events(self, **values):
+        """
+        Like ``update(**values)``, but collect the updated ids with
+        ``UPDATE ... RETURNING`` and send ``prayer_requests_updated`` once for
+        the whole set. If a snapshot field changes, the rows' previous values
+        are read (and locked) first so receivers can tell what changed.
+        Returns the list of updated ids.
+        """
+        snapshot_fields = self.model.snapshot_fields
+        tracked = any(
+            self.model._meta.get_field(name).attname in snapshot_fields
+            for name in values
+        )
+        previous = {}
+        with transaction.atomic(using=self.db):
+            queryset = self
+            if tracked:
+                previous = {
+                    row["id"]: row
+                    for row in self.select_for_update()
+                    .order_by()
+                    .values("id", *snapshot_fields)
+                }
+                queryset = self.model._default_manager.filter(pk__in=previous)
+            counted = "prayer_count" in values
+            returning = ["id", "location_id", "prayer_count"] if counted else ["id"]
+            rows = queryset.update_returning(returning, **values)
+            ids = [row[0] for row in rows]
+            prayer_counts = {}
+            if counted:
+                prayer_counts = {pk: (location, count) for pk, location, count in rows}
+            responded_ids = [
+                pk
+                for pk in ids
+                if values.get("response_comment")
+                and not previous[pk]["response_comment"]
+            ]
+            self._send_updated(ids, values, previous, responded_ids, prayer_counts)
+        return ids
+
+    def _send_updated(
+        self, ids, values, previous=None, responded_ids=(), prayer_counts=None
+    ):
+        if ids:
+            prayer_requests_updated.send(
+                sender=self.model,
+                ids=ids,
+                fields=tuple(values),
+                values=values,
+                previous=previous or {},
+                responded_ids=list(responded_ids),
+                prayer_counts=prayer_counts or {},
+                using=self.db,
+            )
+
+    def increment_prayer_count(self, pk, amount=1):
+        """
+        Add ``amount`` to a published request's prayer count in a single
+        statement. Returns the new count, or ``None`` if nothing matched.
+        """
+        values = {"prayer_count": F("prayer_count") + amount, "updated_at": now()}
+        rows = (
+            self.published()
+            .filter(pk=pk)
+            .update_returning(["location_id", "prayer_count"], **values)
+        )
+        if not rows:
+            return None
+        self._send_updated([pk], values, prayer_counts={pk: rows[0]})
+        return rows[0][1]
+
+
+class PrayerPraiseRequest(FieldSnapshotMixin, models.Model):
     class PrayerType(models.TextChoices):
         PRAYER = "prayer", "Prayer"
         PRAISE = "praise", "Praise"
@@ -49,6 +266,45 @@ class PrayerPraiseRequest(models.Model):
     approved_at = models.DateTimeField(null=True, blank=True)
     response_skipped_at = models.DateTimeField(null=True, blank=True)
 
+    objects = PrayerPraiseRequestQuerySet.as_manager()
+
+    snapshot_fields = (
+        "response_comment",
+        "location_id",
+        "created_at",
+        "approved_at",
+        "flagged_at",
+        "archived_at",
+    )
+
+    class Meta:
+        indexes = [
+            # Keyset index for the public prayer wall feed.
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(
+                    approved_at__isnull=False, archived_at__isnull=True
+                ),
+                name="prayer_feed_keyset_idx",
+            ),
+            # Staff queues, each matching its queryset's filter and ordering.
+            models.Index(
+                fields=["-created_at"],
+                condition=PENDING_MODERATION,
+                name="prayer_moderation_queue_idx",
+            ),
+            models.Index(
+                fields=["-flagged_at"],
+                condition=FLAGGED_QUEUE,
+                name="prayer_flagged_queue_idx",
+            ),
+            models.Index(
+                fields=["created_at"],
+                condition=AWAITING_RESPONSE,
+                name="prayer_response_queue_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.name}: {self.content[:10]}"
 
@@ -56,7 +312,39 @@ class PrayerPraiseRequest(models.Model):
         # this is manual until I have imported all the data
         if not self.pk and not self.created_at:
             self.created_at = now()
-        super().save(*args, **kwargs)
+        # Receivers write the notification outbox and activity rollups, which
+        # must commit or roll back with the row itself.
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class DailyActivity(models.Model):
+    """
+    Prayer request activity per day and location, kept up to date by the
+    signals in ``rollups`` and rebuilt by ``manage.py rebuild_daily_activity``.
+    """
+
+    day = models.DateField()
+    location = models.ForeignKey(
+        Location, on_delete=models.CASCADE, related_name="daily_activity"
+    )
+    submitted = models.IntegerField(default=0)
+    approved = models.IntegerField(default=0)
+    flagged = models.IntegerField(default=0)
+    archived = models.IntegerField(default=0)
+    responded = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["day"]
+        verbose_name_plural = "Daily activity"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "location"], name="unique_daily_activity"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.location}"
 
 
 class HomePageContent(models.Model):
@@ -92,6 +380,7 @@ class BannedWord(models.Model):
         default=AutoActionChoices.flag,
     )
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
 
 class EmailTemplate(models.Model):
@@ -158,6 +447,10 @@ class EmailLog(models.Model):
     error_message = models.TextField(blank=True)
     sent_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set for digest emails so a retried send skips recipients already emailed.
+    idempotency_key = models.CharField(
+        max_length=255, unique=True, null=True, blank=True
+    )
 
     class Meta:
         ordering = ["-created_at"]
@@ -168,6 +461,95 @@ class EmailLog(models.Model):
         return f"{self.recipient_email} - {self.subject[:30]}"
 
 
+class OutboxEvent(models.Model):
+    """
+    Work published in a transaction, waiting for the outbox relay. Events
+    are deleted once handled, and kept as failed after too many attempts.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        FAILED = "failed", "Failed"
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Not claimed before then: backoff after a failure, or a claim in progress
+    next_attempt_at = models.DateTimeField(default=now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["pk"]
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(status="pending"),
+                name="outbox_pending_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk}"
+
+
+class Notification(models.Model):
+    """
+    Outbox of notifications owed for a prayer request. Rows are written with
+    the change that causes them and claimed by the sending task, and the
+    unique event per request means each notification is sent at most once.
+    """
+
+    class EventType(models.TextChoices):
+        RESPONSE = "response", "Response added"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        SKIPPED = "skipped", "Skipped"
+        FAILED = "failed", "Failed"
+
+    prayer_request = models.ForeignKey(
+        PrayerPraiseRequest,
+        on_delete=models.CASCADE,
+        related_name="notifications",
+    )
+    event_type = models.CharField(max_length=20, choices=EventType.choices)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    result = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["prayer_request", "event_type"],
+                name="unique_notification_event",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(status="pending"),
+                name="notification_pending_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} for {self.prayer_request_id}"
+
+
 class PrayerResource(models.Model):
     class ResourceType(models.TextChoices):
         SECTION = "section", "Section"
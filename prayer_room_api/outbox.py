@@ -0,0 +1,117 @@
+"""
+Transactional outbox for work handed to Celery and webhook endpoints.
+
+``publish()`` writes an ``OutboxEvent`` in the caller's transaction, so the
+work is only ever seen once the change that caused it has committed, and a
+rolled back change leaves nothing behind. Nothing talks to the broker on the
+request path.
+
+``relay()`` claims due events in batches with ``SELECT ... FOR UPDATE
+SKIP LOCKED``, pushing their ``next_attempt_at`` past ``CLAIM_TIMEOUT`` so no
+other relay picks them up, and commits the claim before handing each topic's
+payloads to its handler in one call. Handled events are deleted. It runs from
+the ``relay_outbox`` task on a beat schedule, or continuously with
+``manage.py relay_outbox``; any number of relays can run side by side.
+
+Events whose handler fails are retried after ``OUTBOX_RETRY_DELAY`` seconds,
+doubling with each attempt, and marked failed once they reach
+``OUTBOX_MAX_ATTEMPTS``, or straight away for a topic with no handler. A
+relay that dies mid-batch leaves its claim to expire, so delivery is at least
+once.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS = "notifications"
+WEBHOOKS = "webhooks"
+
+BATCH_SIZE = 500
+
+# How long a relay has to handle the events it claimed.
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def _handlers():
+    from . import tasks, webhooks
+
+    return {
+        NOTIFICATIONS: lambda payloads: tasks.send_pending_notifications.delay(),
+        WEBHOOKS: webhooks.deliver,
+    }
+
+
+def publish(topic, payload=None):
+    """Add an event for ``topic`` to the outbox in the current transaction."""
+    OutboxEvent.objects.create(topic=topic, payload=payload or {})
+
+
+def publish_many(topic, payloads):
+    OutboxEvent.objects.bulk_create(
+        [OutboxEvent(topic=topic, payload=payload) for payload in payloads]
+    )
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Claim up to ``batch_size`` due events, counting the attempt."""
+    with transaction.atomic():
+        claimed = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEvent.Status.PENDING, next_attempt_at__lte=now())
+            .order_by("pk")[:batch_size]
+        )
+        for event in claimed:
+            event.attempts += 1
+            event.next_attempt_at = now() + CLAIM_TIMEOUT
+        OutboxEvent.objects.bulk_update(claimed, ["attempts", "next_attempt_at"])
+    return claimed
+
+
+def fail(events, error, retry=True):
+    """Record ``error`` and schedule a retry, or give up on the events."""
+    for event in events:
+        event.last_error = error
+        if retry and event.attempts < settings.OUTBOX_MAX_ATTEMPTS:
+            delay = settings.OUTBOX_RETRY_DELAY * 2 ** (event.attempts - 1)
+            event.next_attempt_at = now() + timedelta(seconds=delay)
+        else:
+            event.status = OutboxEvent.Status.FAILED
+    OutboxEvent.objects.bulk_update(
+        events, ["status", "last_error", "next_attempt_at"]
+    )
+
+
+def relay(batch_size=BATCH_SIZE):
+    """Hand every due event to its handler. Returns the number handled."""
+    handlers = _handlers()
+    handled = 0
+    while claimed := claim(batch_size):
+        by_topic = defaultdict(list)
+        for event in claimed:
+            by_topic[event.topic].append(event)
+
+        for topic, events in by_topic.items():
+            if topic not in handlers:
+                logger.error(f"No outbox handler for {topic!r}")
+                fail(events, f"No handler for {topic!r}", retry=False)
+                continue
+            try:
+                handlers[topic]([event.payload for event in events])
+            except Exception as e:
+                logger.exception(f"Outbox handler for {topic!r} failed")
+                fail(events, str(e))
+            else:
+                OutboxEvent.objects.filter(pk__in=[e.pk for e in events]).delete()
+                handled += len(events)
+        if len(claimed) < batch_size:
+            break
+    return handled
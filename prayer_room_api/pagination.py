@@ -0,0 +1,155 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PrayerFeedPagination(BasePagination):
+    """
+    Keyset pagination for the prayer wall, ordered on ``(-created_at, -id)``.
+
+    The cursor encodes the ``(created_at, id)`` of a row, so every page is a
+    range scan on the matching index no matter how deep the client has paged.
+    ``?since_cursor=`` returns only the rows newer than the given cursor, which
+    lets the frontend poll for new prayers without refetching the wall.
+
+    Pagination is opt-in: requests without any of the pagination parameters
+    get the full list, as existing clients expect.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    since_query_param = "since_cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_query = self.get_page_query(queryset, request)
+        if page_query is None:
+            return None
+        return self.set_page(list(page_query))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, fetching with ``async for``."""
+        page_query = self.get_page_query(queryset, request)
+        if page_query is None:
+            return None
+        return self.set_page([row async for row in page_query])
+
+    def get_page_query(self, queryset, request):
+        """The unevaluated queryset for the requested page, or ``None``."""
+        params = request.query_params
+        if not any(
+            param in params
+            for param in (
+                self.cursor_query_param,
+                self.since_query_param,
+                self.page_size_query_param,
+            )
+        ):
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        self.since = params.get(self.since_query_param)
+        if self.since:
+            created_at, pk = self.decode_cursor(self.since)
+            newer = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            )
+            # Take the oldest unseen rows first so a client catching up after
+            # a burst never skips any; it keeps polling while has_more is set.
+            return newer.reverse()[: self.page_size + 1]
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, rows):
+        """Trim the fetched ``rows`` to a page and work out the links."""
+        self.has_more = len(rows) > self.page_size
+        if self.since:
+            self.page = rows[: self.page_size][::-1]
+            self.since_cursor = (
+                self.encode_cursor(self.page[0]) if self.page else self.since
+            )
+            self.next_url = (
+                replace_query_param(
+                    self.base_url, self.since_query_param, self.since_cursor
+                )
+                if self.has_more
+                else None
+            )
+            return self.page
+
+        self.page = rows[: self.page_size]
+        self.since_cursor = self.encode_cursor(self.page[0]) if self.page else None
+        self.next_url = (
+            replace_query_param(
+                remove_query_param(self.base_url, self.since_query_param),
+                self.cursor_query_param,
+                self.encode_cursor(self.page[-1]),
+            )
+            if self.has_more
+            else None
+        )
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.next_url,
+                "since_cursor": self.since_cursor,
+                "has_more": self.has_more,
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "since_cursor": {"type": "string", "nullable": True},
+                "has_more": {"type": "boolean"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, instance):
+        if isinstance(instance, dict):
+            created_at, pk = instance["created_at"], instance["id"]
+        else:
+            created_at, pk = instance.created_at, instance.pk
+        value = f"{created_at.isoformat()}|{pk}"
+        return urlsafe_b64encode(value.encode("ascii")).decode("ascii")
+
+    def decode_cursor(self, cursor):
+        try:
+            value = urlsafe_b64decode(cursor.encode("ascii")).decode("ascii")
+            created_at, pk = value.rsplit("|", 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
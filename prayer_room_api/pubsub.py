@@ -0,0 +1,220 @@
+"""
+Live prayer wall events.
+
+Events are small dicts, ``{"type", "location", "data"}``, published once the
+transaction that caused them commits and fanned out to every stream open in
+the process. Each stream is just a bounded queue on the event loop, so an
+idle client costs a queue and a periodic keepalive.
+
+``PUBSUB_BACKEND`` picks how events travel between processes:
+
+``local``
+    In-process only, for tests and single-process servers.
+``postgres``
+    ``NOTIFY`` on publish. Each process keeps one ``LISTEN`` connection,
+    opened with its first stream, however many streams it serves.
+
+``EventSource`` can't send headers, so a client without a session opens its
+stream with a signed token from ``make_stream_token()``. It is only valid for
+``STREAM_TOKEN_MAX_AGE`` seconds, unlike an API token, since URLs end up in
+access logs.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+from functools import partial
+
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "prayer_wall"
+
+# Events buffered per stream; a client this far behind misses events.
+QUEUE_SIZE = 100
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_NOTIFY_BYTES = 7900
+
+STREAM_TOKEN_SALT = "prayer_room_api.pubsub.stream"
+
+
+class Hub:
+    """Subscriber queues, each fed on the event loop that reads it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put, queue, event)
+            except RuntimeError:
+                # The loop has closed under an abandoned stream.
+                self.unsubscribe(queue)
+
+
+def _put(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        pass
+
+
+hub = Hub()
+
+
+class LocalBackend:
+    def publish(self, event):
+        hub.dispatch(event)
+
+    def is_active(self):
+        # Only streams in this process can hear us.
+        return bool(hub)
+
+    async def start(self):
+        pass
+
+
+class PostgresBackend:
+    def __init__(self):
+        self._listener = None
+
+    def publish(self, event):
+        payload = json.dumps(event, cls=DjangoJSONEncoder)
+        if len(payload.encode()) > MAX_NOTIFY_BYTES:
+            # Too big to notify; clients fetch the request by id instead.
+            payload = json.dumps(
+                {
+                    "type": event["type"],
+                    "location": event["location"],
+                    "data": {"id": event["data"]["id"], "truncated": True},
+                }
+            )
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+
+    def is_active(self):
+        # Streams may be open in other processes.
+        return True
+
+    async def start(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    _conninfo(), autocommit=True
+                ) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    async for notify in conn.notifies():
+                        hub.dispatch(json.loads(notify.payload))
+            except Exception:
+                logger.exception("Prayer wall listener failed, reconnecting")
+                await asyncio.sleep(1)
+
+
+def _conninfo():
+    from psycopg.conninfo import make_conninfo
+
+    db = settings.DATABASES["default"]
+    params = {
+        "dbname": db["NAME"],
+        "user": db.get("USER"),
+        "password": db.get("PASSWORD"),
+        "host": db.get("HOST"),
+        "port": db.get("PORT"),
+    }
+    return make_conninfo(**{key: value for key, value in params.items() if value})
+
+
+BACKENDS = {"local": LocalBackend, "postgres": PostgresBackend}
+_backends = {}
+
+
+def get_backend():
+    name = settings.PUBSUB_BACKEND
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+
+def is_active():
+    """Whether anything could be listening for events right now."""
+    return get_backend().is_active()
+
+
+def publish(event):
+    """Publish ``event`` once the current transaction commits."""
+    transaction.on_commit(partial(get_backend().publish, event))
+
+
+@asynccontextmanager
+async def subscription():
+    """An ``asyncio.Queue`` receiving every event until the block exits."""
+    await get_backend().start()
+    queue = hub.subscribe()
+    try:
+        yield queue
+    finally:
+        hub.unsubscribe(queue)
+
+
+def prayer_event(prayer):
+    """A newly published request, as the prayer request API shows it."""
+    from .serializers import PrayerPraiseRequestSerializer
+
+    data = PrayerPraiseRequestSerializer(prayer).data
+    return {
+        "type": "prayer",
+        "location": prayer.location_id,
+        "data": json.loads(json.dumps(data, cls=DjangoJSONEncoder)),
+    }
+
+
+def prayer_count_event(pk, location_id, prayer_count):
+    return {
+        "type": "prayer_count",
+        "location": location_id,
+        "data": {"id": pk, "prayer_count": prayer_count},
+    }
+
+
+def make_stream_token(user):
+    """A short-lived token opening a stream as ``user``, see ``read_stream_token``."""
+    return signing.TimestampSigner(salt=STREAM_TOKEN_SALT).sign(str(user.pk))
+
+
+def read_stream_token(token):
+    """The user id signed into ``token``, or None if it's invalid or expired."""
+    signer = signing.TimestampSigner(salt=STREAM_TOKEN_SALT)
+    try:
+        return int(signer.unsign(token, max_age=settings.STREAM_TOKEN_MAX_AGE))
+    except (signing.BadSignature, ValueError):
+        return None
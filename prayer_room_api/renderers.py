@@ -0,0 +1,35 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` output, byte for byte, encoded with orjson.
+
+    Datetimes, lazy strings and the like go through DRF's encoder as usual;
+    indented output and anything orjson can't encode are left to
+    ``JSONRenderer``. The API's payloads carry no floats, whose formatting
+    is the one place the two encoders could disagree.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # As JSONRenderer, keep the output a strict javascript subset.
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
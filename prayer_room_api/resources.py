@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from dateutil import parser
 from django.utils.timezone import now
 from import_export import resources, fields
@@ -6,6 +8,30 @@ from import_export.widgets import ForeignKeyWidget, DateTimeWidget
 
 from .models import PrayerPraiseRequest, Location
 
+# Tried in turn before falling back to dateutil. Airtable writes dates day
+# first, as in the flagged column.
+CREATED_AT_FORMATS = ("%d/%m/%Y %I:%M%p", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+
+def parse_created_at(value):
+    """
+    Parse an export's ``created_at`` for ``BulkPrayerRequestResource``. ISO
+    dates are read as such; anything else is read day first, so "3/1/2025" is
+    3 January. The admin's ``PrayerRequestResource`` keeps dateutil's month
+    first default.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for format in CREATED_AT_FORMATS:
+        try:
+            return datetime.strptime(value, format)
+        except ValueError:
+            pass
+    return parser.parse(value, dayfirst=True)
+
+
 class PrayerRequestResource(resources.ModelResource):
     location = fields.Field(
         column_name='Location',
@@ -50,3 +76,55 @@ class PrayerRequestResource(resources.ModelResource):
         if row['Archived'] == "checked":
             row['archived_at'] = now()
         row['created_at'] = parser.parse(row['created_at']).isoformat()
+
+
+class LocationNameWidget(ForeignKeyWidget):
+    """Resolves locations by name from a dict rather than a query per row."""
+
+    def __init__(self, **kwargs):
+        super().__init__(Location, field="name", **kwargs)
+        self.locations = {}
+
+    def clean(self, value, row=None, **kwargs):
+        if not value:
+            return None
+        try:
+            return self.locations[value]
+        except KeyError:
+            raise Location.DoesNotExist(f"Location {value!r} does not exist")
+
+
+class BulkPrayerRequestResource(PrayerRequestResource):
+    """
+    ``PrayerRequestResource`` for large historic imports: locations are
+    loaded once, dates parsed with fixed formats first, and new rows saved
+    with ``bulk_create`` without diffs, so signals don't fire and existing
+    rows are never updated.
+
+    As that skips the signals, it's only used by ``manage.py
+    import_prayer_requests``, which rebuilds the activity rollups and resets
+    the id sequence afterwards.
+    """
+
+    location = fields.Field(
+        column_name="Location", attribute="location", widget=LocationNameWidget()
+    )
+
+    class Meta(PrayerRequestResource.Meta):
+        # Rows are always created; ids in the file are kept if given
+        import_id_fields = []
+        use_bulk = True
+        batch_size = 1000
+        force_init_instance = True
+        skip_diff = True
+
+    def before_import(self, dataset, **kwargs):
+        self.imported_at = now()
+        self.fields["location"].widget.locations = {
+            location.name: location for location in Location.objects.all()
+        }
+
+    def before_import_row(self, row, **kwargs):
+        if row.get("Archived") == "checked":
+            row["archived_at"] = self.imported_at
+        row["created_at"] = parse_created_at(row["created_at"])
@@ -0,0 +1,161 @@
+"""
+Daily activity rollup.
+
+``DailyActivity`` holds, per day and location, how many requests were
+submitted, approved, flagged and archived (bucketed on the matching timestamp)
+and how many were given their first response. Saves, deletes and bulk updates
+adjust the affected rows with one ``UPDATE`` per (day, location), so the
+dashboard charts read a handful of rows however long the history.
+
+Changes the signals can't see (raw SQL, ``F()`` timestamps) are corrected by
+``rebuild()``, which recounts everything except ``responded``: there is no
+response timestamp to recount it from.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils.timezone import localdate
+
+from .models import DailyActivity, PrayerPraiseRequest
+
+# DailyActivity column -> PrayerPraiseRequest timestamp it is bucketed on.
+COUNTED_FIELDS = {
+    "submitted": "created_at",
+    "approved": "approved_at",
+    "flagged": "flagged_at",
+    "archived": "archived_at",
+}
+
+
+def _is_expression(value):
+    return hasattr(value, "resolve_expression")
+
+
+def _contributions(row):
+    """The (day, location_id, column) buckets a request with ``row`` counts in."""
+    return Counter(
+        (localdate(row[field]), row["location_id"], column)
+        for column, field in COUNTED_FIELDS.items()
+        if row.get(field) and not _is_expression(row[field])
+    )
+
+
+def _deltas(old, new):
+    deltas = Counter(_contributions(new))
+    deltas.subtract(_contributions(old))
+    return deltas
+
+
+def _row(instance):
+    return {field: getattr(instance, field) for field in instance.snapshot_fields}
+
+
+def apply(deltas):
+    """Add ``{(day, location_id, column): n}`` to the rollup."""
+    by_row = defaultdict(dict)
+    for (day, location_id, column), n in deltas.items():
+        if n:
+            by_row[(day, location_id)][column] = n
+
+    for (day, location_id), counts in by_row.items():
+        rows = DailyActivity.objects.filter(day=day, location_id=location_id)
+        updates = {column: F(column) + n for column, n in counts.items()}
+        if rows.update(**updates):
+            continue
+        try:
+            with transaction.atomic():
+                DailyActivity.objects.create(
+                    day=day,
+                    location_id=location_id,
+                    **{column: max(n, 0) for column, n in counts.items()},
+                )
+        except IntegrityError:
+            # Created concurrently.
+            rows.update(**updates)
+
+
+def record_save(instance, created):
+    new = _row(instance)
+    if created:
+        apply(_deltas({}, new))
+        return
+
+    if not all(instance.has_snapshot(field) for field in instance.snapshot_fields):
+        return  # Not loaded from the database; rebuild() reconciles.
+    old = {field: instance.get_snapshot_value(field) for field in new}
+    deltas = _deltas(old, new)
+    if not old["response_comment"] and new["response_comment"]:
+        deltas[(localdate(), new["location_id"], "responded")] += 1
+    apply(deltas)
+
+
+def record_delete(instance):
+    apply(_deltas(_row(instance), {}))
+
+
+def record_bulk_update(ids, values, previous, responded_ids):
+    if not previous:
+        return
+    changes = {
+        PrayerPraiseRequest._meta.get_field(name).attname: value
+        for name, value in values.items()
+    }
+    deltas = Counter()
+    for pk in ids:
+        old = previous[pk]
+        new = {**old, **changes}
+        deltas.update(_deltas(old, new))
+    today = localdate()
+    for pk in responded_ids:
+        location_id = changes.get("location_id", previous[pk]["location_id"])
+        deltas[(today, location_id, "responded")] += 1
+    apply(deltas)
+
+
+def rebuild(since=None):
+    """
+    Recount the rollup from the requests table, from ``since`` (a date) or
+    for all time. ``responded`` is left as it is. Returns the number of rows
+    created and corrected.
+    """
+    counts = defaultdict(dict)
+    for column, field in COUNTED_FIELDS.items():
+        requests = PrayerPraiseRequest.objects.filter(**{f"{field}__isnull": False})
+        if since:
+            requests = requests.filter(**{f"{field}__date__gte": since})
+        grouped = (
+            requests.annotate(day=TruncDate(field))
+            .values("day", "location_id")
+            .annotate(n=Count("id"))
+            .values_list("day", "location_id", "n")
+            .order_by()
+        )
+        for day, location_id, n in grouped:
+            counts[(day, location_id)][column] = n
+
+    with transaction.atomic():
+        existing = DailyActivity.objects.select_for_update()
+        if since:
+            existing = existing.filter(day__gte=since)
+        existing = {(row.day, row.location_id): row for row in existing}
+
+        corrected = []
+        for key, row in existing.items():
+            expected = counts.pop(key, {})
+            changed = False
+            for column in COUNTED_FIELDS:
+                if getattr(row, column) != expected.get(column, 0):
+                    setattr(row, column, expected.get(column, 0))
+                    changed = True
+            if changed:
+                corrected.append(row)
+        DailyActivity.objects.bulk_update(corrected, list(COUNTED_FIELDS))
+
+        created = DailyActivity.objects.bulk_create(
+            DailyActivity(day=day, location_id=location_id, **columns)
+            for (day, location_id), columns in counts.items()
+        )
+    return len(created), len(corrected)
@@ -0,0 +1,241 @@
+"""
+Sentry trace and profile sampling.
+
+Tracing every request and task costs each of them Sentry's span bookkeeping
+whether or not anyone reads the trace. ``traces_sampler`` instead samples
+each request path or Celery task name at the rate of the first matching
+rule, falling back to ``SENTRY_TRACES_SAMPLE_RATE``. A route or task that
+fails or runs slowly is sampled at ``SENTRY_UPSAMPLE_RATE`` for the next
+``SENTRY_UPSAMPLE_SECONDS``, so there are traces to look at while
+something is wrong. Profiles are taken for a share of the sampled traces
+rather than continuously.
+
+Sentry is initialised at the top of settings.py, before the settings class
+exists, so everything here is configured from the environment:
+
+``SENTRY_TRACES_RULES``
+    Extra ``pattern=rate`` rules, comma separated, checked before
+    ``DEFAULT_RULES``. Patterns are shell-style, matched against the path
+    or the task name.
+``SENTRY_SLOW_REQUEST_MS`` / ``SENTRY_SLOW_TASK_MS``
+    How long a request or task may take before its route is upsampled.
+
+Events and transactions also have secrets in request query strings, such as
+the live prayer wall's stream ``token``, filtered out before they are sent.
+"""
+
+import logging
+import os
+import re
+import time
+from fnmatch import fnmatchcase
+from urllib.parse import parse_qsl, urlencode
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+# First match wins.
+DEFAULT_RULES = (
+    # Server-sent event connections stay open for minutes
+    ("/api/prayer-requests/stream/", 0.0),
+    ("/static/*", 0.0),
+    # Every tap on "I prayed" and the flushes and relays that follow it
+    ("/api/prayer-requests/*/increment_prayer_count/", 0.01),
+    ("prayer_room_api.tasks.flush_prayer_counts", 0.01),
+    ("prayer_room_api.tasks.relay_outbox", 0.01),
+    # Rare and slow, so always worth a trace
+    ("prayer_room_api.tasks.send_*digest*", 1.0),
+)
+
+# Query parameters whose values are never sent to Sentry.
+SECRET_QUERY_PARAMS = frozenset({"token"})
+
+_ID = re.compile(r"/\d+(?=/)")
+
+
+def _float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def parse_rules(value):
+    """
+    ``"pattern=rate,..."`` as ``(pattern, rate)`` pairs. Malformed rules are
+    logged and skipped rather than stopping the app from starting.
+    """
+    rules = []
+    for rule in filter(None, (part.strip() for part in value.split(","))):
+        pattern, _, rate = rule.rpartition("=")
+        try:
+            if not pattern.strip():
+                raise ValueError("no pattern")
+            rules.append((pattern.strip(), float(rate)))
+        except ValueError:
+            logger.warning(f"Skipping invalid SENTRY_TRACES_RULES entry {rule!r}")
+    return tuple(rules)
+
+
+class TracesSampler:
+    def __init__(
+        self,
+        rules=DEFAULT_RULES,
+        default_rate=0.1,
+        upsample_rate=1.0,
+        upsample_seconds=300,
+        slow_request_ms=1000,
+        slow_task_ms=30_000,
+    ):
+        self.rules = tuple(rules)
+        self.default_rate = default_rate
+        self.upsample_rate = upsample_rate
+        self.upsample_seconds = upsample_seconds
+        self.slow_request_ms = slow_request_ms
+        self.slow_task_ms = slow_task_ms
+        # Key -> time.monotonic() until which it is upsampled
+        self.upsampled = {}
+
+    @classmethod
+    def from_environ(cls):
+        return cls(
+            rules=parse_rules(os.environ.get("SENTRY_TRACES_RULES", ""))
+            + DEFAULT_RULES,
+            default_rate=_float("SENTRY_TRACES_SAMPLE_RATE", 0.1),
+            upsample_rate=_float("SENTRY_UPSAMPLE_RATE", 1.0),
+            upsample_seconds=_float("SENTRY_UPSAMPLE_SECONDS", 300),
+            slow_request_ms=_float("SENTRY_SLOW_REQUEST_MS", 1000),
+            slow_task_ms=_float("SENTRY_SLOW_TASK_MS", 30_000),
+        )
+
+    def match(self, name):
+        """``(key, rate)`` for a path or task name."""
+        for pattern, rate in self.rules:
+            if fnmatchcase(name, pattern):
+                return pattern, rate
+        # Collapse ids so that each route is upsampled as a whole
+        return _ID.sub("/*", name), self.default_rate
+
+    def __call__(self, sampling_context):
+        # Follow the caller's decision so that distributed traces are whole
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+        name = self.name(sampling_context)
+        if name is None:
+            return self.default_rate
+        key, rate = self.match(name)
+        until = self.upsampled.get(key)
+        if until is not None:
+            if time.monotonic() < until:
+                return max(rate, self.upsample_rate)
+            self.upsampled.pop(key, None)
+        return rate
+
+    def name(self, sampling_context):
+        if "wsgi_environ" in sampling_context:
+            return sampling_context["wsgi_environ"].get("PATH_INFO")
+        if "asgi_scope" in sampling_context:
+            return sampling_context["asgi_scope"].get("path")
+        if "celery_job" in sampling_context:
+            return sampling_context["celery_job"].get("task")
+        return None
+
+    def upsample(self, name):
+        key, _ = self.match(name)
+        now = time.monotonic()
+        if len(self.upsampled) >= 1000:
+            # Don't let one-off paths grow the map without bound
+            self.upsampled = {
+                key: until for key, until in self.upsampled.items() if until > now
+            }
+        self.upsampled[key] = now + self.upsample_seconds
+
+    def observe_request(self, path, status, duration_ms):
+        if status >= 500 or duration_ms >= self.slow_request_ms:
+            self.upsample(path)
+
+    def observe_task(self, name, failed, duration_ms):
+        if failed or duration_ms >= self.slow_task_ms:
+            self.upsample(name)
+
+
+sampler = TracesSampler.from_environ()
+
+
+def scrub_query_string(event, hint):
+    """Filter ``SECRET_QUERY_PARAMS`` out of an event's request."""
+    request = event.get("request") or {}
+    if query_string := request.get("query_string"):
+        request["query_string"] = urlencode(
+            [
+                (name, "[Filtered]" if name in SECRET_QUERY_PARAMS else value)
+                for name, value in parse_qsl(query_string, keep_blank_values=True)
+            ]
+        )
+    return event
+
+
+def init_options():
+    """Keyword arguments for ``sentry_sdk.init``: sampling and scrubbing."""
+    return {
+        "traces_sampler": sampler,
+        "before_send": scrub_query_string,
+        "before_send_transaction": scrub_query_string,
+        # Relative to sampled traces, so profiling follows trace sampling
+        "profiles_sample_rate": _float("SENTRY_PROFILES_SAMPLE_RATE", 1.0),
+    }
+
+
+class SentrySamplingMiddleware:
+    """Upsample routes that return server errors or respond slowly."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not os.environ.get("SENTRY_DSN"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, start)
+        return response
+
+    def observe(self, request, response, start):
+        duration_ms = (time.perf_counter() - start) * 1000
+        sampler.observe_request(request.path_info, response.status_code, duration_ms)
+
+
+_task_starts = {}
+
+
+def _task_prerun(task_id=None, **kwargs):
+    _task_starts[task_id] = time.perf_counter()
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    start = _task_starts.pop(task_id, None)
+    if start is not None and task is not None:
+        sampler.observe_task(
+            task.name, state == "FAILURE", (time.perf_counter() - start) * 1000
+        )
+
+
+def connect_task_signals():
+    """Upsample Celery tasks that fail or run slowly."""
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_task_prerun, weak=False)
+    task_postrun.connect(_task_postrun, weak=False)
@@ -1,7 +1,13 @@
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import F
 from django.utils import timezone
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
+from . import banned_words, caching
 from .models import (
     BannedWord,
     HomePageContent,
@@ -40,8 +46,76 @@ class LocationSerializer(serializers.ModelSerializer):
         fields = ("name", "slug", "id")
 
 
+def active_locations():
+    """
+    ``{id: (name, slug)}`` for every active location, cached until any
+    location is saved or deleted, or for ``LOCAL_CACHE_TIMEOUT`` seconds
+    when the cache isn't shared between processes.
+    """
+    key = f"prayer_room_api:active_locations:{caching.model_version(Location)}"
+    locations = cache.get(key)
+    if locations is None:
+        locations = {
+            pk: (name, slug)
+            for pk, name, slug in Location.objects.filter(is_active=True)
+            .values_list("id", "name", "slug")
+        }
+        cache.set(
+            key, locations, timeout=caching.timeout(settings.API_CACHE_TIMEOUT)
+        )
+    return locations
+
+
+class ActiveLocationField(serializers.PrimaryKeyRelatedField):
+    """
+    A location id, checked against ``active_locations()`` rather than
+    looked up in the database. Ids missing from the map are looked up, as
+    they may have been added since it was cached.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", Location.objects.filter(is_active=True))
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            name, slug = active_locations()[pk]
+        except KeyError:
+            location = (
+                self.get_queryset().filter(pk=pk).values_list("name", "slug").first()
+            )
+            if location is None:
+                self.fail("does_not_exist", pk_value=data)
+            name, slug = location
+        return Location.from_db(
+            None, ["id", "name", "slug", "is_active"], [pk, name, slug, True]
+        )
+
+
+def get_or_create_submitter(username, email="", first_name=""):
+    """
+    The user a submission is linked to, created without a usable password
+    on first use: one query for a returning user.
+    """
+    user, _ = User.objects.get_or_create(
+        username=User.normalize_username(username),
+        defaults={
+            "email": User.objects.normalize_email(email),
+            "first_name": first_name,
+            "password": make_password(None),
+        },
+    )
+    return user
+
+
 class PrayerPraiseRequestSerializer(serializers.ModelSerializer):
-    location = serializers.PrimaryKeyRelatedField(queryset=Location.objects.all())
+    location = ActiveLocationField()
     location_name = serializers.SlugRelatedField(
         source="location", slug_field="name", read_only=True
     )
@@ -82,17 +156,12 @@ class PrayerPraiseRequestSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         if request:
             user_data = request.data.get("user") or {}
-            username = user_data.get("username")
-            try:
-                user = User.objects.get(username=username)
-            except User.DoesNotExist:
-                if username:
-                    # If user does not exist, create a new user
-                    email = request.data.get("user", {}).get("email", "")
-                    first_name = request.data.get("user", {}).get("name", "")
-                    user = User.objects.create_user(
-                        username, email, None, first_name=first_name
-                    )
+            if username := user_data.get("username"):
+                user = get_or_create_submitter(
+                    username,
+                    email=user_data.get("email", ""),
+                    first_name=user_data.get("name", ""),
+                )
             validated_data["created_by"] = user
         # Leave blank if not provided / signed in
         return super().create(validated_data)
@@ -100,28 +169,92 @@ class PrayerPraiseRequestSerializer(serializers.ModelSerializer):
     def get_is_approved(self, obj):
         return bool(obj.approved_at)
 
-    def _auto_action(self, choice, text):
-        queryset = BannedWord.objects.filter(auto_action=choice).values_list(
-            "word", flat=True
-        )
-        if any(word.lower() in text for word in queryset):
-            return timezone.now()
-        return None
-
     def validate(self, attrs):
-        text_lower = attrs["content"].lower()
-        attrs["archived_at"] = self._auto_action(
-            BannedWord.AutoActionChoices.archive, text_lower
-        )
-        attrs["flagged_at"] = self._auto_action(
-            BannedWord.AutoActionChoices.flag, text_lower
-        )
-        attrs["approved_at"] = self._auto_action(
-            BannedWord.AutoActionChoices.approve, text_lower
-        )
+        actions = banned_words.get_matcher().match(attrs["content"])
+        timestamp = timezone.now()
+        for field, action in (
+            ("archived_at", BannedWord.AutoActionChoices.archive),
+            ("flagged_at", BannedWord.AutoActionChoices.flag),
+            ("approved_at", BannedWord.AutoActionChoices.approve),
+        ):
+            attrs[field] = timestamp if action in actions else None
         return attrs
 
 
+_feed_datetime = serializers.DateTimeField()
+
+
+def _feed_datetime_formatter():
+    """
+    ``DateTimeField.to_representation`` for the current time zone, cut down
+    to the ISO 8601 case that every feed datetime takes.
+    """
+    tz = _feed_datetime.default_timezone()
+    if tz is None or api_settings.DATETIME_FORMAT.lower() != ISO_8601:
+        return _feed_datetime.to_representation
+
+    def to_representation(value):
+        if not value:
+            return None
+        if value.tzinfo is None:
+            return _feed_datetime.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return to_representation
+
+
+def prayer_feed_values(queryset):
+    """
+    The columns ``prayer_feed_data`` needs, as ``.values()`` rows with the
+    location name joined in SQL.
+    """
+    return queryset.values(
+        "id",
+        "type",
+        "name",
+        "content",
+        "response_comment",
+        "prayer_count",
+        "location",
+        "created_at",
+        "flagged_at",
+        "archived_at",
+        "approved_at",
+        location_name=F("location__name"),
+    )
+
+
+def prayer_feed_data(rows):
+    """
+    ``PrayerPraiseRequestSerializer(many=True).data`` for ``prayer_feed_values``
+    rows, built as plain dicts without going through a serializer per row.
+    """
+    datetime = _feed_datetime_formatter()
+    return [
+        {
+            "id": row["id"],
+            "type": row["type"],
+            "name": row["name"],
+            "content": row["content"],
+            "response_comment": row["response_comment"],
+            "prayer_count": row["prayer_count"],
+            "location": row["location"],
+            "location_name": row["location_name"],
+            "is_flagged": bool(row["flagged_at"]),
+            "is_archived": bool(row["archived_at"]),
+            "is_approved": bool(row["approved_at"]),
+            "created_at": datetime(row["created_at"]),
+            "flagged_at": datetime(row["flagged_at"]),
+            "archived_at": datetime(row["archived_at"]),
+            "approved_at": datetime(row["approved_at"]),
+        }
+        for row in rows
+    ]
+
+
 class PrayerPraiseRequestWebhookSerializer(PrayerPraiseRequestSerializer):
     location = LocationSerializer()
 
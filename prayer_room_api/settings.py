@@ -17,6 +17,8 @@ import sentry_sdk
 from cbs import BaseSettings, env
 from dotenv import load_dotenv
 
+from prayer_room_api import sentry
+
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +43,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "prayer_room_api.wsgi.application"
+ASGI_APPLICATION = "prayer_room_api.asgi.application"
 
 
 # Password validation
@@ -104,17 +107,11 @@ if SENTRY_DSN:
         # Add data like request headers and IP for users,
         # see https://docs.sentry.io/platforms/python/data-management/data-collected/ for more info
         send_default_pii=True,
-        # Set traces_sample_rate to 1.0 to capture 100%
-        # of transactions for tracing.
-        traces_sample_rate=1.0,
-        _experiments={
-            # Set continuous_profiling_auto_start to True
-            # to automatically start the profiler on when
-            # possible.
-            "continuous_profiling_auto_start": True,
-        },
+        # Sample traces and profiles by route and task, see sentry.py
+        **sentry.init_options(),
         environment=os.environ.get("DJANGO_MODE"),
     )
+    sentry.connect_task_signals()
     from sentry_sdk.integrations.logging import ignore_logger
 
     ignore_logger("django.security.DisallowedHost")
@@ -148,6 +145,8 @@ LOGGING = {
         },
         # Errors logged by the SDK itself
         "sentry_sdk": {"level": "ERROR", "handlers": ["console"], "propagate": False},
+        # Imported above, so named here to stay enabled
+        "prayer_room_api.sentry": {"level": "INFO"},
         "django.security.DisallowedHost": {
             "level": "ERROR",
             "handlers": ["null"],
@@ -217,6 +216,8 @@ class Settings(BaseSettings):
                 None,
                 [
                     "django.middleware.security.SecurityMiddleware",
+                    "prayer_room_api.instrumentation.QueryInstrumentationMiddleware",
+                    "prayer_room_api.sentry.SentrySamplingMiddleware",
                     "django.contrib.sessions.middleware.SessionMiddleware",
                     "corsheaders.middleware.CorsMiddleware",
                     "django.middleware.common.CommonMiddleware",
@@ -258,6 +259,92 @@ class Settings(BaseSettings):
             "default": self.DEFAULT_DATABASE,
         }
 
+    # Shared cache. Local memory by default; set CACHE_URL to
+    # file:///path/to/dir or redis://host:port/db (needs the redis package)
+    # to share it between processes.
+    CACHE_URL = env("", key="CACHE_URL")
+
+    # Seconds a cached read-only API response is kept. Entries are also
+    # invalidated whenever the underlying model changes.
+    API_CACHE_TIMEOUT = env.int(60 * 60)
+
+    # Without CACHE_URL each process has its own cache and never sees the
+    # invalidations made by the others, so API responses and the active
+    # locations are kept for at most this many seconds.
+    LOCAL_CACHE_TIMEOUT = env.int(5)
+
+    # Count each request's queries, database time and repeated statements,
+    # reported in a log line per request and, with DEBUG or for staff, a
+    # Server-Timing header. Off by default in production.
+    QUERY_INSTRUMENTATION = env.bool(True)
+
+    # Serve the prayer request feed, prayer taps and the read-only content
+    # endpoints from the async views in async_views.py, and the live prayer
+    # wall stream. Meant for the "web-asgi" process; under WSGI the async
+    # views work but gain nothing, and the stream answers 501.
+    ASYNC_API = env.bool(False)
+
+    # Seconds a live prayer wall stream token, from
+    # /api/prayer-requests/stream-token/, can open a stream. Only checked on
+    # connect, so clients fetch a new one whenever the stream reconnects.
+    STREAM_TOKEN_MAX_AGE = env.int(60)
+
+    # Seconds the staff dashboard stats are cached. Moderation writes also
+    # invalidate them.
+    DASHBOARD_CACHE_TIMEOUT = env.int(30)
+
+    # Buffer "I prayed" taps in the cache and write them in batches every
+    # PRAYER_COUNT_FLUSH_SECONDS. Needs a cache shared with the Celery worker
+    # (CACHE_URL); the system checks refuse to start without one.
+    PRAYER_COUNT_BUFFERED = env.bool(False)
+    PRAYER_COUNT_FLUSH_SECONDS = env.int(5)
+
+    # Seconds `manage.py relay_outbox` waits between passes when the outbox
+    # is empty.
+    OUTBOX_RELAY_INTERVAL = env.int(1)
+
+    # Send each webhook endpoint one JSON array of events per outbox batch,
+    # rather than django_webhook's one object per request. Changes the
+    # payload, so only turn it on once every consumer accepts arrays.
+    WEBHOOK_BATCHED = env.bool(False)
+
+    # Outbox events whose handler fails are retried after OUTBOX_RETRY_DELAY
+    # seconds, doubling with each attempt, and marked failed after
+    # OUTBOX_MAX_ATTEMPTS.
+    OUTBOX_RETRY_DELAY = env.int(30)
+    OUTBOX_MAX_ATTEMPTS = env.int(10)
+
+    # How live prayer wall events reach the stream endpoint: "local" (one
+    # process) or "postgres" (LISTEN/NOTIFY, for several server processes).
+    PUBSUB_BACKEND = env("local")
+
+    # Bulk sends (digests) are throttled to this many messages per second,
+    # the provider's send rate (SES production accounts start at 14).
+    EMAIL_SEND_RATE_PER_SECOND = env.int(14)
+
+    # Digest emails fan out into parallel batch tasks joined by a chord, which
+    # needs a result backend (e.g. "redis://..."). Without one the batches run
+    # one after another inside the digest task.
+    CELERY_RESULT_BACKEND = env(None, key="CELERY_RESULT_BACKEND")
+
+    def CACHES(self):
+        if self.CACHE_URL.startswith(("redis://", "rediss://", "unix://")):
+            default = {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": self.CACHE_URL,
+            }
+        elif self.CACHE_URL.startswith("file://"):
+            default = {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": self.CACHE_URL.removeprefix("file://"),
+            }
+        else:
+            default = {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "OPTIONS": {"MAX_ENTRIES": 1000},
+            }
+        return {"default": default}
+
     SOCIALACCOUNT_STORE_TOKENS = True
     ACCOUNT_EMAIL_REQUIRED = True
     SOCIALACCOUNT_EMAIL_AUTHENTICATION = True
@@ -308,6 +395,16 @@ class Settings(BaseSettings):
                     "bind": f"0.0.0.0:{os.environ.get('PORT', '8000')}",
                 },
             },
+            # Pair with ASYNC_API so the hot endpoints are served by async views.
+            # Worker count comes from WEB_CONCURRENCY, as with gunicorn. Run by
+            # the Procfile's web-asgi process.
+            "web-asgi": {
+                "BACKEND": "django_prodserver.backends.uvicorn.UvicornServer",
+                "ARGS": {
+                    "host": "0.0.0.0",
+                    "port": os.environ.get("PORT", "8000"),
+                },
+            },
         }
 
 
@@ -352,6 +449,7 @@ class StagingSettings(Settings):
 class ProdSettings(Settings):
     # Override
     DEBUG = False
+    QUERY_INSTRUMENTATION = env.bool(False)
 
     # Values that *must* be provided in the environment.
     STATIC_ROOT = env(env.Required)
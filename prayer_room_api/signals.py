@@ -1,15 +1,32 @@
 import logging
 
-from django.db.models.signals import pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import PrayerPraiseRequest
+from . import banned_words, caching, outbox, pubsub, rollups, stats
+from .models import (
+    BannedWord,
+    HomePageContent,
+    Location,
+    Notification,
+    PrayerInspiration,
+    PrayerPraiseRequest,
+    Setting,
+    prayer_requests_updated,
+)
 
 logger = logging.getLogger(__name__)
 
+# Bulk updates touching only these fields don't change the dashboard.
+PRAYER_COUNT_FIELDS = {"prayer_count", "updated_at"}
+
+# Models served through CachedResponseMixin viewsets.
+CACHED_API_MODELS = (HomePageContent, Location, PrayerInspiration, Setting)
+
 
 @receiver(pre_save, sender=PrayerPraiseRequest)
-def check_response_change(sender, instance, **kwargs):
+def check_response_change(sender, instance, update_fields=None, **kwargs):
     """
     Trigger immediate notification when response_comment is added/changed.
     Only triggers when response_comment changes from empty to populated.
@@ -17,16 +34,152 @@ def check_response_change(sender, instance, **kwargs):
     if not instance.pk:
         return  # New instance, no previous value
 
-    try:
-        old_instance = PrayerPraiseRequest.objects.get(pk=instance.pk)
-    except PrayerPraiseRequest.DoesNotExist:
+    if update_fields is not None and "response_comment" not in update_fields:
         return
 
+    if instance.has_snapshot("response_comment"):
+        previous_comment = instance.get_snapshot_value("response_comment")
+    else:
+        # Instance wasn't loaded from the database, so read the stored value
+        previous_comment = (
+            PrayerPraiseRequest.objects.filter(pk=instance.pk)
+            .values_list("response_comment", flat=True)
+            .first()
+        )
+        if previous_comment is None:
+            return
+
     # Check if response_comment changed from empty to populated
-    if not old_instance.response_comment and instance.response_comment:
-        # Import here to avoid circular imports
-        from .tasks import send_response_notification
+    if not previous_comment and instance.response_comment:
+        instance._response_added = True
 
-        # Queue the notification task
-        send_response_notification.delay(instance.pk)
+
+@receiver(post_save, sender=PrayerPraiseRequest)
+def queue_response_notification(sender, instance, raw=False, **kwargs):
+    """Write the notification picked up by check_response_change."""
+    if not raw and instance.__dict__.pop("_response_added", False):
+        queue_response_notifications([instance.pk])
         logger.info(f"Queued response notification for prayer request {instance.pk}")
+
+
+@receiver(prayer_requests_updated, sender=PrayerPraiseRequest)
+def notify_bulk_responses(sender, responded_ids, **kwargs):
+    """
+    Queue a notification for every request given its first response by a
+    bulk update.
+    """
+    if not responded_ids:
+        return
+
+    queue_response_notifications(responded_ids)
+    logger.info(f"Queued response notifications for {len(responded_ids)} requests")
+
+
+def queue_response_notifications(prayer_request_ids):
+    """
+    Add response notifications in the current transaction, and have the
+    outbox start the sender once it commits. A request already notified is
+    ignored.
+    """
+    Notification.objects.bulk_create(
+        [
+            Notification(
+                prayer_request_id=pk, event_type=Notification.EventType.RESPONSE
+            )
+            for pk in prayer_request_ids
+        ],
+        ignore_conflicts=True,
+    )
+    outbox.publish(outbox.NOTIFICATIONS)
+
+
+def _was_published(row):
+    return bool(row and row.get("approved_at") and not row.get("archived_at"))
+
+
+@receiver(post_save, sender=PrayerPraiseRequest)
+def publish_to_prayer_wall(sender, instance, raw=False, **kwargs):
+    """Push a request to the live prayer wall when it is first published."""
+    if raw or instance.approved_at is None or instance.archived_at is not None:
+        return
+    snapshot = getattr(instance, "_snapshot", {})
+    if _was_published(snapshot) or not pubsub.is_active():
+        return
+    pubsub.publish(pubsub.prayer_event(instance))
+
+
+@receiver(prayer_requests_updated, sender=PrayerPraiseRequest)
+def publish_bulk_update_to_prayer_wall(
+    sender, ids, fields, previous, prayer_counts, **kwargs
+):
+    if not pubsub.is_active():
+        return
+
+    for pk, (location_id, prayer_count) in prayer_counts.items():
+        pubsub.publish(pubsub.prayer_count_event(pk, location_id, prayer_count))
+
+    if {"approved_at", "archived_at"} & set(fields):
+        newly_published = [pk for pk in ids if not _was_published(previous.get(pk))]
+        for prayer in (
+            PrayerPraiseRequest.objects.published()
+            .filter(pk__in=newly_published)
+            .select_related("location")
+        ):
+            pubsub.publish(pubsub.prayer_event(prayer))
+
+
+@receiver(post_save, sender=PrayerPraiseRequest)
+def record_daily_activity(sender, instance, created=False, raw=False, **kwargs):
+    if not raw:
+        rollups.record_save(instance, created)
+
+
+@receiver(post_delete, sender=PrayerPraiseRequest)
+def remove_daily_activity(sender, instance, **kwargs):
+    rollups.record_delete(instance)
+
+
+@receiver(prayer_requests_updated, sender=PrayerPraiseRequest)
+def record_bulk_daily_activity(
+    sender, ids, values, previous, responded_ids, **kwargs
+):
+    rollups.record_bulk_update(ids, values, previous, responded_ids)
+
+
+@receiver(post_save, sender=PrayerPraiseRequest)
+@receiver(post_delete, sender=PrayerPraiseRequest)
+def invalidate_dashboard(sender, update_fields=None, **kwargs):
+    """Refresh the staff dashboard stats after a moderation write."""
+    if update_fields is not None and set(update_fields) <= PRAYER_COUNT_FIELDS:
+        return
+    stats.invalidate()
+    transaction.on_commit(stats.invalidate)
+
+
+@receiver(prayer_requests_updated, sender=PrayerPraiseRequest)
+def invalidate_dashboard_after_bulk_update(sender, fields, **kwargs):
+    if not set(fields) <= PRAYER_COUNT_FIELDS:
+        stats.invalidate()
+        transaction.on_commit(stats.invalidate)
+
+
+@receiver(post_save, sender=BannedWord)
+@receiver(post_delete, sender=BannedWord)
+def invalidate_banned_words(sender, **kwargs):
+    """
+    Rebuild the compiled banned word matcher after any change to the list.
+    Invalidated again on commit so no process caches a pre-commit snapshot.
+    """
+    banned_words.invalidate()
+    transaction.on_commit(banned_words.invalidate)
+
+
+def bump_cached_api_version(sender, **kwargs):
+    """Invalidate cached API responses for the model, now and on commit."""
+    caching.bump_model_version(sender)
+    transaction.on_commit(lambda: caching.bump_model_version(sender))
+
+
+for model in CACHED_API_MODELS:
+    post_save.connect(bump_cached_api_version, sender=model)
+    post_delete.connect(bump_cached_api_version, sender=model)
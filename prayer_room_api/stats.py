@@ -0,0 +1,87 @@
+"""
+Staff dashboard statistics.
+
+The tile counts and totals come from one conditional aggregate, and the
+activity series from the ``DailyActivity`` rollup. The result is cached for
+``DASHBOARD_CACHE_TIMEOUT`` seconds under the ``dashboard`` version, which is
+bumped whenever moderation changes a prayer request.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils.timezone import localdate, now
+
+from . import caching
+from .models import (
+    AWAITING_RESPONSE,
+    FLAGGED_QUEUE,
+    PENDING_MODERATION,
+    RESPONSES_LAUNCHED_AT,
+    DailyActivity,
+    PrayerPraiseRequest,
+)
+
+VERSION_NAME = "dashboard"
+
+# DailyActivity columns charted on the dashboard.
+ACTIVITY_SERIES = ("submitted", "approved", "flagged", "archived", "responded")
+
+
+def invalidate():
+    caching.bump_version(VERSION_NAME)
+
+
+def get_counts(current):
+    last_24h = current - timedelta(hours=24)
+    not_archived = Q(archived_at__isnull=True)
+    return PrayerPraiseRequest.objects.aggregate(
+        pending=Count("id", filter=PENDING_MODERATION),
+        flagged=Count("id", filter=FLAGGED_QUEUE),
+        awaiting_response=Count(
+            "id",
+            filter=AWAITING_RESPONSE & Q(created_at__gte=RESPONSES_LAUNCHED_AT),
+        ),
+        new_today=Count("id", filter=Q(created_at__gte=last_24h)),
+        total_approved=Count("id", filter=Q(approved_at__isnull=False)),
+        total_archived=Count("id", filter=Q(archived_at__isnull=False)),
+        total_active=Count("id", filter=Q(approved_at__isnull=False) & not_archived),
+    )
+
+
+def get_activity(window_start_date, days):
+    """Return ``days`` rows of per-day activity counts, summed over locations."""
+    totals = {
+        row["day"]: row
+        for row in DailyActivity.objects.filter(day__gte=window_start_date)
+        .values("day")
+        .annotate(**{f"total_{name}": Sum(name) for name in ACTIVITY_SERIES})
+        .order_by()
+    }
+
+    activity = []
+    for offset in range(days):
+        day = window_start_date + timedelta(days=offset)
+        row = {"day": day}
+        for name in ACTIVITY_SERIES:
+            row[name] = totals.get(day, {}).get(f"total_{name}", 0)
+        activity.append(row)
+    return activity
+
+
+def get_dashboard_stats(days):
+    """
+    Return ``{"counts": ..., "activity": ...}`` for the last ``days`` days,
+    from the cache when possible.
+    """
+    key = f"prayer_room_api:dashboard:{caching.get_version(VERSION_NAME)}:{days}"
+    stats = cache.get(key)
+    if stats is None:
+        stats = {
+            "counts": get_counts(now()),
+            "activity": get_activity(localdate() - timedelta(days=days - 1), days),
+        }
+        cache.set(key, stats, timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+    return stats
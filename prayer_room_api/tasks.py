@@ -1,35 +1,47 @@
+import hashlib
 import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
 
-import markdown
-from celery import shared_task
+from celery import chord, shared_task
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.mail import EmailMultiAlternatives
-from django.template import Context, Template
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 
-from .models import EmailLog, EmailTemplate, PrayerPraiseRequest, UserProfile
+from . import emails
+from .models import (
+    EmailLog,
+    EmailTemplate,
+    Notification,
+    PrayerPraiseRequest,
+    UserProfile,
+)
 
 logger = logging.getLogger(__name__)
 
+# Recipients per digest subtask.
+DIGEST_BATCH_SIZE = 100
+
+# Notifications claimed per transaction, and sends tried before giving up.
+NOTIFICATION_BATCH_SIZE = 50
+NOTIFICATION_MAX_ATTEMPTS = 3
+
+# A keyed email log still pending after this long was left by a send that
+# died before recording its outcome, so the recipient is tried again.
+STALE_PENDING_EMAIL = timedelta(minutes=15)
+
 
 def send_templated_email(template, recipient_email, context_data):
     """
     Render and send an email using a stored template.
     Markdown body is converted to HTML, with plain text fallback.
     """
-    # Render subject and markdown body with context
-    subject_template = Template(template.subject)
-    markdown_template = Template(template.body_markdown)
-
-    context = Context(context_data)
-
-    subject = subject_template.render(context)
-    body_markdown = markdown_template.render(context)
-
-    # Convert markdown to HTML, use markdown source as plain text fallback
-    body_html = markdown.markdown(body_markdown)
-    body_text = body_markdown
+    # Render with the compiled template, markdown source as plain text fallback
+    subject, body_text, body_html = emails.render(template, context_data)
 
     # Create email log
     log = EmailLog.objects.create(
@@ -62,43 +74,152 @@ def send_templated_email(template, recipient_email, context_data):
         raise
 
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def send_moderator_digest(self):
+def idempotency_key(key_prefix, recipient_email):
     """
-    Hourly digest for staff users with pending and flagged requests.
-    Only sends if there has been activity in the last hour.
+    ``"<key_prefix>:<sha256 of recipient_email>"``: hashing keeps keys for
+    the longest addresses within ``EmailLog.idempotency_key``.
+    """
+    digest = hashlib.sha256(recipient_email.encode()).hexdigest()
+    return f"{key_prefix}:{digest}"
+
+
+def send_templated_emails(template, messages, key_prefix=None):
+    """
+    Render and send a stored template to many recipients.
+
+    ``messages`` is an iterable of ``(recipient_email, context_data)``. Every
+    message is rendered first, then sent over one backend connection at most
+    ``EMAIL_SEND_RATE_PER_SECOND`` per second. EmailLog rows are written with
+    one bulk insert and one bulk update. Returns ``(sent_count, failed_count)``.
+
+    With a ``key_prefix`` each log gets the ``idempotency_key()`` of the
+    prefix and its recipient. Recipients already sent under their key are
+    skipped (and counted as sent), so a retried batch doesn't email them
+    twice. Failed logs are retried, as are logs left pending for longer than
+    ``STALE_PENDING_EMAIL`` by a worker that died mid-send.
     """
+    messages = list(messages)
+    if not messages:
+        return 0, 0
+
+    previous = {}
+    if key_prefix:
+        previous = {
+            log.idempotency_key: log
+            for log in EmailLog.objects.filter(
+                idempotency_key__in=[
+                    idempotency_key(key_prefix, email) for email, _ in messages
+                ]
+            )
+        }
+
+    already_sent = 0
+    stale_before = timezone.now() - STALE_PENDING_EMAIL
+    logs, new_logs, rendered = [], [], []
+    for recipient_email, context_data in messages:
+        key = idempotency_key(key_prefix, recipient_email) if key_prefix else None
+        log = previous.get(key)
+        if log is not None and (
+            log.status == EmailLog.Status.SENT
+            or (log.status == EmailLog.Status.PENDING and log.created_at > stale_before)
+        ):
+            already_sent += 1
+            continue
+
+        subject, body_text, body_html = emails.render(template, context_data)
+        if log is None:
+            log = EmailLog(template=template, idempotency_key=key)
+            new_logs.append(log)
+        log.recipient_email = recipient_email
+        log.subject = subject
+        log.status = EmailLog.Status.PENDING
+        log.error_message = ""
+        logs.append(log)
+        rendered.append((recipient_email, subject, body_text, body_html))
+
+    if not logs:
+        return already_sent, 0
+
+    EmailLog.objects.bulk_create(new_logs)
+
+    rate = max(1, settings.EMAIL_SEND_RATE_PER_SECOND)
     try:
-        template = EmailTemplate.objects.get(
-            template_type=EmailTemplate.TemplateType.MODERATOR_DIGEST,
-            is_active=True,
+        with get_connection() as connection:
+            window_start = time.monotonic()
+            for start in range(0, len(rendered), rate):
+                if start:
+                    # Stay under the provider's send rate.
+                    time.sleep(max(0, 1 - (time.monotonic() - window_start)))
+                    window_start = time.monotonic()
+                for log, (recipient_email, subject, body_text, body_html) in zip(
+                    logs[start : start + rate], rendered[start : start + rate]
+                ):
+                    msg = EmailMultiAlternatives(
+                        subject=subject,
+                        body=body_text,
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        to=[recipient_email],
+                        connection=connection,
+                    )
+                    msg.attach_alternative(body_html, "text/html")
+                    try:
+                        msg.send()
+                    except Exception as e:
+                        log.status = EmailLog.Status.FAILED
+                        log.error_message = str(e)
+                        logger.error(f"Failed to send email to {recipient_email}: {e}")
+                    else:
+                        log.status = EmailLog.Status.SENT
+                        log.sent_at = timezone.now()
+    except Exception as e:
+        # The connection itself failed; nothing left pending was sent.
+        for log in logs:
+            if log.status == EmailLog.Status.PENDING:
+                log.status = EmailLog.Status.FAILED
+                log.error_message = str(e)
+        logger.error(f"Email connection failed: {e}")
+    finally:
+        EmailLog.objects.bulk_update(
+            logs, ["recipient_email", "subject", "status", "sent_at", "error_message"]
         )
-    except EmailTemplate.DoesNotExist:
-        logger.warning("Moderator digest template not found or inactive")
-        return "Template not found or inactive"
 
-    # Check if there has been any new work for moderators in the last hour
-    one_hour_ago = timezone.now() - timezone.timedelta(hours=1)
+    sent_count = sum(log.status == EmailLog.Status.SENT for log in logs)
+    logger.info(f"Sent {sent_count} of {len(logs)} emails: {template}")
+    return already_sent + sent_count, len(logs) - sent_count
 
-    has_new_requests = PrayerPraiseRequest.objects.filter(
-        created_at__gte=one_hour_ago
-    ).exists()
-    has_new_flags = PrayerPraiseRequest.objects.filter(
-        flagged_at__gte=one_hour_ago
-    ).exists()
 
-    if not (has_new_requests or has_new_flags):
-        return "No new requests or flags in the last hour, skipping digest"
+def _batches(ids):
+    for start in range(0, len(ids), DIGEST_BATCH_SIZE):
+        yield ids[start : start + DIGEST_BATCH_SIZE]
 
-    # Get staff users with email addresses
-    staff_users = User.objects.filter(
-        is_staff=True,
-        email__isnull=False,
-    ).exclude(email="")
 
-    if not staff_users.exists():
-        return "No staff users with email addresses"
+def _fan_out(batch_task, user_ids, summary, *args):
+    """
+    Run ``batch_task(user_ids_batch, *args)`` for each batch of recipients and
+    summarise the ``(sent, failed)`` results with ``summary``.
+
+    With a result backend the batches run in parallel as a chord whose
+    callback builds the summary; without one there is nothing to collect
+    results from, so the batches run in this worker one after another.
+    """
+    batches = [batch_task.si(batch, *args) for batch in _batches(user_ids)]
+    if settings.CELERY_RESULT_BACKEND:
+        chord(batches)(summarize_digest.s(summary))
+        return f"Queued {len(batches)} digest batches for {len(user_ids)} recipients"
+    return summarize_digest([batch.apply().get() for batch in batches], summary)
+
+
+@shared_task
+def summarize_digest(results, summary):
+    """Chord callback: total the ``(sent, failed)`` pairs of each batch."""
+    sent_count = sum(sent for sent, _ in results)
+    failed_count = sum(failed for _, failed in results)
+    if failed_count:
+        logger.warning(f"{failed_count} digest emails failed")
+    return summary.format(sent_count=sent_count, failed_count=failed_count)
+
 
+def _moderator_digest_context():
     # Get pending requests (not approved, not archived)
     pending_requests = PrayerPraiseRequest.objects.filter(
         archived_at__isnull=True,
@@ -121,28 +242,88 @@ def send_moderator_digest(self):
         archived_at__isnull=True,
     ).count()
 
-    if pending_count == 0 and flagged_count == 0:
+    return {
+        "pending_requests": list(pending_requests),
+        "pending_count": pending_count,
+        "flagged_requests": list(flagged_requests),
+        "flagged_count": flagged_count,
+        "moderation_url": "https://api.prayer.thec3.uk/moderation/",
+    }
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_moderator_digest(self):
+    """
+    Hourly digest for staff users with pending and flagged requests.
+    Only sends if there has been activity in the last hour.
+    """
+    try:
+        EmailTemplate.objects.get(
+            template_type=EmailTemplate.TemplateType.MODERATOR_DIGEST,
+            is_active=True,
+        )
+    except EmailTemplate.DoesNotExist:
+        logger.warning("Moderator digest template not found or inactive")
+        return "Template not found or inactive"
+
+    # Check if there has been any new work for moderators in the last hour
+    current = timezone.now()
+    one_hour_ago = current - timezone.timedelta(hours=1)
+
+    has_new_requests = PrayerPraiseRequest.objects.filter(
+        created_at__gte=one_hour_ago
+    ).exists()
+    has_new_flags = PrayerPraiseRequest.objects.filter(
+        flagged_at__gte=one_hour_ago
+    ).exists()
+
+    if not (has_new_requests or has_new_flags):
+        return "No new requests or flags in the last hour, skipping digest"
+
+    # Get staff users with email addresses
+    staff_ids = list(
+        User.objects.filter(
+            is_staff=True,
+            email__isnull=False,
+        )
+        .exclude(email="")
+        .values_list("pk", flat=True)
+    )
+
+    if not staff_ids:
+        return "No staff users with email addresses"
+
+    if not PrayerPraiseRequest.objects.filter(
+        Q(approved_at__isnull=True) | Q(flagged_at__isnull=False),
+        archived_at__isnull=True,
+    ).exists():
         return "No pending or flagged requests"
 
-    moderation_url = "https://api.prayer.thec3.uk/moderation/"
-
-    sent_count = 0
-    for user in staff_users:
-        context = {
-            "recipient_name": user.first_name or user.username,
-            "pending_requests": list(pending_requests),
-            "pending_count": pending_count,
-            "flagged_requests": list(flagged_requests),
-            "flagged_count": flagged_count,
-            "moderation_url": moderation_url,
-        }
-        try:
-            send_templated_email(template, user.email, context)
-            sent_count += 1
-        except Exception as e:
-            logger.error(f"Failed to send moderator digest to {user.email}: {e}")
+    return _fan_out(
+        send_moderator_digest_batch,
+        staff_ids,
+        "Sent moderator digest to {sent_count} staff members",
+        # One digest per staff member per hour, however often this runs.
+        f"moderator_digest:{current:%Y-%m-%dT%H}",
+    )
 
-    return f"Sent moderator digest to {sent_count} staff members"
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_moderator_digest_batch(self, user_ids, run_key):
+    """Send the moderator digest to one batch of staff users."""
+    template = EmailTemplate.objects.get(
+        template_type=EmailTemplate.TemplateType.MODERATOR_DIGEST,
+        is_active=True,
+    )
+    context = _moderator_digest_context()
+    messages = [
+        (user.email, {**context, "recipient_name": user.first_name or user.username})
+        for user in User.objects.filter(pk__in=user_ids)
+    ]
+    try:
+        return send_templated_emails(template, messages, key_prefix=run_key)
+    except Exception as e:
+        raise self.retry(exc=e)
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
@@ -154,7 +335,7 @@ def send_user_digest(self, frequency="daily"):
         frequency: 'daily' or 'weekly'
     """
     try:
-        template = EmailTemplate.objects.get(
+        EmailTemplate.objects.get(
             template_type=EmailTemplate.TemplateType.USER_DIGEST,
             is_active=True,
         )
@@ -168,42 +349,105 @@ def send_user_digest(self, frequency="daily"):
     else:  # weekly
         since = timezone.now() - timezone.timedelta(weeks=1)
 
-    # Get users who have opted in to digests
-    profiles = (
-        UserProfile.objects.filter(
-            enable_digest_notifications=True,
-            user__email__isnull=False,
-        )
-        .exclude(user__email="")
-        .select_related("user")
+    # Users who have opted in to digests and have a response since the last
+    # digest, in one query
+    user_ids = list(
+        _user_digest_responses(since)
+        .order_by()
+        .values_list("created_by_id", flat=True)
+        .distinct()
     )
+    if not user_ids:
+        return f"Sent user digest ({frequency}) to 0 users"
+
+    return _fan_out(
+        send_user_digest_batch,
+        user_ids,
+        f"Sent user digest ({frequency}) to {{sent_count}} users",
+        frequency,
+        since.isoformat(),
+        # One digest per user per day, however often this runs.
+        f"user_digest:{frequency}:{timezone.localdate()}",
+    )
+
 
-    sent_count = 0
-    for profile in profiles:
-        user = profile.user
+def _user_digest_responses(since, user_ids=None):
+    """Responded requests since ``since`` by users who want digests."""
+    recipients = UserProfile.objects.filter(
+        enable_digest_notifications=True,
+        user__email__isnull=False,
+    ).exclude(user__email="")
+    if user_ids is not None:
+        recipients = recipients.filter(user_id__in=user_ids)
 
-        # Get user's requests with responses added since last digest
-        requests_with_responses = PrayerPraiseRequest.objects.filter(
-            created_by=user,
+    return (
+        PrayerPraiseRequest.objects.filter(
+            created_by_id__in=recipients.values("user_id"),
             updated_at__gte=since,
-        ).exclude(response_comment="")
+        )
+        .exclude(response_comment="")
+        .order_by("created_at")
+    )
 
-        if not requests_with_responses.exists():
-            continue
 
-        context = {
-            "recipient_name": user.first_name or user.username,
-            "requests_with_responses": list(requests_with_responses),
-            "frequency": frequency,
-        }
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_user_digest_batch(self, user_ids, frequency, since, run_key):
+    """Send the user digest to one batch of users."""
+    template = EmailTemplate.objects.get(
+        template_type=EmailTemplate.TemplateType.USER_DIGEST,
+        is_active=True,
+    )
+    since = datetime.fromisoformat(since)
+
+    requests_by_user = defaultdict(list)
+    for request in _user_digest_responses(since, user_ids).select_related(
+        "created_by"
+    ):
+        requests_by_user[request.created_by].append(request)
+
+    messages = [
+        (
+            user.email,
+            {
+                "recipient_name": user.first_name or user.username,
+                "requests_with_responses": requests_with_responses,
+                "frequency": frequency,
+            },
+        )
+        for user, requests_with_responses in requests_by_user.items()
+    ]
+    try:
+        return send_templated_emails(template, messages, key_prefix=run_key)
+    except Exception as e:
+        raise self.retry(exc=e)
 
-        try:
-            send_templated_email(template, user.email, context)
-            sent_count += 1
-        except Exception as e:
-            logger.error(f"Failed to send user digest to {user.email}: {e}")
 
-    return f"Sent user digest ({frequency}) to {sent_count} users"
+def _response_notification(request):
+    """
+    Return ``(recipient_email, context)`` for a response notification, or
+    ``(None, reason)`` when the requester shouldn't be emailed.
+    """
+    if not request.created_by:
+        return None, "No user linked to request"
+
+    user = request.created_by
+
+    # Check user preference
+    try:
+        profile = user.userprofile
+        if not profile.enable_response_notifications:
+            return None, "User has disabled response notifications"
+    except UserProfile.DoesNotExist:
+        return None, "No user profile found"
+
+    if not user.email:
+        return None, "User has no email address"
+
+    return user.email, {
+        "recipient_name": user.first_name or user.username,
+        "request_content": request.content[:200],
+        "response_text": request.response_comment,
+    }
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
@@ -220,21 +464,9 @@ def send_response_notification(self, prayer_request_id):
         logger.warning(f"Prayer request {prayer_request_id} not found")
         return "Prayer request not found"
 
-    if not request.created_by:
-        return "No user linked to request"
-
-    user = request.created_by
-
-    # Check user preference
-    try:
-        profile = UserProfile.objects.get(user=user)
-        if not profile.enable_response_notifications:
-            return "User has disabled response notifications"
-    except UserProfile.DoesNotExist:
-        return "No user profile found"
-
-    if not user.email:
-        return "User has no email address"
+    recipient_email, context = _response_notification(request)
+    if recipient_email is None:
+        return context
 
     try:
         template = EmailTemplate.objects.get(
@@ -245,15 +477,108 @@ def send_response_notification(self, prayer_request_id):
         logger.warning("Response notification template not found or inactive")
         return "Template not found or inactive"
 
-    context = {
-        "recipient_name": user.first_name or user.username,
-        "request_content": request.content[:200],
-        "response_text": request.response_comment,
-    }
-
     try:
-        send_templated_email(template, user.email, context)
-        return f"Sent response notification to {user.email}"
+        send_templated_email(template, recipient_email, context)
+        return f"Sent response notification to {recipient_email}"
     except Exception as e:
-        logger.error(f"Failed to send response notification to {user.email}: {e}")
+        logger.error(f"Failed to send response notification to {recipient_email}: {e}")
         raise
+
+
+def _claim_notifications(exclude):
+    """
+    Lock the next batch of pending notifications. SKIP LOCKED leaves rows
+    another worker has already claimed to that worker.
+    """
+    return list(
+        Notification.objects.select_for_update(skip_locked=True, of=("self",))
+        .filter(status=Notification.Status.PENDING)
+        .exclude(pk__in=exclude)
+        .select_related("prayer_request__created_by__userprofile")
+        .order_by("created_at")[:NOTIFICATION_BATCH_SIZE]
+    )
+
+
+@shared_task(ignore_result=True)
+def send_pending_notifications():
+    """
+    Send every pending notification in the outbox.
+
+    Each batch is claimed and sent inside one transaction, so concurrent
+    runs share the work without sending anything twice. A failed send is
+    retried on a later run until NOTIFICATION_MAX_ATTEMPTS is reached.
+    """
+    template = EmailTemplate.objects.filter(
+        template_type=EmailTemplate.TemplateType.RESPONSE_NOTIFICATION,
+        is_active=True,
+    ).first()
+
+    attempted = []
+    retry = False
+    while True:
+        with transaction.atomic():
+            claimed = _claim_notifications(attempted)
+            if not claimed:
+                break
+
+            for notification in claimed:
+                attempted.append(notification.pk)
+                notification.attempts += 1
+                notification.processed_at = timezone.now()
+
+                recipient_email, context = _response_notification(
+                    notification.prayer_request
+                )
+                if recipient_email is None:
+                    notification.status = Notification.Status.SKIPPED
+                    notification.result = context
+                    continue
+                if template is None:
+                    notification.status = Notification.Status.SKIPPED
+                    notification.result = "Template not found or inactive"
+                    continue
+
+                try:
+                    send_templated_email(template, recipient_email, context)
+                except Exception as e:
+                    notification.result = str(e)
+                    if notification.attempts >= NOTIFICATION_MAX_ATTEMPTS:
+                        notification.status = Notification.Status.FAILED
+                    else:
+                        retry = True
+                else:
+                    notification.status = Notification.Status.SENT
+                    notification.result = (
+                        f"Sent response notification to {recipient_email}"
+                    )
+
+            Notification.objects.bulk_update(
+                claimed, ["status", "attempts", "result", "processed_at"]
+            )
+        if len(claimed) < NOTIFICATION_BATCH_SIZE:
+            break
+
+    if retry:
+        send_pending_notifications.apply_async(countdown=60)
+    if attempted:
+        logger.info(f"Processed {len(attempted)} notifications")
+
+
+@shared_task(ignore_result=True)
+def flush_prayer_counts():
+    """Write prayer count taps buffered in the cache to the database."""
+    from . import counters
+
+    updated = counters.flush()
+    if updated:
+        logger.info(f"Flushed buffered prayer counts for {updated} requests")
+
+
+@shared_task(ignore_result=True)
+def relay_outbox():
+    """Hand pending outbox events to Celery and webhook endpoints."""
+    from . import outbox
+
+    handled = outbox.relay()
+    if handled:
+        logger.info(f"Relayed {handled} outbox events")
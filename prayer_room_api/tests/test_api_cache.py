@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from prayer_room_api import caching
+from prayer_room_api.models import HomePageContent, Location
+
+
+class CachedReadOnlyEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.location = Location.objects.create(name="Main", slug="main")
+        self.url = reverse("location-list")
+
+    def test_repeat_requests_are_served_from_cache(self):
+        """A second fetch does not touch the database."""
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_saving_a_row_invalidates_the_cached_response(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        Location.objects.create(name="Second", slug="second")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_versions_are_per_model(self):
+        self.client.get(self.url)
+
+        HomePageContent.objects.create(key="title", value="Prayer Room")
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    @override_settings(LOCAL_CACHE_TIMEOUT=0)
+    def test_per_process_cache_uses_the_local_timeout(self):
+        """Other workers' saves can't invalidate a local cache, so don't keep it."""
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+
+class CacheTimeoutTests(TestCase):
+    @override_settings(LOCAL_CACHE_TIMEOUT=5)
+    def test_capped_for_a_per_process_cache(self):
+        self.assertFalse(caching.is_shared())
+        self.assertEqual(caching.timeout(3600), 5)
+        self.assertEqual(caching.timeout(2), 2)
+
+    @override_settings(
+        LOCAL_CACHE_TIMEOUT=5,
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": "/tmp/prayer-room-test-cache",
+            }
+        },
+    )
+    def test_kept_for_a_shared_cache(self):
+        self.assertTrue(caching.is_shared())
+        self.assertEqual(caching.timeout(3600), 3600)
@@ -0,0 +1,170 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+
+from prayer_room_api import async_views
+from prayer_room_api.models import Location, PrayerPraiseRequest
+
+urlpatterns = [path("api/", include(async_views.urlpatterns))]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncPrayerRequestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="async")
+        self.token = Token.objects.create(user=self.user)
+        self.location = Location.objects.create(name="Main", slug="main")
+        self.other = Location.objects.create(name="Other", slug="other")
+        base = now() - timedelta(days=1)
+        self.prayers = [
+            PrayerPraiseRequest.objects.create(
+                location=self.location,
+                content=f"Prayer {i}",
+                created_at=base + timedelta(minutes=i),
+                approved_at=base,
+            )
+            for i in range(3)
+        ]
+        PrayerPraiseRequest.objects.create(
+            location=self.other, content="Elsewhere", approved_at=base
+        )
+        self.headers = {"Authorization": f"Token {self.token.key}"}
+
+    async def test_list_filters_by_location(self):
+        response = await self.async_client.get(
+            "/api/prayer-requests/?location=main", headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["id"] for row in response.json()],
+            [p.id for p in reversed(self.prayers)],
+        )
+        self.assertEqual(response.json()[0]["location_name"], "Main")
+
+    async def test_list_pages_with_cursors(self):
+        """Keyset pages are the same as the sync feed's."""
+        response = await self.async_client.get(
+            "/api/prayer-requests/?location=main&page_size=2", headers=self.headers
+        )
+        first = response.json()
+        self.assertTrue(first["has_more"])
+
+        response = await self.async_client.get(first["next"], headers=self.headers)
+
+        self.assertEqual(
+            [row["id"] for row in first["results"] + response.json()["results"]],
+            [p.id for p in reversed(self.prayers)],
+        )
+        self.assertFalse(response.json()["has_more"])
+
+    async def test_invalid_cursor_returns_404(self):
+        response = await self.async_client.get(
+            "/api/prayer-requests/?cursor=nope", headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"detail": "Invalid cursor"})
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get("/api/prayer-requests/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], "Token")
+
+        response = await self.async_client.get(
+            "/api/prayer-requests/", headers={"Authorization": "Token nope"}
+        )
+        self.assertEqual(response.json(), {"detail": "Invalid token."})
+
+    async def test_create(self):
+        response = await self.async_client.post(
+            "/api/prayer-requests/",
+            {"location": self.location.pk, "content": "Please pray", "name": "Sam"},
+            content_type="application/json",
+            headers=self.headers,
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["location_name"], "Main")
+        self.assertTrue(
+            await PrayerPraiseRequest.objects.filter(content="Please pray").aexists()
+        )
+
+    async def test_create_validation_errors(self):
+        response = await self.async_client.post(
+            "/api/prayer-requests/",
+            {"content": "Please pray"},
+            content_type="application/json",
+            headers=self.headers,
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("location", response.json())
+
+    async def test_session_writes_need_a_csrf_token(self):
+        await self.async_client.aforce_login(self.user)
+        self.async_client.handler.enforce_csrf_checks = True
+
+        response = await self.async_client.post(
+            f"/api/prayer-requests/{self.prayers[0].pk}/increment_prayer_count/"
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    async def test_increment_prayer_count(self):
+        url = f"/api/prayer-requests/{self.prayers[0].pk}/increment_prayer_count/"
+
+        response = await self.async_client.post(url, headers=self.headers)
+
+        self.assertEqual(response.json(), {"prayer_count": 1})
+        prayer = await PrayerPraiseRequest.objects.aget(pk=self.prayers[0].pk)
+        self.assertEqual(prayer.prayer_count, 1)
+
+    async def test_increment_404s_for_unknown_requests(self):
+        response = await self.async_client.post(
+            "/api/prayer-requests/0/increment_prayer_count/", headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncCachedReadOnlyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.location = Location.objects.create(name="Main", slug="main")
+
+    async def test_list_is_cached_with_an_etag(self):
+        first = await self.async_client.get("/api/locations/")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()[0]["slug"], "main")
+
+        second = await self.async_client.get(
+            "/api/locations/", headers={"If-None-Match": first["ETag"]}
+        )
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    async def test_retrieve(self):
+        response = await self.async_client.get(f"/api/locations/{self.location.pk}/")
+        self.assertEqual(response.json()["name"], "Main")
+
+        response = await self.async_client.get("/api/locations/0/")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_shares_cache_entries_with_the_sync_viewsets(self):
+        """Both views key and tag responses the same way."""
+        etag = (await self.async_client.get("/api/locations/"))["ETag"]
+
+        with override_settings(ROOT_URLCONF="prayer_room_api.urls"):
+            response = await self.async_client.get(
+                "/api/locations/", headers={"If-None-Match": etag}
+            )
+
+        self.assertEqual(response.status_code, 304)
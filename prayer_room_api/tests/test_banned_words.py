@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from prayer_room_api import banned_words, caching
+from prayer_room_api.models import BannedWord, Location
+from prayer_room_api.serializers import PrayerPraiseRequestSerializer
+
+
+class BannedWordMatcherTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        banned_words.invalidate()
+        self.location = Location.objects.create(name="Main", slug="main")
+
+    def _validate(self, content):
+        serializer = PrayerPraiseRequestSerializer(
+            data={"content": content, "location": self.location.pk}
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.validated_data
+
+    def test_matches_words_case_insensitively_per_action(self):
+        BannedWord.objects.create(word="Spam", auto_action="archive")
+        BannedWord.objects.create(word="worry", auto_action="flag")
+
+        data = self._validate("Please pray, I SPAM and worry a lot")
+
+        self.assertIsNotNone(data["archived_at"])
+        self.assertIsNotNone(data["flagged_at"])
+        self.assertIsNone(data["approved_at"])
+
+    def test_inactive_words_are_ignored(self):
+        BannedWord.objects.create(word="spam", auto_action="archive", is_active=False)
+
+        data = self._validate("spam spam spam")
+
+        self.assertIsNone(data["archived_at"])
+
+    def test_matcher_picks_up_changes_to_the_word_list(self):
+        self.assertEqual(banned_words.get_matcher().match("hello"), set())
+
+        word = BannedWord.objects.create(word="hello", auto_action="approve")
+        self.assertEqual(banned_words.get_matcher().match("hello"), {"approve"})
+
+        word.delete()
+        self.assertEqual(banned_words.get_matcher().match("hello"), set())
+
+    def test_warm_classification_runs_no_queries(self):
+        BannedWord.objects.create(word="spam", auto_action="flag")
+        banned_words.get_matcher()
+
+        with self.assertNumQueries(0):
+            actions = banned_words.get_matcher().match("no spam here")
+
+        self.assertEqual(actions, {"flag"})
+
+    @override_settings(LOCAL_CACHE_TIMEOUT=60)
+    def test_version_bumps_from_other_processes_are_picked_up(self):
+        banned_words.get_matcher()
+
+        # A write that doesn't signal this process, then the other worker's
+        # bump arriving through the shared cache
+        BannedWord.objects.bulk_create([BannedWord(word="scam")])
+        self.assertEqual(banned_words.get_matcher().match("scam"), set())
+
+        caching.bump_version(banned_words.VERSION_NAME)
+        self.assertEqual(banned_words.get_matcher().match("scam"), {"flag"})
+
+    @override_settings(LOCAL_CACHE_TIMEOUT=0)
+    def test_per_process_cache_rebuilds_after_the_local_timeout(self):
+        """Other workers' bumps can't reach a local cache, so don't keep it."""
+        banned_words.get_matcher()
+
+        BannedWord.objects.bulk_create([BannedWord(word="scam")])
+
+        self.assertEqual(banned_words.get_matcher().match("scam"), {"flag"})
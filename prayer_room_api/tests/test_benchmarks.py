@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from prayer_room_api.models import (
+    BannedWord,
+    DailyActivity,
+    Location,
+    PrayerPraiseRequest,
+    UserProfile,
+)
+
+
+class GenerateDataTests(TestCase):
+    def test_generates_a_dataset(self):
+        out = StringIO()
+
+        call_command(
+            "generate_data", "--requests", "300", "--locations", "3", stdout=out
+        )
+
+        self.assertIn("Generated 300 requests across 3 locations", out.getvalue())
+        self.assertEqual(PrayerPraiseRequest.objects.count(), 300)
+        self.assertEqual(Location.objects.filter(is_active=True).count(), 2)
+        generated = User.objects.filter(username__startswith="synthetic-user-")
+        self.assertEqual(generated.count(), 15)
+        self.assertEqual(UserProfile.objects.filter(user__in=generated).count(), 15)
+        self.assertEqual(BannedWord.objects.count(), 50)
+        self.assertTrue(PrayerPraiseRequest.objects.published().exists())
+        self.assertTrue(PrayerPraiseRequest.objects.pending_moderation().exists())
+        self.assertTrue(DailyActivity.objects.exists())
+
+    def test_clear_removes_generated_data(self):
+        kept = Location.objects.create(name="Main", slug="main")
+        call_command("generate_data", "--requests", "50", stdout=StringIO())
+        out = StringIO()
+
+        call_command("generate_data", "--clear", stdout=out)
+
+        self.assertIn("Deleted 50 generated requests.", out.getvalue())
+        self.assertFalse(PrayerPraiseRequest.objects.exists())
+        self.assertEqual(list(Location.objects.all()), [kept])
+        self.assertFalse(User.objects.filter(username__startswith="synthetic-"))
+        self.assertFalse(BannedWord.objects.exists())
+
+
+class BenchmarkApiTests(TestCase):
+    def test_writes_results_as_json(self):
+        call_command("generate_data", "--requests", "50", stdout=StringIO())
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        call_command(
+            "benchmark_api",
+            "--repeat",
+            "1",
+            "--task-repeat",
+            "1",
+            "--only",
+            "location-list|prayerpraiserequest-list$|staff moderation|relay",
+            "--output",
+            path,
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(report["meta"]["prayer_requests"], 50)
+        self.assertEqual(
+            sorted(report["results"]),
+            [
+                "api location-list",
+                "api prayerpraiserequest-list",
+                "staff moderation",
+                "task relay_outbox",
+            ],
+        )
+        location_list = report["results"]["api location-list"]
+        self.assertEqual(location_list["status"], 200)
+        self.assertEqual(location_list["queries"], 0)  # Served from the cache
+        for key in ("median_ms", "p95_ms", "peak_alloc_kb"):
+            self.assertIn(key, location_list)
+        self.assertEqual(report["results"]["staff moderation"]["status"], 200)
+        # Every call was rolled back.
+        self.assertFalse(User.objects.filter(username__startswith="benchmark-"))
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from prayer_room_api import stats
+from prayer_room_api.models import Location, PrayerPraiseRequest
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.location = Location.objects.create(name="Main", slug="main")
+        current = now()
+        self.pending = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Pending", created_at=current
+        )
+        self.approved = PrayerPraiseRequest.objects.create(
+            location=self.location,
+            content="Approved",
+            created_at=current - timedelta(days=2),
+            approved_at=current,
+        )
+        self.flagged = PrayerPraiseRequest.objects.create(
+            location=self.location,
+            content="Flagged",
+            created_at=current - timedelta(days=2),
+            flagged_at=current,
+        )
+        PrayerPraiseRequest.objects.create(
+            location=self.location,
+            content="Archived",
+            created_at=current - timedelta(days=40),
+            archived_at=current - timedelta(days=40),
+        )
+
+    def test_stats_take_two_queries(self):
+        """One aggregate for the counts and one UNION for the activity."""
+        with self.assertNumQueries(2):
+            result = stats.get_dashboard_stats(30)
+
+        self.assertEqual(
+            result["counts"],
+            {
+                "pending": 2,
+                "flagged": 1,
+                "awaiting_response": 1,
+                "new_today": 1,
+                "total_approved": 1,
+                "total_archived": 1,
+                "total_active": 1,
+            },
+        )
+        self.assertEqual(len(result["activity"]), 30)
+        today, two_days_ago = result["activity"][-1], result["activity"][-3]
+        self.assertEqual(
+            (today["submitted"], today["approved"], today["flagged"]), (1, 1, 1)
+        )
+        self.assertEqual(two_days_ago["submitted"], 2)
+
+    def test_stats_are_cached_until_a_moderation_write(self):
+        stats.get_dashboard_stats(30)
+        with self.assertNumQueries(0):
+            stats.get_dashboard_stats(30)
+
+        PrayerPraiseRequest.objects.filter(pk=self.pending.pk).update_with_events(
+            approved_at=now()
+        )
+
+        result = stats.get_dashboard_stats(30)
+        self.assertEqual(result["counts"]["total_approved"], 2)
+
+    def test_prayer_count_taps_keep_the_cache(self):
+        stats.get_dashboard_stats(30)
+
+        PrayerPraiseRequest.objects.increment_prayer_count(self.approved.pk)
+
+        with self.assertNumQueries(0):
+            stats.get_dashboard_stats(30)
+
+    def test_dashboard_view_renders(self):
+        staff = User.objects.create_user(username="staff", is_staff=True)
+        self.client.force_login(staff)
+
+        response = self.client.get(reverse("staff-dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        tiles = {tile["key"]: tile["count"] for tile in response.context["tiles"]}
+        self.assertEqual(tiles, {"pending": 2, "flagged": 1, "respond": 1, "new": 1})
+
+    def test_dashboard_longer_windows(self):
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+
+        response = self.client.get(reverse("staff-dashboard"), {"days": 365})
+        self.assertEqual(len(response.context["activity"]), 365)
+
+        response = self.client.get(reverse("staff-dashboard"), {"days": 7})
+        self.assertEqual(len(response.context["activity"]), 30)
@@ -1,6 +1,10 @@
+from datetime import timedelta
+
+import markdown
 from django.template import Context, Template
 from django.test import TestCase
 
+from prayer_room_api import emails
 from prayer_room_api.models import EmailLog, EmailTemplate
 
 
@@ -68,6 +72,53 @@ class EmailTemplateModelTests(TestCase):
         self.assertIn("Hello John", html)
 
 
+class EmailEngineTests(TestCase):
+    def setUp(self):
+        EmailTemplate.objects.filter(
+            template_type=EmailTemplate.TemplateType.RESPONSE_NOTIFICATION
+        ).delete()
+        self.template = EmailTemplate.objects.create(
+            template_type=EmailTemplate.TemplateType.RESPONSE_NOTIFICATION,
+            subject="Test: {{ recipient_name }}",
+            body_markdown="# Hello {{ recipient_name }}\n\nThank you.",
+            is_active=True,
+        )
+
+    def test_render_matches_uncompiled_output(self):
+        subject, text, html = emails.render(self.template, {"recipient_name": "Jo"})
+
+        self.assertEqual(subject, "Test: Jo")
+        self.assertEqual(text, "# Hello Jo\n\nThank you.")
+        self.assertEqual(html, markdown.markdown(text))
+
+    def test_compiled_template_is_reused_until_edited(self):
+        compiled = emails.get_compiled(self.template)
+        same = EmailTemplate.objects.get(pk=self.template.pk)
+        self.assertIs(emails.get_compiled(same), compiled)
+
+        self.template.subject = "Edited: {{ recipient_name }}"
+        self.template.save()
+
+        recompiled = emails.get_compiled(self.template)
+        self.assertIsNot(recompiled, compiled)
+        self.assertEqual(recompiled.render({"recipient_name": "Jo"})[0], "Edited: Jo")
+
+    def test_old_versions_are_dropped(self):
+        emails.get_compiled(self.template)
+        self.template.updated_at += timedelta(seconds=1)
+        emails.get_compiled(self.template)
+
+        keys = [key for key in emails._compiled if key[0] == self.template.pk]
+        self.assertEqual(keys, [(self.template.pk, self.template.updated_at)])
+
+    def test_reused_markdown_converter_renders_each_recipient(self):
+        for name in ("Jo", "Sam"):
+            _, text, html = emails.render(self.template, {"recipient_name": name})
+
+            self.assertEqual(html, markdown.markdown(text))
+            self.assertIn(f"Hello {name}", html)
+
+
 class EmailLogModelTests(TestCase):
     def setUp(self):
         # Use existing template from seed migration or create new one
@@ -0,0 +1,210 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from prayer_room_api import exports
+from prayer_room_api.models import Location, PrayerPraiseRequest
+
+
+class PrayerRequestExportTests(TestCase):
+    def setUp(self):
+        self.main = Location.objects.create(name="Main", slug="main")
+        self.other = Location.objects.create(name="Other", slug="other")
+        self.poster = User.objects.create_user(username="poster")
+
+        def create(day, location, **fields):
+            created_at = datetime(2024, 1, day, 12, tzinfo=timezone.utc)
+            return PrayerPraiseRequest.objects.create(
+                location=location,
+                content=f"Request on the {day}",
+                created_at=created_at,
+                **fields,
+            )
+
+        approved = datetime(2024, 1, 2, tzinfo=timezone.utc)
+        self.published = create(
+            1, self.main, approved_at=approved, created_by=self.poster
+        )
+        self.pending = create(2, self.main, name="Sam, with a comma")
+        self.flagged = create(3, self.other, approved_at=approved, flagged_at=approved)
+        self.archived = create(4, self.main, archived_at=approved)
+
+        self.url = reverse("prayer-export")
+        self.client.force_login(
+            User.objects.create_user(username="staff", is_staff=True)
+        )
+
+    def _csv(self, response):
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.DictReader(io.StringIO(content)))
+
+    def test_staff_only(self):
+        self.client.logout()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_csv(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertRegex(
+            response["Content-Disposition"],
+            r'^attachment; filename="prayer-requests-\d{4}-\d{2}-\d{2}\.csv"$',
+        )
+        rows = self._csv(response)
+        self.assertEqual(
+            [int(row["id"]) for row in rows],
+            [self.published.pk, self.pending.pk, self.flagged.pk, self.archived.pk],
+        )
+        self.assertEqual(list(rows[0]), list(exports.COLUMNS))
+        self.assertEqual(rows[0]["location"], "main")
+        self.assertEqual(rows[0]["created_by"], "poster")
+        self.assertEqual(rows[0]["created_at"], "2024-01-01 12:00:00+00:00")
+        self.assertEqual(rows[1]["name"], "Sam, with a comma")
+        self.assertEqual(rows[1]["created_by"], "")
+
+    def test_jsonl(self):
+        response = self.client.get(self.url, {"format": "jsonl", "status": "pending"})
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        content = b"".join(response.streaming_content).decode()
+        (row,) = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(row["id"], self.pending.pk)
+        self.assertEqual(row["created_at"], "2024-01-02T12:00:00Z")
+        self.assertIsNone(row["approved_at"])
+
+    def test_filters(self):
+        for params, expected in (
+            ({"status": "published"}, [self.published, self.flagged]),
+            ({"status": "flagged"}, [self.flagged]),
+            ({"status": "archived"}, [self.archived]),
+            ({"location": self.other.pk}, [self.flagged]),
+            (
+                {"since": "2024-01-02", "until": "2024-01-03"},
+                [self.pending, self.flagged],
+            ),
+            ({"until": "2024-01-01"}, [self.published]),
+        ):
+            with self.subTest(params):
+                rows = self._csv(self.client.get(self.url, params))
+                self.assertEqual(
+                    [int(row["id"]) for row in rows], [p.pk for p in expected]
+                )
+
+    def test_invalid_filters(self):
+        for params in (
+            {"location": "other"},
+            {"location": 0},
+            {"status": "lost"},
+            {"format": "xml"},
+            {"since": "2024-02-01", "until": "2024-01-01"},
+        ):
+            with self.subTest(params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_slugs(self):
+        Location.objects.create(name="Main again", slug="main")
+
+        rows = self._csv(self.client.get(self.url, {"location": self.main.pk}))
+
+        self.assertEqual(
+            [int(row["id"]) for row in rows],
+            [self.published.pk, self.pending.pk, self.archived.pk],
+        )
+
+    def test_formulas_are_escaped(self):
+        self.pending.name = "=HYPERLINK(\"http://example.com\")"
+        self.pending.content = "-2+3"
+        self.pending.save()
+
+        rows = self._csv(self.client.get(self.url, {"status": "pending"}))
+
+        self.assertEqual(rows[0]["name"], "'=HYPERLINK(\"http://example.com\")")
+        self.assertEqual(rows[0]["content"], "'-2+3")
+        self.assertEqual(rows[0]["prayer_count"], "0")
+
+    async def test_async_iterator_under_asgi(self):
+        await self.async_client.aforce_login(
+            await User.objects.aget(username="staff")
+        )
+
+        response = await self.async_client.get(self.url, {"format": "jsonl"})
+
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(
+            [json.loads(line)["id"] for line in content.decode().splitlines()],
+            [self.published.pk, self.pending.pk, self.flagged.pk, self.archived.pk],
+        )
+
+    def test_one_query_in_chunks(self):
+        with self.assertNumQueries(1):
+            chunks = list(
+                exports.export(exports.export_queryset(), "jsonl", chunk_size=3)
+            )
+
+        self.assertEqual([chunk.count("\n") for chunk in chunks], [3, 1])
+
+    async def test_aexport_matches_export(self):
+        queryset = exports.export_queryset()
+
+        chunks = [chunk async for chunk in exports.aexport(queryset, chunk_size=3)]
+
+        expected = await sync_to_async(list)(
+            exports.export(queryset, chunk_size=3)
+        )
+        self.assertEqual("".join(chunks), "".join(expected))
+
+
+class ExportPrayerRequestsCommandTests(TestCase):
+    def setUp(self):
+        location = Location.objects.create(name="Main", slug="main")
+        self.prayer = PrayerPraiseRequest.objects.create(
+            location=location,
+            content="Please pray",
+            created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        )
+
+    def test_writes_to_stdout(self):
+        out = io.StringIO()
+
+        call_command("export_prayer_requests", "--format", "jsonl", stdout=out)
+
+        (row,) = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(row["id"], self.prayer.pk)
+        self.assertEqual(row["location"], "main")
+
+    def test_writes_to_a_file(self):
+        path = os.path.join(
+            self.enterContext(tempfile.TemporaryDirectory()), "export.csv"
+        )
+
+        call_command("export_prayer_requests", "--output", path, "--status", "pending")
+
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row["content"] for row in rows], ["Please pray"])
+
+    def test_invalid_filters(self):
+        with self.assertRaisesMessage(CommandError, "--location: Select a valid"):
+            call_command("export_prayer_requests", "--location", "0")
+        with self.assertRaisesMessage(CommandError, "start date must be before"):
+            call_command(
+                "export_prayer_requests",
+                "--since",
+                "2024-02-01",
+                "--until",
+                "2024-01-01",
+            )
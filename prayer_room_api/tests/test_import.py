@@ -0,0 +1,208 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import tablib
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from prayer_room_api.models import DailyActivity, Location, PrayerPraiseRequest
+from prayer_room_api.resources import (
+    BulkPrayerRequestResource,
+    PrayerRequestResource,
+    parse_created_at,
+)
+
+HEADERS = [
+    "id",
+    "type",
+    "name",
+    "prayer",
+    "created_at",
+    "Location",
+    "Prayer Count",
+    "Date time prayer flagged",
+    "archived_at",
+    "Archived",
+]
+
+
+def export_row(day, location="Main", **values):
+    row = {
+        "id": "",
+        "type": "prayer",
+        "name": "Sam",
+        "prayer": f"Request on the {day}",
+        "created_at": f"{day}/1/2025 5:26pm",
+        "Location": location,
+        "Prayer Count": "3",
+        "Date time prayer flagged": "",
+        "archived_at": "",
+        "Archived": "",
+    }
+    row.update(values)
+    return [row[header] for header in HEADERS]
+
+
+class ParseCreatedAtTests(TestCase):
+    def test_formats(self):
+        for value, expected in (
+            ("2025-01-15T17:26:00", datetime(2025, 1, 15, 17, 26)),
+            (
+                "2025-01-15 17:26:00+00:00",
+                datetime(2025, 1, 15, 17, 26, tzinfo=timezone.utc),
+            ),
+            ("15/1/2025 5:26pm", datetime(2025, 1, 15, 17, 26)),
+            ("3/1/2025 9:05AM", datetime(2025, 1, 3, 9, 5)),
+            ("03/01/2025 09:05", datetime(2025, 1, 3, 9, 5)),
+            ("3/1/2025", datetime(2025, 1, 3)),
+            # dateutil, day first
+            ("3 Jan 2025 9:05", datetime(2025, 1, 3, 9, 5)),
+        ):
+            with self.subTest(value):
+                self.assertEqual(parse_created_at(value), expected)
+
+
+class BulkPrayerRequestResourceTests(TestCase):
+    def setUp(self):
+        self.main = Location.objects.create(name="Main", slug="main")
+        Location.objects.create(name="Other", slug="other")
+
+    def _import(self, *rows, dry_run=False):
+        dataset = tablib.Dataset(*rows, headers=HEADERS)
+        return BulkPrayerRequestResource().import_data(
+            dataset, dry_run=dry_run, use_transactions=True
+        )
+
+    def test_imports_rows_like_the_row_by_row_resource(self):
+        rows = [
+            export_row(15, **{"Date time prayer flagged": "16/01/2025 9:30am"}),
+            export_row(16, location="Other", Archived="checked", type="praise"),
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self._import(*rows)
+
+        # Locations are loaded once up front and the rows inserted together
+        statements = [
+            query["sql"].split()[0]
+            for query in queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        self.assertEqual(statements, ["SELECT", "INSERT"])
+        self.assertFalse(result.has_errors())
+        self.assertEqual(result.totals["new"], 2)
+        first, second = PrayerPraiseRequest.objects.order_by("created_at")
+        self.assertEqual(first.location, self.main)
+        self.assertEqual(first.content, "Request on the 15")
+        self.assertEqual(first.prayer_count, 3)
+        self.assertEqual(first.created_at.day, 15)
+        self.assertEqual(first.created_at.hour, 17)
+        self.assertEqual(first.flagged_at.day, 16)
+        self.assertIsNone(first.archived_at)
+        self.assertEqual(second.location.slug, "other")
+        self.assertEqual(second.type, "praise")
+        self.assertIsNotNone(second.archived_at)
+
+    def test_matches_the_row_by_row_resource(self):
+        row = export_row(15, **{"Date time prayer flagged": "16/01/2025 9:30am"})
+        fields = ["type", "name", "content", "created_at", "location", "flagged_at"]
+        PrayerRequestResource().import_data(tablib.Dataset(row, headers=HEADERS))
+        self._import(row)
+
+        row_by_row, bulk = PrayerPraiseRequest.objects.order_by("pk").values(*fields)
+        self.assertEqual(bulk, row_by_row)
+
+    def test_only_the_bulk_resource_reads_ambiguous_dates_day_first(self):
+        row = export_row(3)
+        PrayerRequestResource().import_data(tablib.Dataset(row, headers=HEADERS))
+        admin = PrayerPraiseRequest.objects.get()
+        self._import(row)
+        bulk = PrayerPraiseRequest.objects.exclude(pk=admin.pk).get()
+
+        self.assertEqual((admin.created_at.day, admin.created_at.month), (1, 3))
+        self.assertEqual((bulk.created_at.day, bulk.created_at.month), (3, 1))
+
+    def test_unknown_location_is_a_row_error(self):
+        result = self._import(export_row(15), export_row(16, location="Nowhere"))
+
+        self.assertTrue(result.has_errors())
+        ((number, errors),) = result.row_errors()
+        self.assertEqual(number, 2)
+        self.assertIn("Nowhere", str(errors[0].error))
+        self.assertFalse(PrayerPraiseRequest.objects.exists())
+
+    def test_dry_run_rolls_back(self):
+        result = self._import(export_row(15), dry_run=True)
+
+        self.assertEqual(result.totals["new"], 1)
+        self.assertIsNone(result.rows[0].diff)
+        self.assertFalse(PrayerPraiseRequest.objects.exists())
+
+
+class ImportPrayerRequestsCommandTests(TestCase):
+    def setUp(self):
+        Location.objects.create(name="Main", slug="main")
+        self.path = os.path.join(
+            self.enterContext(tempfile.TemporaryDirectory()), "export.csv"
+        )
+
+    def _write(self, *rows):
+        with open(self.path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADERS)
+            writer.writerows(rows)
+
+    def test_imports_in_chunks(self):
+        self._write(*[export_row(day) for day in range(1, 6)], export_row(6, id="500"))
+        out = io.StringIO()
+
+        call_command(
+            "import_prayer_requests", self.path, "--chunk-size", "4", stdout=out
+        )
+
+        output = out.getvalue()
+        self.assertIn("Rows 1-4:", output)
+        self.assertIn("Rows 5-6:", output)
+        self.assertIn("Imported 6 rows", output)
+        self.assertEqual(PrayerPraiseRequest.objects.count(), 6)
+        self.assertEqual(
+            sum(DailyActivity.objects.values_list("submitted", flat=True)), 6
+        )
+        # The sequence moved past the id from the file
+        later = PrayerPraiseRequest.objects.create(
+            location=Location.objects.get(),
+            content="Later",
+            created_at=datetime.now(timezone.utc),
+        )
+        self.assertGreater(later.pk, 500)
+
+    def test_failing_chunks_are_rolled_back(self):
+        self._write(export_row(1), export_row(2), export_row(3, location="Nowhere"))
+        err = io.StringIO()
+
+        with self.assertRaisesMessage(CommandError, "1 rows were rolled back"):
+            call_command(
+                "import_prayer_requests",
+                self.path,
+                "--chunk-size",
+                "2",
+                stdout=io.StringIO(),
+                stderr=err,
+            )
+
+        self.assertIn("Row 3:", err.getvalue())
+        self.assertEqual(PrayerPraiseRequest.objects.count(), 2)
+
+    def test_dry_run(self):
+        self._write(export_row(1))
+        out = io.StringIO()
+
+        call_command("import_prayer_requests", self.path, "--dry-run", stdout=out)
+
+        self.assertIn("Validated 1 rows", out.getvalue())
+        self.assertFalse(PrayerPraiseRequest.objects.exists())
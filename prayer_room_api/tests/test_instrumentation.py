@@ -0,0 +1,189 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+
+from prayer_room_api import banned_words
+from prayer_room_api.instrumentation import (
+    QueryInstrumentationMiddleware,
+    assert_max_queries,
+    collect,
+    fingerprint,
+)
+from prayer_room_api.models import Location, PrayerPraiseRequest
+
+
+class QueryStatsTests(TestCase):
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        self.assertEqual(
+            fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s, %s, %s) LIMIT 21'),
+            fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s, %s) LIMIT 21'),
+        )
+
+    def test_repeated_statements_are_counted_as_duplicates(self):
+        locations = [
+            Location.objects.create(name=f"L{i}", slug=f"l{i}") for i in range(3)
+        ]
+
+        with collect() as stats:
+            for location in locations:
+                Location.objects.get(pk=location.pk)
+            list(User.objects.all())
+
+        self.assertEqual(stats.count, 4)
+        self.assertEqual(stats.duplicates, 2)
+        sql, count = stats.most_repeated()
+        self.assertIn("prayer_room_api_location", sql)
+        self.assertEqual(count, 3)
+
+    def test_assert_max_queries_names_the_repeated_statement(self):
+        location = Location.objects.create(name="Main", slug="main")
+
+        with self.assertRaisesRegex(
+            AssertionError, "3 queries run, budget is 2; repeated 3 times: SELECT"
+        ):
+            with assert_max_queries(2):
+                for _ in range(3):
+                    Location.objects.get(pk=location.pk)
+
+    def test_assert_max_queries_within_budget(self):
+        with assert_max_queries(1) as stats:
+            Location.objects.count()
+
+        self.assertEqual(stats.count, 1)
+
+
+class QueryInstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Location.objects.create(name="Main", slug="main")
+
+    def test_server_timing_header_for_staff(self):
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+
+        response = self.client.get(reverse("location-list"))
+
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('dbdup;desc="0 duplicate queries"', timing)
+        self.assertRegex(timing, r"app;dur=[\d.]+$")
+
+    def test_log_line(self):
+        with self.assertLogs("prayer_room_api.instrumentation", "INFO") as logs:
+            self.client.get(reverse("location-list"))
+
+        (record,) = logs.records
+        self.assertEqual(record.path, "/api/locations/")
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.queries, 0)
+        self.assertIn("method=GET path=/api/locations/ status=200", logs.output[0])
+
+    def test_no_server_timing_header_for_the_public(self):
+        with self.assertLogs("prayer_room_api.instrumentation", "INFO"):
+            response = self.client.get(reverse("location-list"))
+
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_header_with_debug(self):
+        middleware = QueryInstrumentationMiddleware(lambda request: HttpResponse())
+
+        response = middleware(RequestFactory().get("/"))
+
+        self.assertIn("Server-Timing", response)
+
+    async def test_server_timing_header_for_staff_under_asgi(self):
+        staff = await User.objects.acreate_user("staff", is_staff=True)
+        await self.async_client.aforce_login(staff)
+
+        response = await self.async_client.get(reverse("location-list"))
+
+        self.assertIn("Server-Timing", response)
+
+    async def test_no_server_timing_header_for_the_public_under_asgi(self):
+        response = await self.async_client.get(reverse("location-list"))
+
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(QUERY_INSTRUMENTATION=False)
+    def test_can_be_turned_off(self):
+        response = self.client.get(reverse("location-list"))
+
+        self.assertNotIn("Server-Timing", response)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Query budgets for the busiest routes, checked with enough rows that an
+    N+1 would blow them.
+    """
+
+    ROWS = 30
+
+    def setUp(self):
+        cache.clear()
+        banned_words.invalidate()
+        self.location = Location.objects.create(name="Main", slug="main")
+        poster = User.objects.create_user(username="poster")
+        current = now()
+        PrayerPraiseRequest.objects.bulk_create(
+            PrayerPraiseRequest(
+                location=self.location,
+                created_by=poster,
+                content=f"Request {i}",
+                created_at=current,
+                approved_at=current if i % 3 else None,
+                flagged_at=current if i % 5 == 0 else None,
+                response_comment="Praying" if i % 2 else "",
+            )
+            for i in range(self.ROWS)
+        )
+        token = Token.objects.create(user=User.objects.create_user(username="api"))
+        self.api_headers = {"Authorization": f"Token {token.key}"}
+        self.staff = User.objects.create_user(username="staff", is_staff=True)
+
+    def test_prayer_feed(self):
+        url = reverse("prayerpraiserequest-list")
+        self.client.get(url, headers=self.api_headers)
+
+        with assert_max_queries(2):
+            response = self.client.get(
+                url, {"page_size": self.ROWS}, headers=self.api_headers
+            )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_prayer_submission(self):
+        url = reverse("prayerpraiserequest-list")
+        data = {"location": self.location.pk, "content": "Please pray"}
+        self.client.post(url, data, "application/json", headers=self.api_headers)
+
+        with assert_max_queries(3):
+            response = self.client.post(
+                url, data, "application/json", headers=self.api_headers
+            )
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_read_only_content(self):
+        for basename in ("location", "prayerinspiration", "prayerresource"):
+            with self.subTest(basename), assert_max_queries(1):
+                response = self.client.get(reverse(f"{basename}-list"))
+            self.assertEqual(response.status_code, 200)
+
+    def test_staff_views(self):
+        self.client.force_login(self.staff)
+        for name, budget in (
+            ("staff-dashboard", 2),
+            ("moderation", 3),
+            ("flagged", 4),
+            ("prayer-response", 4),
+        ):
+            url = reverse(name)
+            self.client.get(url)
+            with self.subTest(name), assert_max_queries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
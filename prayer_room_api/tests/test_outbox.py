@@ -0,0 +1,111 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from prayer_room_api import outbox
+from prayer_room_api.models import OutboxEvent
+
+
+@patch("prayer_room_api.tasks.send_pending_notifications.delay")
+@patch("prayer_room_api.webhooks.deliver")
+class OutboxRelayTests(TestCase):
+    def test_events_are_handed_over_once_per_topic(self, mock_deliver, mock_send):
+        """Each topic's handler gets the whole batch in one call."""
+        outbox.publish(outbox.NOTIFICATIONS)
+        outbox.publish(outbox.NOTIFICATIONS)
+        outbox.publish_many(outbox.WEBHOOKS, [{"key": "a"}, {"key": "b"}])
+
+        self.assertEqual(outbox.relay(), 4)
+
+        mock_send.assert_called_once_with()
+        mock_deliver.assert_called_once_with([{"key": "a"}, {"key": "b"}])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_rolled_back_events_are_never_relayed(self, mock_deliver, mock_send):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            outbox.publish(outbox.NOTIFICATIONS)
+            raise RuntimeError
+
+        self.assertEqual(outbox.relay(), 0)
+        mock_send.assert_not_called()
+
+    def test_failed_topics_stay_for_the_next_pass(self, mock_deliver, mock_send):
+        """A failing handler keeps its events without holding up the rest."""
+        mock_send.side_effect = ConnectionError("broker unavailable")
+        outbox.publish(outbox.NOTIFICATIONS)
+        outbox.publish(outbox.WEBHOOKS, {"key": "a"})
+
+        self.assertEqual(outbox.relay(), 1)
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.topic, outbox.NOTIFICATIONS)
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, "broker unavailable")
+        mock_deliver.assert_called_once()
+
+        # Not retried before its backoff is up
+        mock_send.side_effect = None
+        self.assertEqual(outbox.relay(), 0)
+
+        OutboxEvent.objects.update(next_attempt_at=now())
+        self.assertEqual(outbox.relay(), 1)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    @override_settings(OUTBOX_RETRY_DELAY=30, OUTBOX_MAX_ATTEMPTS=3)
+    def test_backoff_then_failed(self, mock_deliver, mock_send):
+        mock_send.side_effect = ConnectionError("broker unavailable")
+        outbox.publish(outbox.NOTIFICATIONS)
+
+        delays = []
+        for _ in range(3):
+            OutboxEvent.objects.update(next_attempt_at=now())
+            started = now()
+            outbox.relay()
+            event = OutboxEvent.objects.get()
+            delays.append(round((event.next_attempt_at - started).total_seconds()))
+
+        self.assertEqual(delays[:2], [30, 60])
+        self.assertEqual(event.status, OutboxEvent.Status.FAILED)
+        self.assertEqual(event.attempts, 3)
+        OutboxEvent.objects.update(next_attempt_at=now())
+        self.assertEqual(outbox.relay(), 0)
+        self.assertEqual(mock_send.call_count, 3)
+
+    def test_unknown_topics_fail_straight_away(self, mock_deliver, mock_send):
+        outbox.publish("retired")
+        outbox.publish(outbox.NOTIFICATIONS)
+
+        with self.assertLogs("prayer_room_api.outbox", "ERROR"):
+            self.assertEqual(outbox.relay(), 1)
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.status, OutboxEvent.Status.FAILED)
+        self.assertEqual(event.last_error, "No handler for 'retired'")
+
+    def test_claimed_events_are_not_claimed_again(self, mock_deliver, mock_send):
+        """Another relay running while a batch is handled skips it."""
+        mock_send.side_effect = lambda: self.assertEqual(outbox.claim(), [])
+        outbox.publish(outbox.NOTIFICATIONS)
+
+        self.assertEqual(outbox.relay(), 1)
+        mock_send.assert_called_once_with()
+
+    def test_relays_in_batches(self, mock_deliver, mock_send):
+        outbox.publish_many(outbox.WEBHOOKS, [{"key": str(i)} for i in range(5)])
+
+        self.assertEqual(outbox.relay(batch_size=2), 5)
+
+        self.assertEqual(mock_deliver.call_count, 3)
+
+    def test_relay_outbox_command(self, mock_deliver, mock_send):
+        outbox.publish(outbox.NOTIFICATIONS)
+        out = StringIO()
+
+        call_command("relay_outbox", "--once", stdout=out)
+
+        self.assertIn("Relayed 1 outbox events.", out.getvalue())
+        mock_send.assert_called_once_with()
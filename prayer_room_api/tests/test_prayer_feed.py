@@ -0,0 +1,251 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from prayer_room_api import counters
+from prayer_room_api.checks import check_prayer_count_buffer
+from prayer_room_api.models import (
+    Location,
+    PrayerPraiseRequest,
+    PrayerPraiseRequestQuerySet,
+)
+from prayer_room_api.renderers import ORJSONRenderer
+from prayer_room_api.serializers import (
+    PrayerPraiseRequestSerializer,
+    prayer_feed_data,
+    prayer_feed_values,
+)
+from prayer_room_api.tasks import flush_prayer_counts
+
+
+class PrayerFeedPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="feeduser")
+        self.client.force_authenticate(self.user)
+        self.location = Location.objects.create(name="Main", slug="main")
+        base = now() - timedelta(days=1)
+        self.prayers = [
+            PrayerPraiseRequest.objects.create(
+                location=self.location,
+                content=f"Prayer {i}",
+                created_at=base + timedelta(minutes=i),
+                approved_at=base,
+            )
+            for i in range(5)
+        ]
+        self.url = reverse("prayerpraiserequest-list")
+
+    def _ids(self, results):
+        return [row["id"] for row in results]
+
+    def test_list_without_pagination_params_returns_full_list(self):
+        """Existing clients keep getting a plain list of every visible request."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self._ids(response.data), [p.id for p in reversed(self.prayers)]
+        )
+
+    def test_cursor_pages_walk_the_feed_newest_first(self):
+        """Following next links yields every request exactly once."""
+        response = self.client.get(self.url, {"page_size": 2})
+        seen = self._ids(response.data["results"])
+        self.assertTrue(response.data["has_more"])
+
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            seen += self._ids(response.data["results"])
+
+        self.assertEqual(seen, [p.id for p in reversed(self.prayers)])
+
+    def test_since_cursor_returns_only_newer_requests(self):
+        """Polling with since_cursor returns just the requests added since."""
+        response = self.client.get(self.url, {"page_size": 10})
+        since_cursor = response.data["since_cursor"]
+
+        newer = PrayerPraiseRequest.objects.create(
+            location=self.location,
+            content="Fresh prayer",
+            approved_at=now(),
+        )
+
+        response = self.client.get(self.url, {"since_cursor": since_cursor})
+        self.assertEqual(self._ids(response.data["results"]), [newer.id])
+        self.assertFalse(response.data["has_more"])
+        self.assertNotEqual(response.data["since_cursor"], since_cursor)
+
+        response = self.client.get(
+            self.url, {"since_cursor": response.data["since_cursor"]}
+        )
+        self.assertEqual(response.data["results"], [])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class PrayerFeedFastPathTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="fast"))
+        location = Location.objects.create(name="Café ☕", slug="main")
+        stamp = now().replace(microsecond=123456)
+        PrayerPraiseRequest.objects.create(
+            location=location,
+            content='Quotes " and \\ slashes, \u2028 separators \u2029 and \u00e9',
+            name="Zoë",
+            created_at=stamp,
+            approved_at=stamp,
+            flagged_at=stamp,
+            prayer_count=7,
+        )
+        PrayerPraiseRequest.objects.create(
+            location=location,
+            content="Line\nbreak\tand \x01 control",
+            type=PrayerPraiseRequest.PrayerType.PRAISE,
+            response_comment="Praying",
+            created_at=stamp - timedelta(hours=1),
+            approved_at=stamp,
+        )
+        self.queryset = PrayerPraiseRequest.objects.published().select_related(
+            "location"
+        )
+
+    def test_output_is_byte_identical_to_the_serializer(self):
+        expected = JSONRenderer().render(
+            PrayerPraiseRequestSerializer(self.queryset, many=True).data
+        )
+
+        fast = ORJSONRenderer().render(
+            prayer_feed_data(prayer_feed_values(self.queryset))
+        )
+
+        self.assertEqual(fast, expected)
+
+    def test_list_endpoint_uses_the_fast_path(self):
+        expected = JSONRenderer().render(
+            PrayerPraiseRequestSerializer(
+                self.queryset.order_by("-created_at", "-id"), many=True
+            ).data
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("prayerpraiserequest-list"))
+
+        self.assertEqual(response.content, expected)
+
+    def test_renderer_falls_back_for_indented_output(self):
+        data = {"name": "Zoë"}
+
+        self.assertEqual(
+            ORJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+    def test_benchmark_feed_command(self):
+        out = StringIO()
+
+        call_command("benchmark_feed", "--rows", "2", "5", "--repeat", "1", stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("2 rows:", output)
+        self.assertIn("5 rows: only 2 available", output)
+
+
+@override_settings(DJANGO_WEBHOOK={"USE_CACHE": False})
+class IncrementPrayerCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="tapper"))
+        self.location = Location.objects.create(name="Main", slug="main")
+        self.prayer = PrayerPraiseRequest.objects.create(
+            location=self.location,
+            content="Please pray",
+            approved_at=now(),
+            prayer_count=3,
+        )
+
+    def _url(self, prayer):
+        return reverse("prayerpraiserequest-increment-prayer-count", args=[prayer.pk])
+
+    def test_increment_is_a_single_statement(self):
+        with self.assertNumQueries(2):  # UPDATE ... RETURNING, webhook lookup
+            count = counters.record_prayer(self.prayer.pk)
+
+        self.assertEqual(count, 4)
+        self.prayer.refresh_from_db()
+        self.assertEqual(self.prayer.prayer_count, 4)
+
+    def test_increment_endpoint_returns_new_count(self):
+        response = self.client.post(self._url(self.prayer))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"prayer_count": 4})
+
+    def test_increment_endpoint_404s_for_unpublished_requests(self):
+        pending = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Not approved yet"
+        )
+
+        response = self.client.post(self._url(pending))
+
+        self.assertEqual(response.status_code, 404)
+        pending.refresh_from_db()
+        self.assertEqual(pending.prayer_count, 0)
+
+    @override_settings(PRAYER_COUNT_BUFFERED=True)
+    @patch("prayer_room_api.tasks.flush_prayer_counts.apply_async")
+    def test_buffered_taps_are_flushed_in_one_batch(self, mock_schedule):
+        counts = [counters.record_prayer(self.prayer.pk) for _ in range(3)]
+
+        self.assertEqual(counts, [4, 5, 6])
+        mock_schedule.assert_called_once()
+        self.prayer.refresh_from_db()
+        self.assertEqual(self.prayer.prayer_count, 3)
+
+        # savepoint, UPDATE ... RETURNING, webhook lookup, release
+        with self.assertNumQueries(4):
+            flush_prayer_counts()
+
+        self.prayer.refresh_from_db()
+        self.assertEqual(self.prayer.prayer_count, 6)
+        self.assertEqual(counters.record_prayer(self.prayer.pk), 7)
+
+    @override_settings(PRAYER_COUNT_BUFFERED=True)
+    @patch("prayer_room_api.tasks.flush_prayer_counts.apply_async")
+    def test_failed_flush_keeps_the_taps(self, mock_schedule):
+        counters.record_prayer(self.prayer.pk)
+        counters.record_prayer(self.prayer.pk)
+
+        with patch.object(
+            PrayerPraiseRequestQuerySet,
+            "update_with_events",
+            side_effect=OperationalError("database unavailable"),
+        ):
+            with self.assertRaises(OperationalError):
+                flush_prayer_counts()
+
+        flush_prayer_counts()
+
+        self.prayer.refresh_from_db()
+        self.assertEqual(self.prayer.prayer_count, 5)
+
+    @override_settings(PRAYER_COUNT_BUFFERED=True)
+    def test_buffering_needs_a_shared_cache(self):
+        (error,) = check_prayer_count_buffer(None)
+        self.assertEqual(error.id, "prayer_room_api.E001")
+
+        with override_settings(PRAYER_COUNT_BUFFERED=False):
+            self.assertEqual(check_prayer_count_buffer(None), [])
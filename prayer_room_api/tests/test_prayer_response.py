@@ -77,7 +77,7 @@ class PrayerResponseViewTests(TestCase):
         has_empty_message = any(escape(msg) in content for msg in EMPTY_QUEUE_MESSAGES)
         self.assertTrue(has_empty_message, "Expected one of the empty queue messages")
 
-    @patch("prayer_room_api.tasks.send_response_notification.delay")
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
     def test_get_excludes_prayers_with_response(self, mock_task):
         self.eligible_prayer.response_comment = "Already responded"
         self.eligible_prayer.save()
@@ -96,7 +96,7 @@ class PrayerResponseViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertNotContains(response, "Please pray for my family")
 
-    @patch("prayer_room_api.tasks.send_response_notification.delay")
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
     def test_post_respond_saves_response_comment(self, mock_task):
         self.client.login(username="staffuser", password="testpass123")
         response = self.client.post(
@@ -238,7 +238,7 @@ class PrayerResponseIntegrationTests(TestCase):
         self.assertContains(response, "First prayer request")
         self.assertContains(response, "Second prayer request")
 
-    @patch("prayer_room_api.tasks.send_response_notification.delay")
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
     def test_respond_removes_prayer_from_list(self, mock_task):
         self.client.login(username="staffuser", password="testpass123")
 
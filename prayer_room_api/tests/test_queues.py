@@ -0,0 +1,45 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.timezone import now
+
+from prayer_room_api.models import Location, PrayerPraiseRequest
+
+
+class StaffQueueTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="Main", slug="main")
+
+    def _create(self, **kwargs):
+        return PrayerPraiseRequest.objects.create(
+            location=self.location, content="Please pray", **kwargs
+        )
+
+    def test_queues_select_the_right_requests(self):
+        pending = self._create()
+        flagged = self._create(flagged_at=now())
+        awaiting = self._create(approved_at=now())
+        self._create(approved_at=now(), response_comment="Amen")
+        self._create(approved_at=now(), response_skipped_at=now())
+        self._create(archived_at=now(), flagged_at=now())
+
+        queues = PrayerPraiseRequest.objects
+        self.assertEqual(list(queues.pending_moderation()), [flagged, pending])
+        self.assertEqual(list(queues.flagged_queue()), [flagged])
+        self.assertEqual(list(queues.awaiting_response()), [awaiting])
+
+    def test_benchmark_queues_command(self):
+        call_command("generate_data", "--requests", "200", stdout=StringIO())
+        out = StringIO()
+
+        call_command("benchmark_queues", "--repeat", "1", stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("200 prayer requests", output)
+        for index_name in (
+            "prayer_moderation_queue_idx",
+            "prayer_flagged_queue_idx",
+            "prayer_response_queue_idx",
+        ):
+            self.assertIn(index_name, output)
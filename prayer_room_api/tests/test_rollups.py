@@ -0,0 +1,99 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.timezone import localdate, now
+
+from prayer_room_api import rollups
+from prayer_room_api.models import DailyActivity, Location, PrayerPraiseRequest
+
+
+@patch("prayer_room_api.tasks.send_pending_notifications.delay")
+class DailyActivityRollupTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="Main", slug="main")
+        self.today = localdate()
+
+    def _row(self, day=None):
+        row = DailyActivity.objects.filter(
+            day=day or self.today, location=self.location
+        ).values("submitted", "approved", "flagged", "archived", "responded")
+        return row.first()
+
+    def _create(self, **kwargs):
+        return PrayerPraiseRequest.objects.create(
+            location=self.location, content="Please pray", **kwargs
+        )
+
+    def test_submissions_and_moderation_are_counted(self, *mocks):
+        prayer = self._create(flagged_at=now())
+        prayer = PrayerPraiseRequest.objects.get(pk=prayer.pk)
+        prayer.flagged_at = None
+        prayer.approved_at = now()
+        prayer.save()
+
+        self.assertEqual(
+            self._row(),
+            dict(submitted=1, approved=1, flagged=0, archived=0, responded=0),
+        )
+
+    def test_first_response_is_counted_once(self, *mocks):
+        prayer = PrayerPraiseRequest.objects.get(pk=self._create().pk)
+        prayer.response_comment = "Praying for you"
+        prayer.save()
+        prayer.response_comment = "Still praying"
+        prayer.save()
+
+        self.assertEqual(self._row()["responded"], 1)
+
+    def test_bulk_updates_are_counted(self, *mocks):
+        yesterday = now() - timedelta(days=1)
+        prayers = [self._create(created_at=yesterday) for _ in range(3)]
+
+        PrayerPraiseRequest.objects.filter(
+            pk__in=[prayer.pk for prayer in prayers]
+        ).update_with_events(approved_at=now())
+        PrayerPraiseRequest.objects.filter(pk=prayers[0].pk).update_with_events(
+            archived_at=now(), response_comment="Amen"
+        )
+
+        self.assertEqual(self._row(localdate(yesterday))["submitted"], 3)
+        today = self._row()
+        self.assertEqual(
+            (today["approved"], today["archived"], today["responded"]), (3, 1, 1)
+        )
+
+    def test_deletes_are_removed(self, *mocks):
+        prayer = self._create(approved_at=now())
+
+        prayer.delete()
+
+        self.assertEqual(self._row()["submitted"], 0)
+        self.assertEqual(self._row()["approved"], 0)
+
+    def test_rebuild_reconciles_and_keeps_responses(self, *mocks):
+        prayer = PrayerPraiseRequest.objects.get(pk=self._create().pk)
+        prayer.response_comment = "Amen"
+        prayer.save()
+        # Bypasses the signals, so the rollup drifts.
+        PrayerPraiseRequest.objects.filter(pk=prayer.pk).update(approved_at=now())
+        DailyActivity.objects.update(submitted=5)
+
+        self.assertEqual(rollups.rebuild(), (0, 1))
+
+        self.assertEqual(
+            self._row(),
+            dict(submitted=1, approved=1, flagged=0, archived=0, responded=1),
+        )
+
+    def test_rebuild_command_backfills(self, *mocks):
+        self._create(approved_at=now())
+        DailyActivity.objects.all().delete()
+        out = StringIO()
+
+        call_command("rebuild_daily_activity", "--days", "30", stdout=out)
+
+        self.assertIn("1 rows created", out.getvalue())
+        self.assertEqual(self._row()["approved"], 1)
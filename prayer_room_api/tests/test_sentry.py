@@ -0,0 +1,132 @@
+from unittest import mock
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from prayer_room_api import sentry
+from prayer_room_api.sentry import (
+    DEFAULT_RULES,
+    SentrySamplingMiddleware,
+    TracesSampler,
+    parse_rules,
+    scrub_query_string,
+)
+
+
+def request_context(path):
+    return {"parent_sampled": None, "wsgi_environ": {"PATH_INFO": path}}
+
+
+def task_context(name):
+    return {"parent_sampled": None, "celery_job": {"task": name}}
+
+
+class TracesSamplerTests(SimpleTestCase):
+    def setUp(self):
+        self.sampler = TracesSampler(default_rate=0.1, upsample_seconds=60)
+
+    def test_rates_by_route_and_task(self):
+        for context, rate in (
+            (request_context("/api/locations/"), 0.1),
+            (request_context("/api/prayer-requests/stream/"), 0.0),
+            (request_context("/api/prayer-requests/12/increment_prayer_count/"), 0.01),
+            ({"parent_sampled": None, "asgi_scope": {"path": "/static/x.css"}}, 0.0),
+            (task_context("prayer_room_api.tasks.relay_outbox"), 0.01),
+            (task_context("prayer_room_api.tasks.send_user_digest"), 1.0),
+            (task_context("prayer_room_api.tasks.send_user_digest_batch"), 1.0),
+            ({"parent_sampled": None}, 0.1),
+        ):
+            with self.subTest(context):
+                self.assertEqual(self.sampler(context), rate)
+
+    def test_follows_the_parent_decision(self):
+        context = request_context("/api/prayer-requests/stream/")
+
+        self.assertEqual(self.sampler({**context, "parent_sampled": True}), 1.0)
+        self.assertEqual(self.sampler({**context, "parent_sampled": False}), 0.0)
+
+    def test_slow_requests_and_errors_upsample_their_route(self):
+        self.sampler.observe_request("/api/locations/", 200, 50)
+        self.assertEqual(self.sampler(request_context("/api/locations/")), 0.1)
+
+        self.sampler.observe_request("/api/locations/3/", 200, 1500)
+        self.sampler.observe_request("/flagged/", 500, 10)
+
+        for path in ("/api/locations/3/", "/api/locations/8/", "/flagged/"):
+            self.assertEqual(self.sampler(request_context(path)), 1.0)
+        self.assertEqual(self.sampler(request_context("/api/locations/")), 0.1)
+
+    def test_failed_and_slow_tasks_are_upsampled(self):
+        name = "prayer_room_api.tasks.relay_outbox"
+        self.sampler.observe_task(name, failed=False, duration_ms=10)
+        self.assertEqual(self.sampler(task_context(name)), 0.01)
+
+        self.sampler.observe_task(name, failed=True, duration_ms=10)
+
+        self.assertEqual(self.sampler(task_context(name)), 1.0)
+
+    def test_upsampling_expires(self):
+        self.sampler.observe_request("/flagged/", 500, 10)
+
+        with mock.patch("time.monotonic", return_value=10**9):
+            self.assertEqual(self.sampler(request_context("/flagged/")), 0.1)
+        self.assertEqual(self.sampler.upsampled, {})
+
+    def test_invalid_rules_are_skipped(self):
+        with self.assertLogs("prayer_room_api.sentry", "WARNING") as logs:
+            rules = parse_rules("/api/*, /moderation/=1, =0.5, /static/*=none")
+
+        self.assertEqual(rules, (("/moderation/", 1.0),))
+        self.assertEqual(len(logs.output), 3)
+        self.assertIn("'/api/*'", logs.output[0])
+
+    def test_environment_rules_go_first(self):
+        self.assertEqual(
+            parse_rules(" /moderation/=1, /api/*=0.05,"),
+            (("/moderation/", 1.0), ("/api/*", 0.05)),
+        )
+        environ = {
+            "SENTRY_TRACES_RULES": "/api/prayer-requests/stream/=0.5",
+            "SENTRY_TRACES_SAMPLE_RATE": "0.2",
+        }
+        with mock.patch.dict("os.environ", environ):
+            sampler = TracesSampler.from_environ()
+
+        self.assertEqual(sampler.rules[1:], DEFAULT_RULES)
+        self.assertEqual(sampler(request_context("/api/prayer-requests/stream/")), 0.5)
+        self.assertEqual(sampler(request_context("/moderation/")), 0.2)
+
+
+class SentrySamplingMiddlewareTests(SimpleTestCase):
+    def test_not_used_without_sentry(self):
+        with mock.patch.dict("os.environ", clear=True):
+            with self.assertRaises(MiddlewareNotUsed):
+                SentrySamplingMiddleware(lambda request: HttpResponse())
+
+    def test_server_errors_upsample_the_route(self):
+        sampler = TracesSampler()
+        with (
+            mock.patch.dict("os.environ", {"SENTRY_DSN": "https://key@sentry/1"}),
+            mock.patch.object(sentry, "sampler", sampler),
+        ):
+            middleware = SentrySamplingMiddleware(
+                lambda request: HttpResponse(status=503)
+            )
+            middleware(RequestFactory().get("/moderation/"))
+
+        self.assertEqual(sampler(request_context("/moderation/")), 1.0)
+
+
+class ScrubQueryStringTests(SimpleTestCase):
+    def test_stream_tokens_are_filtered(self):
+        event = {"request": {"query_string": "location=main&token=secret"}}
+
+        event = scrub_query_string(event, {})
+
+        self.assertEqual(
+            event["request"]["query_string"], "location=main&token=%5BFiltered%5D"
+        )
+
+    def test_events_without_a_request_are_unchanged(self):
+        self.assertEqual(scrub_query_string({"message": "hi"}, {}), {"message": "hi"})
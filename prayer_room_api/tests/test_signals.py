@@ -1,9 +1,18 @@
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
 
-from prayer_room_api.models import Location, PrayerPraiseRequest
+from prayer_room_api import outbox
+from prayer_room_api.models import (
+    Location,
+    Notification,
+    OutboxEvent,
+    PrayerPraiseRequest,
+)
 
 
 class ResponseNotificationSignalTests(TestCase):
@@ -14,7 +23,7 @@ class ResponseNotificationSignalTests(TestCase):
             email="signal@example.com",
         )
 
-    @patch("prayer_room_api.tasks.send_response_notification.delay")
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
     def test_signal_triggers_on_response_comment_added(self, mock_task):
         """Test that adding response_comment triggers notification task."""
         prayer = PrayerPraiseRequest.objects.create(
@@ -28,9 +37,16 @@ class ResponseNotificationSignalTests(TestCase):
         prayer.response_comment = "We are praying for you!"
         prayer.save()
 
-        mock_task.assert_called_once_with(prayer.pk)
+        self.assertQuerySetEqual(
+            OutboxEvent.objects.values_list("topic", flat=True),
+            [outbox.NOTIFICATIONS],
+        )
+        self.assertQuerySetEqual(
+            Notification.objects.values_list("prayer_request", "event_type"),
+            [(prayer.pk, Notification.EventType.RESPONSE)],
+        )
 
-    @patch("prayer_room_api.tasks.send_response_notification.delay")
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
     def test_signal_does_not_trigger_on_other_changes(self, mock_task):
         """Test that other field changes don't trigger notification."""
         prayer = PrayerPraiseRequest.objects.create(
@@ -45,9 +61,9 @@ class ResponseNotificationSignalTests(TestCase):
         prayer.prayer_count = 5
         prayer.save()
 
-        mock_task.assert_not_called()
+        self.assertFalse(Notification.objects.exists())
 
-    @patch("prayer_room_api.tasks.send_response_notification.delay")
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
     def test_signal_does_not_trigger_on_new_instance(self, mock_task):
         """Test that creating a new prayer with response doesn't trigger signal."""
         # Creating new instance with response should not trigger
@@ -59,9 +75,9 @@ class ResponseNotificationSignalTests(TestCase):
             response_comment="Initial response",
         )
 
-        mock_task.assert_not_called()
+        self.assertFalse(Notification.objects.exists())
 
-    @patch("prayer_room_api.tasks.send_response_notification.delay")
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
     def test_signal_does_not_trigger_when_already_has_response(self, mock_task):
         """Test that updating an existing response doesn't trigger again."""
         prayer = PrayerPraiseRequest.objects.create(
@@ -74,10 +90,121 @@ class ResponseNotificationSignalTests(TestCase):
         # First response triggers
         prayer.response_comment = "First response"
         prayer.save()
-        mock_task.assert_called_once()
-        mock_task.reset_mock()
+        self.assertEqual(prayer.notifications.count(), 1)
 
         # Updating response should not trigger again
         prayer.response_comment = "Updated response"
         prayer.save()
-        mock_task.assert_not_called()
+        self.assertEqual(prayer.notifications.count(), 1)
+
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
+    def test_response_is_only_notified_once(self, mock_task):
+        """Clearing and re-adding a response doesn't notify a second time."""
+        prayer = PrayerPraiseRequest.objects.create(
+            created_by=self.user,
+            location=self.location,
+            content="Test prayer",
+            response_comment="",
+        )
+
+        for comment in ("First response", "", "Second response"):
+            prayer.response_comment = comment
+            prayer.save()
+
+        self.assertEqual(prayer.notifications.count(), 1)
+
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
+    def test_signal_does_not_reread_loaded_instances(self, mock_task):
+        """Change detection uses the loaded values instead of a fresh SELECT."""
+        prayer = PrayerPraiseRequest.objects.create(
+            created_by=self.user,
+            location=self.location,
+            content="Test prayer",
+            response_comment="",
+        )
+        prayer = PrayerPraiseRequest.objects.get(pk=prayer.pk)
+
+        prayer.response_comment = "We are praying for you!"
+        with CaptureQueriesContext(connection) as queries:
+            prayer.save()
+
+        selects = [
+            q["sql"] for q in queries if q["sql"].lstrip().upper().startswith("SELECT")
+        ]
+        self.assertFalse(
+            any("prayer_room_api_prayerpraiserequest" in sql for sql in selects)
+        )
+        self.assertEqual(prayer.notifications.count(), 1)
+
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
+    def test_signal_skips_saves_that_exclude_response_comment(self, mock_task):
+        prayer = PrayerPraiseRequest.objects.create(
+            created_by=self.user,
+            location=self.location,
+            content="Test prayer",
+            response_comment="",
+        )
+
+        prayer.response_comment = "Not saved yet"
+        prayer.save(update_fields=["prayer_count"])
+
+        self.assertFalse(Notification.objects.exists())
+
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
+    def test_signal_reads_stored_value_for_unloaded_instances(self, mock_task):
+        prayer = PrayerPraiseRequest.objects.create(
+            created_by=self.user,
+            location=self.location,
+            content="Test prayer",
+            response_comment="",
+        )
+        detached = PrayerPraiseRequest(
+            pk=prayer.pk,
+            created_at=prayer.created_at,
+            location=self.location,
+            content="Test prayer",
+            response_comment="Added on a detached instance",
+        )
+
+        detached.save()
+
+        self.assertEqual(prayer.notifications.count(), 1)
+
+
+class FieldSnapshotTests(TestCase):
+    def setUp(self):
+        location = Location.objects.create(name="Main", slug="main")
+        self.prayer = PrayerPraiseRequest.objects.create(
+            location=location, content="Test prayer", response_comment=""
+        )
+        PrayerPraiseRequest.objects.filter(pk=self.prayer.pk).update(
+            response_comment="Answered elsewhere", approved_at=now()
+        )
+
+    def test_refresh_retakes_the_snapshot(self):
+        self.prayer.refresh_from_db()
+
+        self.assertEqual(
+            self.prayer.get_snapshot_value("response_comment"), "Answered elsewhere"
+        )
+        self.assertIsNotNone(self.prayer.get_snapshot_value("approved_at"))
+
+    def test_refresh_of_some_fields_only_snapshots_those(self):
+        self.prayer.refresh_from_db(fields=["response_comment"])
+
+        self.assertEqual(
+            self.prayer.get_snapshot_value("response_comment"), "Answered elsewhere"
+        )
+        self.assertIsNone(self.prayer.get_snapshot_value("approved_at"))
+
+    @patch("prayer_room_api.tasks.send_pending_notifications.delay")
+    def test_saving_a_refreshed_instance_compares_with_the_refreshed_row(
+        self, mock_task
+    ):
+        self.prayer.refresh_from_db()
+        notified = Notification.objects.count()
+
+        self.prayer.response_comment = "Edited response"
+        self.prayer.save()
+
+        self.assertEqual(Notification.objects.count(), notified)
@@ -0,0 +1,189 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+
+from prayer_room_api import pubsub
+from prayer_room_api.models import Location, PrayerPraiseRequest
+from prayer_room_api.views import PrayerRequestStreamView
+
+
+@patch.object(pubsub.LocalBackend, "is_active", return_value=True)
+@patch.object(pubsub.LocalBackend, "publish")
+class PrayerWallEventTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="Main", slug="main")
+
+    def _published(self, mock_publish):
+        return [call.args[0] for call in mock_publish.call_args_list]
+
+    def test_approval_publishes_the_request(self, mock_publish, mock_active):
+        prayer = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Please pray"
+        )
+        prayer = PrayerPraiseRequest.objects.get(pk=prayer.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            prayer.approved_at = now()
+            prayer.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            prayer.name = "Sam"
+            prayer.save()
+
+        [event] = self._published(mock_publish)
+        self.assertEqual(event["type"], "prayer")
+        self.assertEqual(event["location"], self.location.pk)
+        self.assertEqual(event["data"]["id"], prayer.pk)
+        self.assertEqual(event["data"]["location_name"], "Main")
+
+    def test_bulk_approval_publishes_new_requests(self, mock_publish, mock_active):
+        live = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Live", approved_at=now()
+        )
+        pending = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Pending"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PrayerPraiseRequest.objects.filter(
+                pk__in=[live.pk, pending.pk]
+            ).update_with_events(approved_at=now())
+
+        self.assertEqual(
+            [event["data"]["id"] for event in self._published(mock_publish)],
+            [pending.pk],
+        )
+
+    def test_prayer_count_changes_are_published(self, mock_publish, mock_active):
+        prayer = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Please pray", approved_at=now()
+        )
+        mock_publish.reset_mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PrayerPraiseRequest.objects.increment_prayer_count(prayer.pk)
+
+        self.assertEqual(
+            self._published(mock_publish),
+            [pubsub.prayer_count_event(prayer.pk, self.location.pk, 1)],
+        )
+
+    def test_nothing_is_built_without_listeners(self, mock_publish, mock_active):
+        mock_active.return_value = False
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PrayerPraiseRequest.objects.create(
+                location=self.location, content="Please pray", approved_at=now()
+            )
+
+        mock_publish.assert_not_called()
+
+
+@override_settings(ASYNC_API=True)
+class PrayerRequestStreamTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="Main", slug="main")
+        self.other = Location.objects.create(name="Other", slug="other")
+        self.user = User.objects.create_user(username="wall", password="pw")
+        self.url = reverse("prayer-request-stream")
+
+    async def _open(self, url):
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b"retry: 5000\n\n")
+        return content
+
+    async def _disconnect(self, content):
+        """Cancel a pending read, as the server does when a client goes away."""
+        read = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+        read.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await read
+
+    async def test_streams_events_for_the_location(self):
+        await self.async_client.aforce_login(self.user)
+        content = await self._open(f"{self.url}?location=main")
+
+        backend = pubsub.get_backend()
+        backend.publish(pubsub.prayer_count_event(1, self.other.pk, 3))
+        backend.publish(pubsub.prayer_count_event(2, self.location.pk, 5))
+
+        chunk = (await anext(content)).decode()
+        self.assertTrue(chunk.startswith("event: prayer_count\ndata: "))
+        self.assertEqual(
+            json.loads(chunk.split("data: ")[1]), {"id": 2, "prayer_count": 5}
+        )
+
+        await self._disconnect(content)
+        self.assertEqual(len(pubsub.hub), 0)
+
+    @patch.object(PrayerRequestStreamView, "keepalive_seconds", 0.01)
+    async def test_idle_streams_get_keepalives(self):
+        token = pubsub.make_stream_token(self.user)
+        content = await self._open(f"{self.url}?token={token}")
+
+        self.assertEqual(await anext(content), b": keepalive\n\n")
+        await self._disconnect(content)
+
+    def test_api_token_mints_a_stream_token(self):
+        api_token = Token.objects.create(user=self.user)
+
+        response = self.client.post(
+            reverse("prayerpraiserequest-stream-token"),
+            headers={"Authorization": f"Token {api_token.key}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            pubsub.read_stream_token(response.json()["token"]), self.user.pk
+        )
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get(f"{self.url}?token=nope")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_api_tokens_are_not_accepted_in_the_url(self):
+        api_token = await Token.objects.acreate(user=self.user)
+
+        response = await self.async_client.get(f"{self.url}?token={api_token.key}")
+
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(STREAM_TOKEN_MAX_AGE=-1)
+    async def test_expired_stream_tokens_are_refused(self):
+        token = pubsub.make_stream_token(self.user)
+
+        response = await self.async_client.get(f"{self.url}?token={token}")
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_unknown_location_is_404(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(f"{self.url}?location=nowhere")
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_served_under_wsgi(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 501)
+
+    @override_settings(ASYNC_API=False)
+    async def test_not_served_without_async_api(self):
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.status_code, 501)
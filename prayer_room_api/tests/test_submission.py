@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from prayer_room_api import banned_words
+from prayer_room_api.models import Location, PrayerPraiseRequest
+
+
+class PrayerSubmissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        banned_words.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="poster"))
+        self.location = Location.objects.create(name="Main", slug="main")
+        self.url = reverse("prayerpraiserequest-list")
+
+    def _submit(self, **data):
+        data = {"location": self.location.pk, "content": "Please pray", **data}
+        return self.client.post(self.url, data, format="json")
+
+    def test_submission_is_a_single_insert_once_caches_are_warm(self):
+        """Locations come from the cache and banned words from memory."""
+        self._submit()
+
+        # INSERT, daily rollup UPDATE
+        with self.assertNumQueries(2):
+            response = self._submit()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["location_name"], "Main")
+
+    def test_returning_user_is_one_lookup(self):
+        user = User.objects.create_user(username="sam")
+        self._submit()
+
+        # User SELECT, INSERT, daily rollup UPDATE
+        with self.assertNumQueries(3):
+            self._submit(user={"username": "sam"})
+
+        self.assertEqual(PrayerPraiseRequest.objects.latest("pk").created_by, user)
+
+    def test_new_user_is_created_without_a_usable_password(self):
+        self._submit(user={"username": "new", "email": "New@Example.COM", "name": "N"})
+
+        user = User.objects.get(username="new")
+        self.assertEqual(user.email, "New@example.com")
+        self.assertEqual(user.first_name, "N")
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(PrayerPraiseRequest.objects.get().created_by, user)
+
+    def test_inactive_and_unknown_locations_are_rejected(self):
+        closed = Location.objects.create(name="Closed", slug="closed", is_active=False)
+
+        for pk in (closed.pk, 0, "main"):
+            response = self._submit(location=pk)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("location", response.data)
+
+    def test_new_locations_are_picked_up(self):
+        self._submit()
+        second = Location.objects.create(name="Second", slug="second")
+
+        response = self._submit(location=second.pk)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["location_name"], "Second")
+
+    def test_locations_added_elsewhere_are_looked_up(self):
+        """A location missing from a stale map is checked in the database."""
+        self._submit()
+        # No signal, as if saved by another process with its own cache
+        (second,) = Location.objects.bulk_create(
+            [Location(name="Second", slug="second")]
+        )
+
+        response = self._submit(location=second.pk)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["location_name"], "Second")
+
+    @override_settings(LOCAL_CACHE_TIMEOUT=0)
+    def test_locations_deactivated_elsewhere_are_rejected(self):
+        self._submit()
+        Location.objects.filter(pk=self.location.pk).update(is_active=False)
+
+        response = self._submit()
+
+        self.assertEqual(response.status_code, 400)
@@ -1,20 +1,30 @@
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail import get_connection
+from django.db import IntegrityError
 from django.test import TestCase, override_settings
+from django.utils import timezone
 
 from prayer_room_api.models import (
     EmailLog,
     EmailTemplate,
     Location,
+    Notification,
     PrayerPraiseRequest,
     UserProfile,
 )
 from prayer_room_api.tasks import (
+    STALE_PENDING_EMAIL,
+    idempotency_key,
     send_moderator_digest,
+    send_pending_notifications,
     send_response_notification,
     send_templated_email,
+    send_templated_emails,
     send_user_digest,
+    summarize_digest,
 )
 
 
@@ -78,6 +88,136 @@ class SendTemplatedEmailTests(TestCase):
         self.assertIn("SMTP Error", log.error_message)
 
 
+    def test_send_templated_emails_sends_over_one_connection(self):
+        """Batch sends render each message and write logs in bulk."""
+        messages = [
+            (f"user{i}@example.com", {"recipient_name": f"User {i}"})
+            for i in range(3)
+        ]
+        with patch(
+            "prayer_room_api.tasks.get_connection", wraps=get_connection
+        ) as mock_connection:
+            # One bulk insert, one bulk update
+            with self.assertNumQueries(2):
+                result = send_templated_emails(self.template, messages)
+
+        self.assertEqual(result, (3, 0))
+        mock_connection.assert_called_once()
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            ["Hello User 0", "Hello User 1", "Hello User 2"],
+        )
+        logs = EmailLog.objects.filter(template=self.template)
+        self.assertEqual(logs.count(), 3)
+        self.assertTrue(all(log.status == EmailLog.Status.SENT for log in logs))
+        self.assertTrue(all(log.sent_at for log in logs))
+
+    @override_settings(EMAIL_SEND_RATE_PER_SECOND=2)
+    @patch("prayer_room_api.tasks.time.sleep")
+    def test_send_templated_emails_throttles_to_send_rate(self, mock_sleep):
+        """Messages past the per-second rate wait for the next window."""
+        messages = [(f"user{i}@example.com", {}) for i in range(5)]
+
+        send_templated_emails(self.template, messages)
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch("prayer_room_api.tasks.EmailMultiAlternatives")
+    def test_send_templated_emails_records_failures(self, mock_email_class):
+        """One failed message is logged without stopping the batch."""
+        ok, failing = MagicMock(), MagicMock()
+        failing.send.side_effect = Exception("SMTP error")
+        mock_email_class.side_effect = [ok, failing, ok]
+        messages = [(f"user{i}@example.com", {}) for i in range(3)]
+
+        result = send_templated_emails(self.template, messages)
+
+        self.assertEqual(result, (2, 1))
+        failed = EmailLog.objects.get(status=EmailLog.Status.FAILED)
+        self.assertEqual(failed.recipient_email, "user1@example.com")
+        self.assertEqual(failed.error_message, "SMTP error")
+
+    def test_send_templated_emails_skips_recipients_already_sent(self):
+        """Repeating a keyed batch does not email anyone twice."""
+        messages = [(f"user{i}@example.com", {}) for i in range(3)]
+
+        send_templated_emails(self.template, messages, key_prefix="digest:1")
+        result = send_templated_emails(self.template, messages, key_prefix="digest:1")
+
+        self.assertEqual(result, (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(EmailLog.objects.count(), 3)
+
+    def test_send_templated_emails_retries_failed_recipients(self):
+        """A recipient whose keyed send failed is retried on the same log."""
+        failed = EmailLog.objects.create(
+            template=self.template,
+            recipient_email="user@example.com",
+            subject="Hello",
+            status=EmailLog.Status.FAILED,
+            error_message="SMTP error",
+            idempotency_key=idempotency_key("digest:1", "user@example.com"),
+        )
+
+        result = send_templated_emails(
+            self.template, [("user@example.com", {})], key_prefix="digest:1"
+        )
+
+        self.assertEqual(result, (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, EmailLog.Status.SENT)
+        self.assertEqual(failed.error_message, "")
+        self.assertEqual(EmailLog.objects.count(), 1)
+
+    def test_send_templated_emails_retries_stale_pending_recipients(self):
+        """A send that died before recording its outcome isn't skipped for good."""
+        stale, recent = [
+            EmailLog.objects.create(
+                template=self.template,
+                recipient_email=email,
+                subject="Hello",
+                idempotency_key=idempotency_key("digest:1", email),
+            )
+            for email in ("stale@example.com", "recent@example.com")
+        ]
+        EmailLog.objects.filter(pk=stale.pk).update(
+            created_at=timezone.now() - STALE_PENDING_EMAIL
+        )
+
+        result = send_templated_emails(
+            self.template,
+            [("stale@example.com", {}), ("recent@example.com", {})],
+            key_prefix="digest:1",
+        )
+
+        self.assertEqual(result, (2, 0))
+        self.assertEqual(mail.outbox[0].to, ["stale@example.com"])
+        self.assertEqual(len(mail.outbox), 1)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, EmailLog.Status.SENT)
+        self.assertEqual(EmailLog.objects.count(), 2)
+
+    def test_send_templated_emails_long_addresses(self):
+        """Keys stay within the column for the longest valid addresses."""
+        email = f"{'a' * 64}@{'b' * 63}.{'c' * 63}.{'d' * 57}.com"
+        prefix = f"moderator_digest:{timezone.now():%Y-%m-%dT%H}"
+
+        result = send_templated_emails(self.template, [(email, {})], key_prefix=prefix)
+
+        self.assertEqual(result, (1, 0))
+        key = EmailLog.objects.get().idempotency_key
+        self.assertLessEqual(
+            len(key), EmailLog._meta.get_field("idempotency_key").max_length
+        )
+
+    def test_send_templated_emails_empty(self):
+        """Nothing to send means no queries and no connection."""
+        with self.assertNumQueries(0):
+            self.assertEqual(send_templated_emails(self.template, []), (0, 0))
+
+
 @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
 class SendResponseNotificationTests(TestCase):
     def setUp(self):
@@ -146,6 +286,110 @@ class SendResponseNotificationTests(TestCase):
         self.assertEqual(result, "Prayer request not found")
 
 
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class SendPendingNotificationsTests(TestCase):
+    def setUp(self):
+        EmailTemplate.objects.filter(
+            template_type=EmailTemplate.TemplateType.RESPONSE_NOTIFICATION
+        ).delete()
+        self.template = EmailTemplate.objects.create(
+            template_type=EmailTemplate.TemplateType.RESPONSE_NOTIFICATION,
+            subject="Response to your prayer",
+            body_markdown="Hi {{ recipient_name }}, response: {{ response_text }}",
+            is_active=True,
+        )
+        self.location = Location.objects.create(name="Main", slug="main")
+        self.user = User.objects.create_user(
+            username="testuser", email="testuser@example.com"
+        )
+        UserProfile.objects.create(user=self.user, enable_response_notifications=True)
+
+    def _notify(self, user=None, response_comment="We are praying for you!"):
+        prayer = PrayerPraiseRequest.objects.create(
+            created_by=user or self.user,
+            location=self.location,
+            content="Please pray for me",
+            response_comment=response_comment,
+        )
+        return Notification.objects.create(
+            prayer_request=prayer, event_type=Notification.EventType.RESPONSE
+        )
+
+    def test_sends_pending_notifications_once(self):
+        """Sent notifications are marked and never picked up again."""
+        notification = self._notify()
+
+        send_pending_notifications()
+        send_pending_notifications()
+
+        self.assertEqual(len(mail.outbox), 1)
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.SENT)
+        self.assertEqual(notification.attempts, 1)
+        self.assertIsNotNone(notification.processed_at)
+
+    def test_lookups_are_batched(self):
+        """Template, claim and bulk update don't grow with the batch."""
+        for i in range(3):
+            user = User.objects.create_user(username=f"u{i}", email=f"u{i}@example.com")
+            UserProfile.objects.create(user=user, enable_response_notifications=True)
+            self._notify(user)
+
+        # Template, then savepoint, claim (with users and profiles), bulk
+        # update and release; each send adds its two EmailLog writes.
+        with self.assertNumQueries(5 + 3 * 2):
+            send_pending_notifications()
+
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_opted_out_users_are_skipped(self):
+        """Notifications that shouldn't be sent are closed with the reason."""
+        other = User.objects.create_user(username="quiet", email="q@example.com")
+        UserProfile.objects.create(user=other)
+        notification = self._notify(other)
+
+        send_pending_notifications()
+
+        self.assertEqual(len(mail.outbox), 0)
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.SKIPPED)
+        self.assertEqual(
+            notification.result, "User has disabled response notifications"
+        )
+
+    @patch("prayer_room_api.tasks.send_pending_notifications.apply_async")
+    @patch("prayer_room_api.tasks.send_templated_email")
+    def test_failed_sends_are_retried_then_given_up(self, mock_send, mock_retry):
+        """A failing send stays pending until it runs out of attempts."""
+        mock_send.side_effect = Exception("SMTP error")
+        notification = self._notify()
+
+        send_pending_notifications()
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.PENDING)
+        self.assertEqual(notification.result, "SMTP error")
+        mock_retry.assert_called_once_with(countdown=60)
+
+        send_pending_notifications()
+        send_pending_notifications()
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, Notification.Status.FAILED)
+        self.assertEqual(notification.attempts, 3)
+        self.assertEqual(mock_retry.call_count, 2)
+
+    def test_one_notification_per_request_and_event(self):
+        """The outbox refuses a second notification for the same event."""
+        notification = self._notify()
+
+        with self.assertRaises(IntegrityError):
+            Notification.objects.create(
+                prayer_request=notification.prayer_request,
+                event_type=Notification.EventType.RESPONSE,
+            )
+
 @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
 class SendModeratorDigestTests(TestCase):
     def setUp(self):
@@ -195,6 +439,61 @@ class SendModeratorDigestTests(TestCase):
         result = send_moderator_digest()
         self.assertEqual(result, "No staff users with email addresses")
 
+    @patch("prayer_room_api.tasks.DIGEST_BATCH_SIZE", 1)
+    def test_send_moderator_digest_runs_batches_inline(self):
+        """Without a result backend each batch runs in turn and is totalled."""
+        User.objects.create_user(
+            username="otherstaff", email="other@example.com", is_staff=True
+        )
+        PrayerPraiseRequest.objects.create(
+            location=self.location, content="Pending request"
+        )
+
+        result = send_moderator_digest()
+
+        self.assertEqual(result, "Sent moderator digest to 2 staff members")
+        self.assertEqual(len(mail.outbox), 2)
+        run_key = f"moderator_digest:{timezone.now():%Y-%m-%dT%H}"
+        self.assertEqual(
+            set(EmailLog.objects.values_list("idempotency_key", flat=True)),
+            {
+                idempotency_key(run_key, "staff@example.com"),
+                idempotency_key(run_key, "other@example.com"),
+            },
+        )
+
+    @override_settings(CELERY_RESULT_BACKEND="cache+memory://")
+    @patch("prayer_room_api.tasks.DIGEST_BATCH_SIZE", 1)
+    @patch("prayer_room_api.tasks.chord")
+    def test_send_moderator_digest_fans_out_as_chord(self, mock_chord):
+        """With a result backend the batches are joined by a chord callback."""
+        User.objects.create_user(
+            username="otherstaff", email="other@example.com", is_staff=True
+        )
+        PrayerPraiseRequest.objects.create(
+            location=self.location, content="Pending request"
+        )
+
+        result = send_moderator_digest()
+
+        self.assertEqual(result, "Queued 2 digest batches for 2 recipients")
+        batches = mock_chord.call_args.args[0]
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(
+            {batch.task for batch in batches},
+            {"prayer_room_api.tasks.send_moderator_digest_batch"},
+        )
+        callback = mock_chord.return_value.call_args.args[0]
+        self.assertEqual(callback.task, "prayer_room_api.tasks.summarize_digest")
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_summarize_digest_totals_batches(self):
+        """The chord callback adds up each batch's sent and failed counts."""
+        result = summarize_digest(
+            [[3, 0], [2, 1]], "Sent moderator digest to {sent_count} staff members"
+        )
+        self.assertEqual(result, "Sent moderator digest to 5 staff members")
+
 
 @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
 class SendUserDigestTests(TestCase):
@@ -249,3 +548,50 @@ class SendUserDigestTests(TestCase):
 
         result = send_user_digest("daily")
         self.assertIn("Sent user digest (daily) to 0 users", result)
+
+    @patch("prayer_room_api.tasks.send_templated_emails", return_value=(5, 0))
+    def test_send_user_digest_query_count_is_flat(self, mock_send):
+        """Lookups don't grow with the number of recipients."""
+        users = [self.user] + [
+            User.objects.create_user(username=f"reader{i}", email=f"r{i}@example.com")
+            for i in range(4)
+        ]
+        for user in users[1:]:
+            UserProfile.objects.create(user=user, enable_digest_notifications=True)
+        for user in users:
+            PrayerPraiseRequest.objects.create(
+                created_by=user,
+                location=self.location,
+                content="My prayer",
+                response_comment="We're praying!",
+            )
+        quiet = User.objects.create_user(username="quiet", email="q@example.com")
+        UserProfile.objects.create(user=quiet, enable_digest_notifications=True)
+
+        # Template and recipient ids, then template and responded requests
+        # (with their users) for the one batch
+        with self.assertNumQueries(4):
+            result = send_user_digest("daily")
+
+        self.assertIn("Sent user digest (daily) to 5 users", result)
+        messages = mock_send.call_args.args[1]
+        self.assertEqual(
+            {email for email, _ in messages}, {user.email for user in users}
+        )
+        context = messages[0][1]
+        self.assertEqual(len(context["requests_with_responses"]), 1)
+
+    def test_send_user_digest_retry_does_not_resend(self):
+        """A second run on the same day skips users already emailed."""
+        PrayerPraiseRequest.objects.create(
+            created_by=self.user,
+            location=self.location,
+            content="My prayer",
+            response_comment="We're praying!",
+        )
+
+        send_user_digest("daily")
+        result = send_user_digest("daily")
+
+        self.assertIn("Sent user digest (daily) to 1 users", result)
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,218 @@
+import json
+from unittest.mock import patch
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from django_webhook.models import Webhook, WebhookTopic
+
+from prayer_room_api import outbox
+from prayer_room_api.models import (
+    Location,
+    Notification,
+    OutboxEvent,
+    PrayerPraiseRequest,
+)
+
+PRAYER_TOPICS = [
+    "prayer_room_api.PrayerPraiseRequest/create",
+    "prayer_room_api.PrayerPraiseRequest/update",
+    "prayer_room_api.PrayerPraiseRequest/delete",
+]
+
+
+class WebhookTestCase(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="Main", slug="main")
+        self.webhook = Webhook.objects.create(url="https://hooks.example.com/a")
+        self.webhook.topics.set(
+            [WebhookTopic.objects.get_or_create(name=name)[0] for name in PRAYER_TOPICS]
+        )
+
+
+@override_settings(
+    DJANGO_WEBHOOK={
+        "MODELS": ["prayer_room_api.PrayerPraiseRequest"],
+        "USE_CACHE": False,
+    }
+)
+@patch("prayer_room_api.webhooks.fire_webhook.delay")
+class SingleEventWebhookTests(WebhookTestCase):
+    def test_each_event_is_sent_as_one_object(self, mock_fire):
+        """Without WEBHOOK_BATCHED the payload is django_webhook's own."""
+        prayers = [
+            PrayerPraiseRequest.objects.create(
+                location=self.location, content=f"Prayer {i}"
+            )
+            for i in range(2)
+        ]
+        prayers[0].approved_at = now()
+        prayers[0].save()
+
+        self.assertEqual(outbox.relay(), 3)
+
+        self.assertEqual(mock_fire.call_count, 2)
+        payloads = []
+        for call in mock_fire.call_args_list:
+            webhook_id, body = call.args
+            self.assertEqual(webhook_id, self.webhook.pk)
+            self.assertEqual(call.kwargs["topic"], PRAYER_TOPICS[0])
+            payloads.append(json.loads(body))
+        payloads.sort(key=lambda payload: payload["object"]["id"])
+        self.assertEqual(
+            [payload["object"]["id"] for payload in payloads],
+            [prayer.pk for prayer in prayers],
+        )
+        self.assertEqual(
+            set(payloads[0]), {"object", "topic", "object_type", "webhook_uuid"}
+        )
+        self.assertEqual(payloads[0]["topic"], PRAYER_TOPICS[0])
+        self.assertEqual(payloads[0]["webhook_uuid"], str(self.webhook.uuid))
+        self.assertTrue(payloads[0]["object"]["is_approved"])
+
+
+@override_settings(
+    DJANGO_WEBHOOK={
+        "MODELS": ["prayer_room_api.PrayerPraiseRequest"],
+        "USE_CACHE": False,
+    },
+    WEBHOOK_BATCHED=True,
+)
+@patch("prayer_room_api.webhooks.fire_webhook.delay")
+class BatchedWebhookTests(WebhookTestCase):
+
+    def _payload(self, mock_fire):
+        mock_fire.assert_called_once()
+        return json.loads(mock_fire.call_args.args[1])
+
+    def test_saves_are_coalesced_into_one_delivery(self, mock_fire):
+        """Many saves of one request send a single event with its final state."""
+        prayer = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Please pray"
+        )
+        for _ in range(3):
+            prayer.approved_at = now()
+            prayer.save()
+
+        self.assertEqual(OutboxEvent.objects.filter(topic=outbox.WEBHOOKS).count(), 4)
+        mock_fire.assert_not_called()
+
+        self.assertEqual(outbox.relay(), 4)
+
+        payload = self._payload(mock_fire)
+        self.assertEqual(len(payload), 1)
+        self.assertEqual(payload[0]["topic"], PRAYER_TOPICS[0])
+        self.assertEqual(payload[0]["object"]["id"], prayer.pk)
+        self.assertTrue(payload[0]["object"]["is_approved"])
+        self.assertEqual(payload[0]["object"]["location"]["slug"], "main")
+        self.assertEqual(payload[0]["webhook_uuid"], str(self.webhook.uuid))
+
+    def test_one_call_per_endpoint_for_many_objects(self, mock_fire):
+        prayers = [
+            PrayerPraiseRequest.objects.create(
+                location=self.location, content=f"Prayer {i}"
+            )
+            for i in range(5)
+        ]
+
+        outbox.relay()
+
+        payload = self._payload(mock_fire)
+        self.assertEqual(
+            sorted(event["object"]["id"] for event in payload),
+            [prayer.pk for prayer in prayers],
+        )
+
+    def test_saves_serialize_without_querying(self, mock_fire):
+        """The in-memory instance is serialized; it is not reloaded."""
+        prayer = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Please pray"
+        )
+        prayer = PrayerPraiseRequest.objects.select_related("location").get(
+            pk=prayer.pk
+        )
+        prayer.name = "Sam"
+
+        # UPDATE, the webhook lookup and the outbox INSERT
+        with self.assertNumQueries(3):
+            prayer.save(update_fields=["name"])
+
+    def test_rolled_back_saves_are_not_delivered(self, mock_fire):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            PrayerPraiseRequest.objects.create(
+                location=self.location, content="Please pray"
+            )
+            raise RuntimeError
+
+        self.assertEqual(outbox.relay(), 0)
+        mock_fire.assert_not_called()
+
+    def test_nothing_is_published_without_subscribers(self, mock_fire):
+        self.webhook.topics.clear()
+
+        PrayerPraiseRequest.objects.create(
+            location=self.location, content="Please pray"
+        )
+
+        self.assertFalse(OutboxEvent.objects.exists())
+        outbox.relay()
+        mock_fire.assert_not_called()
+
+    def test_bulk_updates_are_delivered_as_one_batch(self, mock_fire):
+        """A bulk update reads the rows back once and sends one batch."""
+        prayers = [
+            PrayerPraiseRequest.objects.create(
+                location=self.location, content=f"Prayer {i}"
+            )
+            for i in range(3)
+        ]
+
+        OutboxEvent.objects.all().delete()
+
+        # savepoint, SELECT ... FOR UPDATE, UPDATE ... RETURNING, rollup UPDATE,
+        # webhook lookup, SELECT, outbox INSERT, release
+        with self.assertNumQueries(8):
+            ids = PrayerPraiseRequest.objects.filter(
+                pk__in=[prayer.pk for prayer in prayers]
+            ).update_with_events(approved_at=now())
+
+        self.assertEqual(sorted(ids), [prayer.pk for prayer in prayers])
+        outbox.relay()
+
+        payload = self._payload(mock_fire)
+        self.assertEqual({event["topic"] for event in payload}, {PRAYER_TOPICS[1]})
+        self.assertTrue(all(event["object"]["is_approved"] for event in payload))
+
+
+class BulkUpdateEventTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="Main", slug="main")
+        self.answered = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Answered", response_comment="Amen"
+        )
+        self.pending = PrayerPraiseRequest.objects.create(
+            location=self.location, content="Waiting"
+        )
+
+    def test_bulk_response_notifies_only_new_responses(self):
+        ids = PrayerPraiseRequest.objects.update_with_events(
+            response_comment="Praying for you"
+        )
+
+        self.assertEqual(sorted(ids), [self.answered.pk, self.pending.pk])
+        self.assertEqual(
+            list(Notification.objects.values_list("prayer_request", flat=True)),
+            [self.pending.pk],
+        )
+        self.assertTrue(
+            OutboxEvent.objects.filter(topic=outbox.NOTIFICATIONS).exists()
+        )
+
+    def test_signal_is_not_sent_when_nothing_matched(self):
+        with patch("prayer_room_api.models.prayer_requests_updated.send") as mock_send:
+            ids = PrayerPraiseRequest.objects.filter(pk=0).update_with_events(
+                flagged_at=now()
+            )
+
+        self.assertEqual(ids, [])
+        mock_send.assert_not_called()
@@ -31,6 +31,8 @@ from .views import (
     ModerationView,
     PrayerInspirationModelViewSet,
     PrayerPraiseRequestViewSet,
+    PrayerRequestExportView,
+    PrayerRequestStreamView,
     PrayerResourceCRUDView,
     PrayerResourceReorderView,
     PrayerResourceViewSet,
@@ -50,6 +52,13 @@ router.register(r"settings", SettingModelViewSet)
 router.register(r"resources", PrayerResourceViewSet)
 router.register(r"user-profile", UserProfileViewSet, basename="user-profile")
 
+api_urls = router.urls
+if settings.ASYNC_API:
+    from .async_views import urlpatterns as async_api_urls
+
+    # Ahead of the router, so the async views take over the routes they cover.
+    api_urls = [*async_api_urls, *api_urls]
+
 
 urlpatterns = [
     path("", StaffDashboardView.as_view(), name="staff-dashboard"),
@@ -57,6 +66,9 @@ urlpatterns = [
     path("moderation/", ModerationView.as_view(), name="moderation"),
     path("flagged/", FlaggedView.as_view(), name="flagged"),
     path("prayers/respond/", PrayerResponseView.as_view(), name="prayer-response"),
+    path(
+        "prayers/export/", PrayerRequestExportView.as_view(), name="prayer-export"
+    ),
     *BannedWordCRUDView.get_urls(),
     *EmailTemplateCRUDView.get_urls(),
     *PrayerResourceCRUDView.get_urls(),
@@ -70,7 +82,13 @@ urlpatterns = [
         EmailTemplatePreviewView.as_view(),
         name="emailtemplate-preview",
     ),
-    path("api/", include(router.urls)),
+    # Before the router, whose detail route would match "stream" as a pk.
+    path(
+        "api/prayer-requests/stream/",
+        PrayerRequestStreamView.as_view(),
+        name="prayer-request-stream",
+    ),
+    path("api/", include(api_urls)),
     path("auth/", include("allauth.urls")),
     path("_allauth/", include("allauth.headless.urls")),
     path(
@@ -1,15 +1,18 @@
+import asyncio
+import json
 import random
-from datetime import datetime, timedelta
 
 import requests
 from allauth.socialaccount.models import SocialToken
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Count, F, OuterRef, Q, Subquery, Value
-from django.db.models.functions import Coalesce, TruncDate
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.utils.decorators import method_decorator
@@ -30,15 +33,20 @@ EMPTY_QUEUE_MESSAGES = [
 ]
 from rest_framework import generics
 from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from . import counters, emails, exports, pubsub, stats
+from .caching import CachedResponseMixin
 from .forms import (
     BulkModerationForm,
     EmailTemplateForm,
+    PrayerExportForm,
     PrayerModerationForm,
     PrayerResourceForm,
     PrayerResponseForm,
@@ -54,6 +62,8 @@ from .models import (
     Setting,
     UserProfile,
 )
+from .pagination import PrayerFeedPagination
+from .renderers import ORJSONRenderer
 from .serializers import (
     HomePageContentSerializer,
     LocationSerializer,
@@ -62,25 +72,27 @@ from .serializers import (
     PrayerResourceSerializer,
     SettingSerializer,
     UserProfileSerializer,
+    prayer_feed_data,
+    prayer_feed_values,
 )
 
 
-class PrayerInspirationModelViewSet(ReadOnlyModelViewSet):
+class PrayerInspirationModelViewSet(CachedResponseMixin, ReadOnlyModelViewSet):
     queryset = PrayerInspiration.objects.all()
     serializer_class = PrayerInspirationSerializer
 
 
-class HomePageContentModelViewSet(ReadOnlyModelViewSet):
+class HomePageContentModelViewSet(CachedResponseMixin, ReadOnlyModelViewSet):
     queryset = HomePageContent.objects.all()
     serializer_class = HomePageContentSerializer
 
 
-class SettingModelViewSet(ReadOnlyModelViewSet):
+class SettingModelViewSet(CachedResponseMixin, ReadOnlyModelViewSet):
     queryset = Setting.objects.all()
     serializer_class = SettingSerializer
 
 
-class LocationModelViewSet(ReadOnlyModelViewSet):
+class LocationModelViewSet(CachedResponseMixin, ReadOnlyModelViewSet):
     queryset = Location.objects.filter(is_active=True)
     serializer_class = LocationSerializer
 
@@ -101,11 +113,13 @@ class PrayerPraiseRequestViewSet(ModelViewSet):
     queryset = (
         PrayerPraiseRequest.objects.select_related("location")
         .filter(archived_at__isnull=True, approved_at__isnull=False)
-        .order_by("-created_at")
+        .order_by("-created_at", "-id")
     )
     serializer_class = PrayerPraiseRequestSerializer
     authentication_classes = [TokenAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = PrayerFeedPagination
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
 
     def get_queryset(self):
         qst = super().get_queryset()
@@ -114,13 +128,31 @@ class PrayerPraiseRequestViewSet(ModelViewSet):
             qst = qst.filter(location__slug=location)
         return qst
 
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return super().list(request, *args, **kwargs)
+        # The same JSON as the serializer, built straight from .values() rows.
+        queryset = prayer_feed_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(prayer_feed_data(page))
+        return Response(prayer_feed_data(queryset))
+
+    @action(detail=False, methods=["post"], url_path="stream-token")
+    def stream_token(self, request):
+        """A short-lived token for ``PrayerRequestStreamView``'s ``?token=``."""
+        return Response({"token": pubsub.make_stream_token(request.user)})
+
     @action(detail=True, methods=["post"])
     def increment_prayer_count(self, request, pk=None):
-        prayer = self.get_object()
-        prayer.prayer_count = F("prayer_count") + 1
-        prayer.save()
-        prayer.refresh_from_db()
-        return Response({"prayer_count": prayer.prayer_count})
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        prayer_count = counters.record_prayer(pk)
+        if prayer_count is None:
+            raise Http404
+        return Response({"prayer_count": prayer_count})
 
     @action(detail=True, methods=["post"])
     def mark_flagged(self, request, pk=None):
@@ -153,6 +185,77 @@ class PrayerPraiseRequestViewSet(ModelViewSet):
         return Response({"created_by": prayer.created_by.username})
 
 
+class PrayerRequestStreamView(View):
+    """
+    Server-sent events for the live prayer wall: ``prayer`` when a request is
+    published and ``prayer_count`` when its count changes, optionally limited
+    to ``?location=<slug>``. Authenticates with the session, an API token
+    header or, since ``EventSource`` can't send headers, ``?token=`` with a
+    short-lived token from ``stream-token/``. API tokens are never accepted
+    in the URL. Only served with ``ASYNC_API`` under ASGI.
+    """
+
+    keepalive_seconds = 15
+
+    async def get(self, request):
+        # Under WSGI the endless stream is buffered and ties up a worker for
+        # good, so it's only served by the "web-asgi" process.
+        if not settings.ASYNC_API or not isinstance(request, ASGIRequest):
+            return HttpResponse(
+                "The live prayer wall needs the ASGI server.", status=501
+            )
+        if not await self.authenticate(request):
+            return HttpResponse(status=401)
+
+        location_id = None
+        if slug := request.GET.get("location"):
+            location_id = (
+                await Location.objects.filter(slug=slug)
+                .values_list("id", flat=True)
+                .afirst()
+            )
+            if location_id is None:
+                raise Http404
+
+        response = StreamingHttpResponse(
+            self.stream(location_id), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def authenticate(self, request):
+        user = await request.auser()
+        if user.is_authenticated:
+            return True
+        auth = request.headers.get("Authorization", "")
+        if auth.startswith("Token "):
+            key = auth.removeprefix("Token ")
+            return await Token.objects.filter(
+                key=key, user__is_active=True
+            ).aexists()
+        token = request.GET.get("token")
+        user_id = pubsub.read_stream_token(token) if token else None
+        if user_id is None:
+            return False
+        return await User.objects.filter(pk=user_id, is_active=True).aexists()
+
+    async def stream(self, location_id):
+        async with pubsub.subscription() as queue:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), self.keepalive_seconds
+                    )
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if location_id is None or event["location"] == location_id:
+                    data = json.dumps(event["data"])
+                    yield f"event: {event['type']}\ndata: {data}\n\n"
+
+
 class UserProfileViewSet(ReadOnlyModelViewSet):
     serializer_class = UserProfileSerializer
     authentication_classes = [TokenAuthentication, SessionAuthentication]
@@ -213,19 +316,9 @@ class PrayerResponseView(ListView):
     context_object_name = "prayers"
 
     def get_queryset(self):
-        return (
-            PrayerPraiseRequest.objects.select_related("location")
-            .filter(
-                approved_at__isnull=False,
-                flagged_at__isnull=True,
-                archived_at__isnull=True,
-                response_skipped_at__isnull=True,
-                # Date when prayer responses got launched
-                created_at__gte=datetime(2025, 12, 15),
-            )
-            .filter(Q(response_comment__isnull=True) | Q(response_comment=""))
-            .order_by("created_at")
-        )
+        return PrayerPraiseRequest.objects.select_related(
+            "location"
+        ).awaiting_response()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -276,11 +369,9 @@ class ModerationView(ListView):
     template_name = "prayers/moderation.html"
 
     def get_queryset(self):
-        return (
-            PrayerPraiseRequest.objects.select_related("location")
-            .filter(approved_at__isnull=True, archived_at__isnull=True)
-            .order_by("-created_at")
-        )
+        return PrayerPraiseRequest.objects.select_related(
+            "location"
+        ).pending_moderation()
 
     def get(self, request, *args, **kwargs):
         # Handle confirmation dialog request
@@ -363,13 +454,12 @@ class ModerationView(ListView):
         if form.is_valid():
             prayer_ids = form.cleaned_data["prayer_ids"]
             prayers = PrayerPraiseRequest.objects.filter(pk__in=prayer_ids)
-            count = prayers.count()
 
             if action == "bulk_approve":
-                prayers.update(approved_at=now())
+                count = len(prayers.update_with_events(approved_at=now()))
                 message = f"{count} prayer request{'s' if count != 1 else ''} approved."
             else:  # bulk_deny
-                prayers.update(archived_at=now())
+                count = len(prayers.update_with_events(archived_at=now()))
                 message = f"{count} prayer request{'s' if count != 1 else ''} denied."
 
             if request.htmx:
@@ -386,11 +476,7 @@ class FlaggedView(ListView):
     paginate_by = 25
 
     def get_queryset(self):
-        return (
-            PrayerPraiseRequest.objects.select_related("location")
-            .filter(flagged_at__isnull=False, archived_at__isnull=True)
-            .order_by("-flagged_at")
-        )
+        return PrayerPraiseRequest.objects.select_related("location").flagged_queue()
 
     def get(self, request, *args, **kwargs):
         # Handle confirmation dialog request
@@ -488,15 +574,14 @@ class FlaggedView(ListView):
         if form.is_valid():
             prayer_ids = form.cleaned_data["prayer_ids"]
             prayers = PrayerPraiseRequest.objects.filter(pk__in=prayer_ids)
-            count = prayers.count()
 
             if action == "bulk_unflag":
-                prayers.update(flagged_at=None)
+                count = len(prayers.update_with_events(flagged_at=None))
                 message = (
                     f"{count} prayer request{'s' if count != 1 else ''} unflagged."
                 )
             else:  # bulk_archive
-                prayers.update(archived_at=now())
+                count = len(prayers.update_with_events(archived_at=now()))
                 message = f"{count} prayer request{'s' if count != 1 else ''} archived."
 
             if request.htmx:
@@ -636,9 +721,6 @@ class EmailTemplatePreviewView(View):
     """HTMX endpoint for live template preview."""
 
     def post(self, request, pk):
-        import markdown
-        from django.template import Context, Template
-
         from .models import EmailTemplate
 
         template = get_object_or_404(EmailTemplate, pk=pk)
@@ -649,9 +731,9 @@ class EmailTemplatePreviewView(View):
         body_markdown = request.POST.get("body_markdown", "")
 
         try:
-            subject_rendered = Template(subject).render(Context(example_data))
-            markdown_rendered = Template(body_markdown).render(Context(example_data))
-            html_content = markdown.markdown(markdown_rendered)
+            subject_rendered, _, html_content = emails.CompiledTemplate(
+                subject, body_markdown
+            ).render(example_data)
 
             return HttpResponse(
                 f"""
@@ -728,78 +810,31 @@ class PrayerResourceReorderView(View):
 
 @method_decorator(staff_member_required, name="dispatch")
 class StaffDashboardView(TemplateView):
-    """Staff home page: action tiles + 30-day activity chart."""
+    """Staff home page: action tiles + activity chart (30, 90 or 365 days)."""
 
     template_name = "prayers/dashboard.html"
     activity_window_days = 30
+    activity_windows = (30, 90, 365)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            days = int(request.GET.get("days", self.activity_window_days))
+        except ValueError:
+            days = self.activity_window_days
+        if days in self.activity_windows:
+            self.activity_window_days = days
+        return super().get(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        current = now()
-        today = current.date()
-        window_start_date = today - timedelta(days=self.activity_window_days - 1)
-        window_start = current - timedelta(days=self.activity_window_days - 1)
-        window_start = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
-        last_24h = current - timedelta(hours=24)
-
-        prayers = PrayerPraiseRequest.objects
-
-        pending_count = prayers.filter(
-            approved_at__isnull=True, archived_at__isnull=True
-        ).count()
-        flagged_count = prayers.filter(
-            flagged_at__isnull=False, archived_at__isnull=True
-        ).count()
-        awaiting_response_count = prayers.filter(
-            approved_at__isnull=False,
-            archived_at__isnull=True,
-            flagged_at__isnull=True,
-            created_at__gte=datetime(2025, 12, 15),
-        ).filter(Q(response_comment__isnull=True) | Q(response_comment="")).count()
-        new_today_count = prayers.filter(created_at__gte=last_24h).count()
-
-        total_approved = prayers.filter(approved_at__isnull=False).count()
-        total_archived = prayers.filter(archived_at__isnull=False).count()
-        total_active = prayers.filter(
-            approved_at__isnull=False, archived_at__isnull=True
-        ).count()
-
-        # Activity timeseries: count per day for submitted, approved, flagged.
-        # Three queries (one per timestamp column) instead of one because each
-        # series buckets on a different field.
-        submitted_by_day = dict(
-            prayers.filter(created_at__gte=window_start)
-            .annotate(day=TruncDate("created_at"))
-            .values("day")
-            .annotate(n=Count("id"))
-            .values_list("day", "n")
-        )
-        approved_by_day = dict(
-            prayers.filter(approved_at__gte=window_start)
-            .annotate(day=TruncDate("approved_at"))
-            .values("day")
-            .annotate(n=Count("id"))
-            .values_list("day", "n")
-        )
-        flagged_by_day = dict(
-            prayers.filter(flagged_at__gte=window_start)
-            .annotate(day=TruncDate("flagged_at"))
-            .values("day")
-            .annotate(n=Count("id"))
-            .values_list("day", "n")
-        )
+        dashboard_stats = stats.get_dashboard_stats(self.activity_window_days)
+        counts = dashboard_stats["counts"]
+        activity = dashboard_stats["activity"]
 
-        activity = []
-        for offset in range(self.activity_window_days):
-            day = window_start_date + timedelta(days=offset)
-            activity.append(
-                {
-                    "day": day,
-                    "submitted": submitted_by_day.get(day, 0),
-                    "approved": approved_by_day.get(day, 0),
-                    "flagged": flagged_by_day.get(day, 0),
-                }
-            )
+        pending_count = counts["pending"]
+        flagged_count = counts["flagged"]
+        awaiting_response_count = counts["awaiting_response"]
+        new_today_count = counts["new_today"]
 
         peak = max(
             (max(d["submitted"], d["approved"]) for d in activity), default=0
@@ -857,7 +892,9 @@ class StaffDashboardView(TemplateView):
         ]
 
         last_index = len(chart_points) - 1
-        x_label_indices = {i for i in range(0, last_index + 1, 7)}
+        # Weekly ticks for the 30-day chart, spaced out for longer windows.
+        label_step = 7 * max(1, self.activity_window_days // 30)
+        x_label_indices = {i for i in range(0, last_index + 1, label_step)}
         # Always include the last day, but drop the prior weekly tick if it's
         # within 2 days of the end (avoids label collision at the right edge).
         x_label_indices.add(last_index)
@@ -907,12 +944,13 @@ class StaffDashboardView(TemplateView):
                     },
                 ],
                 "totals": {
-                    "approved": total_approved,
-                    "archived": total_archived,
-                    "active": total_active,
+                    "approved": counts["total_approved"],
+                    "archived": counts["total_archived"],
+                    "active": counts["total_active"],
                 },
                 "activity": activity,
                 "activity_window_days": self.activity_window_days,
+                "activity_windows": self.activity_windows,
                 "chart_max": chart_max,
                 "chart": {
                     "width": chart_w,
@@ -931,7 +969,36 @@ class StaffDashboardView(TemplateView):
                     "submitted": sum(d["submitted"] for d in activity),
                     "approved": sum(d["approved"] for d in activity),
                     "flagged": sum(d["flagged"] for d in activity),
+                    "responded": sum(d["responded"] for d in activity),
                 },
             }
         )
         return context
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class PrayerRequestExportView(View):
+    """
+    Prayer requests as a streamed CSV or JSON lines download, filtered by
+    ``?since=``/``?until=`` dates, ``?location=<id>`` and ``?status=``.
+    """
+
+    def get(self, request):
+        form = PrayerExportForm(request.GET)
+        if not form.is_valid():
+            return HttpResponse(
+                form.errors.as_json(), status=400, content_type="application/json"
+            )
+        filters = form.cleaned_data
+        format = filters.pop("format")
+        queryset = exports.export_queryset(**filters)
+        if isinstance(request, ASGIRequest):
+            content = exports.aexport(queryset, format)
+        else:
+            content = exports.export(queryset, format)
+        response = StreamingHttpResponse(
+            content, content_type=exports.CONTENT_TYPES[format]
+        )
+        filename = f"prayer-requests-{now():%Y-%m-%d}.{format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,192 @@
+"""
+Coalesced, batched webhook delivery.
+
+django_webhook posts one request per save for every subscribed endpoint. Here
+the save and delete listeners for ``DJANGO_WEBHOOK["MODELS"]``, and the
+``prayer_requests_updated`` listener for bulk updates, serialize instances in
+memory and publish the events to the outbox with the change itself. The
+outbox relay hands each batch of events to ``deliver()``, which keeps only the
+latest event per object.
+
+By default each event is still sent on its own, with django_webhook's usual
+``{object, topic, object_type, webhook_uuid}`` payload. With
+``WEBHOOK_BATCHED`` each endpoint instead gets a single ``fire_webhook`` call
+whose payload is a JSON array of those dicts; consumers must accept arrays
+before it is turned on.
+"""
+
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django_webhook.settings import get_settings
+from django_webhook.signals import (
+    CREATE,
+    DELETE,
+    UPDATE,
+    _active_models,
+    _find_webhooks,
+    model_dict,
+)
+from django_webhook.tasks import fire_webhook
+
+from . import outbox
+
+BATCH_TOPIC = "batch"
+
+
+def _serializer_classes():
+    from .serializers import PrayerPraiseRequestWebhookSerializer
+
+    return {
+        "prayer_room_api.PrayerPraiseRequest": PrayerPraiseRequestWebhookSerializer,
+    }
+
+
+def serialize(instance):
+    """
+    Return the webhook representation of ``instance`` as it is in memory.
+
+    Only fields still holding an unresolved expression (e.g. an ``F()``
+    update) are reloaded from the database.
+    """
+    stale = [
+        field.attname
+        for field in instance._meta.concrete_fields
+        if hasattr(getattr(instance, field.attname, None), "resolve_expression")
+    ]
+    if stale:
+        instance.refresh_from_db(fields=stale)
+
+    serializer_class = _serializer_classes().get(instance._meta.label)
+    if serializer_class is None:
+        return model_dict(instance)
+    return serializer_class(instance=instance).data
+
+
+def _build_event(instance, action):
+    object_type = instance._meta.label
+    encoder_cls = get_settings()["PAYLOAD_ENCODER_CLASS"]
+    return {
+        "key": f"{object_type}:{instance.pk}",
+        "action": action,
+        "object_type": object_type,
+        # Round-trip through JSON so the outbox only ever holds plain data.
+        "object": json.loads(json.dumps(serialize(instance), cls=encoder_cls)),
+    }
+
+
+def queue_event(instance, action):
+    """Publish a webhook event for ``instance`` if anything is subscribed to it."""
+    if not _find_webhooks(f"{instance._meta.label}/{action}"):
+        return
+    outbox.publish(outbox.WEBHOOKS, _build_event(instance, action))
+
+
+def queue_bulk_update(model, ids, using=None):
+    """
+    Publish update events for rows changed by a bulk ``update()``, reading
+    them back in one query.
+    """
+    if not _find_webhooks(f"{model._meta.label}/{UPDATE}"):
+        return
+    instances = model._default_manager.using(using).select_related().filter(pk__in=ids)
+    outbox.publish_many(
+        outbox.WEBHOOKS, [_build_event(instance, UPDATE) for instance in instances]
+    )
+
+
+def coalesce(events):
+    """
+    Keep the latest event per object. An object created and then updated
+    within one window is still reported as created.
+    """
+    latest = {}
+    for event in events:
+        previous = latest.pop(event["key"], None)
+        if previous and previous["action"] == CREATE and event["action"] == UPDATE:
+            event = {**event, "action": CREATE}
+        latest[event["key"]] = event
+    return list(latest.values())
+
+
+def deliver(events):
+    """
+    Send ``events``, one ``fire_webhook`` per event and endpoint, or per
+    endpoint with ``WEBHOOK_BATCHED``. Returns the number of calls made.
+    """
+    batches = defaultdict(list)
+    for event in coalesce(events):
+        topic = f"{event['object_type']}/{event['action']}"
+        for webhook_id, uuid in _find_webhooks(topic):
+            batches[webhook_id].append(
+                dict(
+                    object=event["object"],
+                    topic=topic,
+                    object_type=event["object_type"],
+                    webhook_uuid=str(uuid),
+                )
+            )
+
+    encoder_cls = get_settings()["PAYLOAD_ENCODER_CLASS"]
+    if not settings.WEBHOOK_BATCHED:
+        for webhook_id, payloads in batches.items():
+            for payload in payloads:
+                fire_webhook.delay(
+                    webhook_id,
+                    json.dumps(payload, cls=encoder_cls),
+                    topic=payload["topic"],
+                    object_type=payload["object_type"],
+                )
+        return sum(len(payloads) for payloads in batches.values())
+
+    for webhook_id, payloads in batches.items():
+        topics = {payload["topic"] for payload in payloads}
+        object_types = {payload["object_type"] for payload in payloads}
+        fire_webhook.delay(
+            webhook_id,
+            json.dumps(payloads, cls=encoder_cls),
+            topic=topics.pop() if len(topics) == 1 else BATCH_TOPIC,
+            object_type=object_types.pop() if len(object_types) == 1 else None,
+        )
+    return len(batches)
+
+
+def _on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    queue_event(instance, CREATE if created else UPDATE)
+
+
+def _on_delete(sender, instance, **kwargs):
+    queue_event(instance, DELETE)
+
+
+def _on_bulk_update(sender, ids, using=None, **kwargs):
+    queue_bulk_update(sender, ids, using=using)
+
+
+def connect_signals():
+    """Swap django_webhook's per-save listeners for the batched ones."""
+    from .models import PrayerPraiseRequest, prayer_requests_updated
+
+    for model in _active_models():
+        if model is PrayerPraiseRequest:
+            prayer_requests_updated.connect(
+                _on_bulk_update,
+                sender=model,
+                dispatch_uid="prayer_room_api_webhooks_bulk_update",
+            )
+        for signal, name, receiver in (
+            (post_save, "post_save", _on_save),
+            (post_delete, "post_delete", _on_delete),
+        ):
+            signal.disconnect(
+                sender=model, dispatch_uid=f"django_webhook_{model._meta.label}_{name}"
+            )
+            signal.connect(
+                receiver,
+                sender=model,
+                dispatch_uid=f"prayer_room_api_webhooks_{model._meta.label}_{name}",
+            )